@@ -1,5 +1,9 @@
+-- Range-partitioned on game_date, one partition per season (pitch_2026 holds
+-- 2026-01-01..2026-12-31). The updater creates the partitions it needs, plus
+-- next season's, when it starts. Unique constraints on a partitioned table
+-- must include the partition key, so upserts conflict on (id, game_date).
 CREATE TABLE "pitch" (
-  "id" varchar UNIQUE,
+  "id" varchar,
   "game_date" date,
   "play_description" varchar,
   "home_team" varchar,
@@ -68,12 +72,28 @@ CREATE TABLE "pitch" (
   "total_miss_front" float,
   "total_miss_in_front" float,
   "created_at" timestamptz,
-  "updated_at" timestamptz
-);
+  "updated_at" timestamptz,
+  UNIQUE ("id", "game_date")
+) PARTITION BY RANGE ("game_date");
 
 CREATE INDEX datetime_start_index
 on pitch (datetime_start);
 
+CREATE INDEX pitch_game_id_index
+on pitch (game_id);
+
+CREATE INDEX pitch_game_date_index
+on pitch (game_date) INCLUDE (px_mid, correct_call, correct_call_front);
+
+CREATE INDEX pitch_umpire_id_game_date_index
+on pitch (umpire_id, game_date);
+
+CREATE INDEX pitch_incorrect_total_miss_index
+on pitch (total_miss DESC NULLS LAST) WHERE correct_call = false;
+
+CREATE INDEX pitch_blown_strikeout_total_miss_index
+on pitch (total_miss DESC NULLS LAST) WHERE blown_strikeout = true;
+
 CREATE TABLE "umpire" (
   "id" int UNIQUE NOT NULL,
   "name" varchar
@@ -102,7 +122,19 @@ CREATE TABLE "game" (
   "home_team_id" int,
   "away_team_id" int,
   "home_feed_offset": int,
-  "away_feed_offset": int
+  "away_feed_offset": int,
+  "home_broadcast_start" timestamp,
+  "away_broadcast_start" timestamp
+);
+
+CREATE TABLE "game_sync" (
+  "id" int UNIQUE NOT NULL,
+  "status" varchar,
+  "feed_timestamp" varchar,
+  "fingerprint" varchar,
+  "synced_at" timestamptz,
+  "last_at_bat_index" int,
+  "last_pitch_index" int
 );
 
 CREATE TABLE "player" (
@@ -110,6 +142,41 @@ CREATE TABLE "player" (
   "name" varchar
 );
 
+-- Season summaries behind the reports, maintained per game by the updater
+-- (updater/summaries.py).
+CREATE TABLE "umpire_season_summary" (
+  "season" int NOT NULL,
+  "umpire_id" int NOT NULL,
+  "games" int NOT NULL DEFAULT 0,
+  "correct_calls" int NOT NULL DEFAULT 0,
+  "incorrect_calls" int NOT NULL DEFAULT 0,
+  "total_calls" int NOT NULL DEFAULT 0,
+  "calls_benefit_home" int NOT NULL DEFAULT 0,
+  "calls_benefit_away" int NOT NULL DEFAULT 0,
+  PRIMARY KEY ("season", "umpire_id")
+);
+
+CREATE TABLE "team_season_summary" (
+  "season" int NOT NULL,
+  "team_id" int NOT NULL,
+  "incorrect_calls_benefit" int NOT NULL DEFAULT 0,
+  "incorrect_calls_hurt" int NOT NULL DEFAULT 0,
+  PRIMARY KEY ("season", "team_id")
+);
+
+CREATE TABLE "player_season_summary" (
+  "season" int NOT NULL,
+  "player_id" int NOT NULL,
+  "role" varchar NOT NULL,
+  "blown_strikes" int NOT NULL DEFAULT 0,
+  "blown_balls" int NOT NULL DEFAULT 0,
+  "x_misses" int NOT NULL DEFAULT 0,
+  "y_misses" int NOT NULL DEFAULT 0,
+  "blown_strikeouts" int NOT NULL DEFAULT 0,
+  "blown_walks" int NOT NULL DEFAULT 0,
+  PRIMARY KEY ("season", "player_id", "role")
+);
+
 CREATE TABLE "ejection" (
   "id" varchar UNIQUE NOT NULL,
   "game_date" date,
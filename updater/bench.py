@@ -0,0 +1,1773 @@
+#!/usr/bin/env python3
+"""Benchmarks for the updater's hot paths.
+
+Usage:  python3 bench.py <benchmark> [options]
+
+  upsert   per-row literal upserts (the old dataclass_upsert_query path,
+           needs pypika) vs the COPY bulk upsert in db.py, on synthetic pitch
+           rows. Writes to the pitch table of DB_URL under negative game ids
+           and deletes them afterwards, so point it at a scratch database.
+  indexes  loads synthetic seasons into a throwaway `bench_indexes` schema of
+           DB_URL (which must already have the pitch table), records
+           EXPLAIN (ANALYZE, BUFFERS) for the updater/report access paths,
+           applies migrations/2026_add_pitch_read_indexes.sql and records
+           them again.
+  partition loads synthetic seasons into an unpartitioned `pitch` in a
+           throwaway `bench_partition` schema, runs partition_pitch.py on it
+           while a writer keeps changing rows, then checks the result matches
+           the original table, that one-season queries scan one partition,
+           and that season partitions and pitch upserts work.
+  summaries writes synthetic games twice (the second time with flipped
+           calls, dropped pitches and changed umpires) through the
+           updater's write sequence in a throwaway `bench_summaries` schema,
+           then checks the incrementally kept season summaries against a
+           rebuild and times summary reads against the aggregates.
+  scoring  scores synthetic called pitches (with missing and unsolvable
+           trajectories, ABS overturns, pre- and post-2026 games) with the
+           scalar set_trajectory()/assign_call_metrics() path and with
+           scoring.score_columns(), checks every output matches exactly and
+           compares throughput, and checks the vectorised benefit flags.
+           Needs no database.
+  startup  runs umpire-auditor.py under `python -X importtime` and checks the
+           modules it imports before doing any work stay within a budget
+           and exclude the heavy ones only game writes need, then times a
+           no-op tick (an offseason day served from a seeded feed cache,
+           with DB_URL pointing nowhere) end to end. Needs no database.
+  tally    counts a game's calls with game.CallTally and with the DataFrame
+           filters add_game_to_db() used to run, on synthetic games (with
+           uncalled pitches and an empty game) and, with --from-db N, on the
+           N most recent stored games of DB_URL; checks every Game field
+           matches and times both per game. Needs pandas.
+  catchers looks up the catcher of every called pitch of synthetic games
+           (no changes, in-order, out-of-order and same-time changes, other
+           team's changes) in catcher_timeline.CatcherTimeline and in the
+           portion IntervalDict it replaced, checks every lookup matches and
+           times building plus lookups per game. Needs portion.
+  parser   parses synthetic extra-inning feeds (every pitch code, missing
+           coordinates, ABS reviews on pitches and plays, catcher changes,
+           an ejection, an unfinished last play), or the recorded feeds
+           given with --feed (raw JSON or feed cache entries), with
+           feed_parser.parse_plays() and with the add_pitches() it
+           replaced; checks pitches, ejections, catchers and media offsets
+           match, in full and for a live diff, and times both per feed.
+  pitches  builds Pitch rows from parsed pitch dicts and serializes them with
+           get_values() as the COPY writer does, with the slotted Pitch and
+           with the plain dataclass it replaced (dicts kept alive next to
+           their rows, as add_game_to_db() did). Reports memory held for
+           --workers in-flight games (tracemalloc) and time, projected to a
+           --seasons backfill, and checks both give the same values.
+           Needs no database.
+  stream   writes synthetic feeds of 9-19 innings padded to 5-15 MB of JSON
+           as raw files and as feed cache entries, reads them with
+           feed_stream (header subtrees plus plays decoded one at a time)
+           and with a full json.load, checks the header, the parsed plays
+           and a live diff match, and enforces with tracemalloc that a
+           streamed game's peak stays under feed_stream.GAME_MEMORY_BUDGET.
+           Needs ijson, no database.
+  decode   decodes recorded feeds given with --feed (raw JSON or feed cache
+           entries), or padded synthetic ones of 5-15 MB, with every JSON
+           backend available (stdlib json from text and from bytes, ijson,
+           orjson) and reads them back from plain and gzipped feed cache
+           entries through json_codec; checks every decode matches and
+           reports throughput in MB/s. Needs no database.
+  backfill parses and scores padded synthetic feeds (raw JSON bytes, as
+           --backfill hands them over) into game_rows.GameRows serially, on
+           a thread pool and on forked process pools of --processes
+           workers (default 1 up to the core count); checks every pool
+           returns the same rows as the serial run and reports throughput
+           in games per minute against the number of workers, and the size
+           of the rows each game sends back. Needs no database.
+  rescore  stores synthetic pitches scored by the scalar path in a
+           throwaway `bench_rescore` schema, checks rescore.py leaves them
+           unchanged, then corrupts 1% of them and checks it restores
+           exactly those rows, the game counts and the season summaries.
+
+Every benchmark prints one line per configuration and exits non-zero if a
+parity check fails.
+"""
+import argparse
+import dataclasses
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from game import Game
+from pitch import Pitch
+
+#%% Synthetic data
+
+def synthetic_pitch(i, game_id, rng):
+    game_date = datetime(2026, 4, 1) + timedelta(days=(-game_id) % 180)
+    correct = rng.random() > 0.07
+    code = rng.choice('BC')
+    benefit = None if correct else rng.choice(['home', 'away'])
+    return Pitch(
+        id=f'bench-{game_id}-{i}',
+        game_date=game_date.strftime('%Y-%m-%d'),
+        play_description='Synthetic pitch for benchmarking.',
+        home_team='NYY', away_team='BOS', home_team_id=147, away_team_id=111,
+        inning=i // 30 + 1, inning_half=rng.choice(['top', 'bottom']), outs=rng.randint(0, 2),
+        bat_side=rng.choice('LR'),
+        sz_top=rng.uniform(3.2, 3.6), sz_bottom=rng.uniform(1.5, 1.7),
+        px=rng.uniform(-1.5, 1.5), pz=rng.uniform(0.5, 4.5),
+        code=code, strikes=rng.randint(0, 2), balls=rng.randint(0, 3),
+        umpire_name='Synthetic Umpire', game_id=game_id,
+        datetime_start=game_date + timedelta(hours=23, seconds=i * 20),
+        timestamp_start_home='00:12:31.4', timestamp_start_away='00:12:33.1',
+        start_seconds_home=751 + i * 20, start_seconds_away=753 + i * 20,
+        timestamp_end_home='00:12:34.9', timestamp_end_away='00:12:36.6',
+        home_media_id='home-media', away_media_id='away-media',
+        home_media_call_letters='YES', away_media_call_letters='NESN',
+        home_media_state='MEDIA_ARCHIVE', away_media_state='MEDIA_ARCHIVE',
+        correct_call=correct, batter_id=rng.randint(1, 900), pitcher_id=rng.randint(1, 900),
+        umpire_id=rng.randint(1, 90), catcher_id=rng.randint(1, 900),
+        x_miss=0 if correct else rng.uniform(0, 0.3), y_miss=0 if correct else rng.uniform(0, 0.3),
+        total_miss=None if correct else rng.uniform(0, 0.4),
+        total_miss_in=None if correct else round(rng.uniform(0, 5), 2),
+        blown_strikeout=not correct and code == 'C' and rng.random() < 0.1,
+        home_away_benefit=benefit,
+        team_benefit_id={'home': 147, 'away': 111}.get(benefit),
+        team_hurt_id={'home': 111, 'away': 147}.get(benefit),
+    )
+
+def synthetic_game(game_id, n=300, seed=0):
+    rng = random.Random(seed + game_id)
+    return [synthetic_pitch(i, game_id, rng) for i in range(n)]
+
+def synthetic_game_row(game_id, pitches, umpire_id):
+    calls = [p for p in pitches if p.correct_call is not None]
+    correct = sum(p.correct_call for p in calls)
+    return Game(
+        id=game_id, home_team='NYY', away_team='BOS', game_date=pitches[0].game_date, game_type='R',
+        correct_calls=correct, incorrect_calls=len(calls) - correct, total_calls=len(calls),
+        calls_benefit_home=sum(p.home_away_benefit == 'home' for p in calls),
+        calls_benefit_away=sum(p.home_away_benefit == 'away' for p in calls),
+        correct_call_rate=correct * 100 / len(calls), umpire_name='Synthetic Umpire', umpire_id=umpire_id,
+        home_team_id=147, away_team_id=111,
+        home_media_id=None, away_media_id=None, home_media_call_letters=None, away_media_call_letters=None,
+        home_media_state=None, away_media_state=None, first_pitch_datetime_start=None,
+        first_pitch_start_seconds_home=None, first_pitch_start_seconds_away=None,
+    )
+
+def synthetic_call(rng):
+    """A called pitch dict and its pitchData.coordinates for scoring, with a
+    few trajectories missing or unsolvable to exercise the fallbacks."""
+    coordinates = {
+        'x0': rng.uniform(-3, 3), 'y0': 50.0, 'z0': rng.uniform(5, 6.5),
+        'vX0': rng.uniform(-10, 10), 'vY0': rng.uniform(-140, -110), 'vZ0': rng.uniform(-10, 2),
+        'aX': rng.uniform(-20, 20), 'aY': rng.uniform(20, 35), 'aZ': rng.uniform(-35, -10),
+    }
+    kind = rng.random()
+    if kind < 0.03:
+        coordinates['aZ'] = None
+    elif kind < 0.05:
+        coordinates['aY'] = 0.0
+    elif kind < 0.07:
+        coordinates['vY0'] = 5.0
+    pitch = {
+        'px': rng.uniform(-1.5, 1.5), 'pz': rng.uniform(0.5, 4.5),
+        'sz_top': rng.uniform(3.2, 3.6), 'sz_bottom': rng.uniform(1.5, 1.7),
+        'code': rng.choice('BC'), 'balls': rng.randint(0, 3), 'strikes': rng.randint(0, 2),
+        'inning_half': rng.choice(['top', 'bottom']),
+        'abs_challenge_overturned': rng.random() < 0.02,
+    }
+    return pitch, coordinates
+
+#%% Legacy paths
+
+def legacy_add_pitches(game_data, play_indices=None):
+    """umpire-auditor.py's add_pitches() before feed_parser, kept verbatim
+    for comparison."""
+    # play_indices limits parsing to the plays a live diff touched; media
+    # offsets still come from the game's first pitch.
+    from catcher_timeline import is_catcher_substitution
+    from feed_parser import TIME_FORMAT_MS, convert_timedelta
+    from scoring import set_trajectory, assign_call_metrics
+
+    game_pitches = []
+    game_ejections = []
+
+    all_plays = game_data['allPlays']
+    start_time_home = game_data['start_time_home']
+    start_time_away = game_data['start_time_away']
+    home_media_id = game_data['home_media_id']
+    away_media_id = game_data['away_media_id']
+    home_media_call_letters = game_data['home_media_call_letters']
+    away_media_call_letters = game_data['away_media_call_letters']
+    home_media_state = game_data['home_media_state']
+    away_media_state = game_data['away_media_state']
+    home_catchers = game_data['home_catchers']
+    away_catchers = game_data['away_catchers']
+
+    first_pitch_datetime_start = None
+    first_pitch_start_seconds_home = None
+    first_pitch_start_seconds_away = None
+
+    for play in all_plays:
+        play_events = play['playEvents']
+        play_pitches = [event for event in play_events if event['isPitch']]
+        if len(play_pitches) > 0:
+            first_pitch_datetime_start = datetime.strptime(play_pitches[0]['startTime'], TIME_FORMAT_MS)
+            first_pitch_start_seconds_home = (first_pitch_datetime_start - start_time_home).seconds if start_time_home else None
+            first_pitch_start_seconds_away = (first_pitch_datetime_start - start_time_away).seconds if start_time_away else None
+            break
+
+    game_media = {
+        "home_media_id": home_media_id,
+        "away_media_id": away_media_id,
+        "home_media_call_letters": home_media_call_letters,
+        "away_media_call_letters": away_media_call_letters,
+        "home_media_state": home_media_state,
+        "away_media_state": away_media_state,
+        "first_pitch_datetime_start": first_pitch_datetime_start,
+        "first_pitch_start_seconds_home": first_pitch_start_seconds_home,
+        "first_pitch_start_seconds_away": first_pitch_start_seconds_away
+    }
+
+    for play_index, play in enumerate(all_plays):
+        play_events = play['playEvents']
+        parsed = play_indices is None or play_index in play_indices
+
+        # Ejections must be scanned at the play level, not inside the pitch
+        # loop below. The pitch loop skips plays whose pitches are not called
+        # balls/strikes (e.g. fouls, balls in play), which would silently drop
+        # any ejection that occurred during such a play. Catcher changes are
+        # taken from every play, parsed or not, as a live diff's pitches can
+        # follow a change made in an earlier play.
+        for event in play_events:
+            if is_catcher_substitution(event):
+                home_catchers.add_event(event)
+                away_catchers.add_event(event)
+
+            if not parsed:
+                continue
+
+            try:
+                if event['details']['eventType'] == 'ejection':
+                    start_time = datetime.strptime(event['startTime'], TIME_FORMAT_MS)
+
+                    ejection = {
+                        'description': event['details']['description'],
+                        'timestamp_start_home': convert_timedelta(start_time - start_time_home) if start_time_home else None,
+                        'timestamp_start_away': convert_timedelta(start_time - start_time_away) if start_time_away else None,
+                        'start_seconds_home': (start_time - start_time_home).seconds if start_time_home else None,
+                        'start_seconds_away': (start_time - start_time_away).seconds if start_time_away else None,
+                        'player_id': event['player']['id'],
+                        'umpire_id': event['umpire']['id'],
+                        'home_media_id': home_media_id,
+                        'away_media_id': away_media_id
+                    }
+
+                    game_ejections.append(ejection)
+            except KeyError:
+                pass
+
+        if not parsed:
+            continue
+
+        if not 'description' in play['result']:
+            continue
+
+        description = play['result']['description']
+        inning = play['about']['inning']
+        inning_half = play['about']['halfInning']
+        outs = play['count']['outs']
+        batter_hand = play['matchup']['batSide']['code']
+        ## WHAT HAPPENS WHEN THERE'S A MID ATBAT PITCHER CHANGE?
+        batter_id = play['matchup']['batter']['id']
+        pitcher_id = play['matchup']['pitcher']['id']
+        pitches = [event for event in play_events if event['isPitch']]
+        counts = [{'balls': 0, 'strikes': 0}] + [pitch['count'] for pitch in pitches]
+        codes = [pitch['details']['code'] for pitch in pitches]
+        review_details = [pitch.get('reviewDetails') for pitch in pitches]
+        ids = [pitch['playId'] for pitch in pitches]
+        start_times = [datetime.strptime(pitch['startTime'], TIME_FORMAT_MS) for pitch in pitches]
+        end_times = [datetime.strptime(pitch['endTime'], TIME_FORMAT_MS) if "endTime" in pitch else None for pitch in pitches]
+        pitches_data = [pitch['pitchData'] for pitch in pitches]
+        for i, row in enumerate(pitches_data):
+#             if codes[i] == 'X' or codes[i] == 'V' or codes[i] == '*B':
+#                 continue
+
+            if codes[i] != 'B' and codes[i] != 'C':
+                continue
+
+            if not 'pX' in row['coordinates']:
+                continue
+
+            pitch_start_time = start_times[i]
+
+            pitch = {
+                "id": ids[i],
+                "play_description": description,
+                "inning": inning,
+                "inning_half": inning_half,
+                "outs": outs,
+                "bat_side": batter_hand,
+                "sz_top": row['strikeZoneTop'],
+                "sz_bottom": row['strikeZoneBottom'],
+                "px": row['coordinates']['pX'],
+                "pz": row['coordinates']['pZ'],
+                "code": codes[i],
+                "strikes": counts[i]['strikes'],
+                'balls': counts[i]['balls'],
+                'datetime_start': pitch_start_time,
+                'timestamp_start_home': convert_timedelta(start_times[i] - start_time_home) if start_time_home else None,
+                'timestamp_start_away': convert_timedelta(start_times[i] - start_time_away) if start_time_away else None,
+                'start_seconds_home': (start_times[i] - start_time_home).seconds if start_time_home else None,
+                'start_seconds_away': (start_times[i] - start_time_away).seconds if start_time_away else None,
+                'batter_id': batter_id,
+                'pitcher_id': pitcher_id,
+                'catcher_id': None,
+                'home_media_id': home_media_id,
+                'away_media_id': away_media_id,
+                'home_media_call_letters': home_media_call_letters,
+                'away_media_call_letters': away_media_call_letters,
+                'home_media_state': home_media_state,
+                'away_media_state': away_media_state
+            }
+
+            if end_times[i]:
+                pitch['timestamp_end_home'] = convert_timedelta(end_times[i] - start_time_home) if start_time_home else None
+                pitch['timestamp_end_away'] = convert_timedelta(end_times[i] - start_time_away) if start_time_away else None
+
+            # ABS Challenge tracking
+            rd = review_details[i]
+            if rd and rd.get('reviewType') == 'MJ':
+                pitch['is_abs_challenge'] = True
+                pitch['abs_challenge_overturned'] = rd.get('isOverturned', False)
+                pitch['abs_challenge_team_id'] = rd.get('challengeTeamId')
+                pitch['abs_challenge_player_id'] = rd['player']['id'] if 'player' in rd else None
+
+                # If overturned, flip the code back to the original umpire call
+                # so correct_call evaluates against what the umpire actually called
+                if pitch['abs_challenge_overturned']:
+                    pitch['code'] = 'C' if pitch['code'] == 'B' else 'B'
+
+            set_trajectory(pitch, row['coordinates'])
+            assign_call_metrics(pitch, pitch_start_time, inning_half)
+
+            game_pitches.append(pitch)
+
+        # Fill missing ABS challenge data from play-level reviewDetails.
+        # The MLB API sometimes omits reviewDetails on individual pitch events
+        # but includes it on the play (at-bat) object itself.
+        play_rd = play.get('reviewDetails')
+        if play_rd and play_rd.get('reviewType') == 'MJ' and game_pitches:
+            last_pitch = game_pitches[-1]
+            if not last_pitch.get('is_abs_challenge') and last_pitch.get('play_description') == description:
+                last_pitch['is_abs_challenge'] = True
+                last_pitch['abs_challenge_overturned'] = play_rd.get('isOverturned', False)
+                last_pitch['abs_challenge_team_id'] = play_rd.get('challengeTeamId')
+                last_pitch['abs_challenge_player_id'] = play_rd['player']['id'] if 'player' in play_rd else None
+
+                # If overturned, flip code back to umpire's original call
+                if last_pitch['abs_challenge_overturned']:
+                    last_pitch['code'] = 'C' if last_pitch['code'] == 'B' else 'B'
+
+                # Recalculate correctness and miss distances (front + midline)
+                # with the updated code. Trajectory was already set on the
+                # main path, so px_mid/pz_mid are present.
+                assign_call_metrics(last_pitch, last_pitch['datetime_start'], inning_half)
+
+    # Catchers are looked up once every substitution in the feed is known.
+    for pitch in game_pitches:
+        catchers = home_catchers if pitch['inning_half'] == 'top' else away_catchers
+        pitch['catcher_id'] = catchers[pitch['datetime_start']]
+
+    game_pitch_data = {'game_pitches': game_pitches, 'game_ejections': game_ejections, 'game_media': game_media}
+    return game_pitch_data
+
+
+def legacy_catcher_interval(starting_id, player_ids, subs):
+    """The portion IntervalDict gen_catcher_interval() built before
+    catcher_timeline, kept for comparison (needs portion)."""
+    import portion as P
+
+    catcher_interval = P.IntervalDict()
+    catcher_interval[P.closed(datetime.min, datetime.max)] = starting_id
+
+    for catcher_sub in subs:
+        catcher_sub_id = catcher_sub['player']['id']
+
+        if catcher_sub_id in player_ids:
+            start_datetime = datetime.strptime(catcher_sub['startTime'], '%Y-%m-%dT%H:%M:%S.%fZ')
+            catcher_interval[P.closed(start_datetime, datetime.max)] = catcher_sub_id
+
+    return catcher_interval
+
+def legacy_upsert_query(table_name, rows, dc, conflict=('id',)):
+    """The pre-COPY dataclass_upsert_query, kept for comparison; only the
+    conflict target is parameterised, for the partitioned pitch table."""
+    from pypika import PostgreSQLQuery, Table
+
+    dc_fields = [field.name for field in dataclasses.fields(dc)]
+    dc_values = [row.get_values() for row in rows]
+
+    q = PostgreSQLQuery.into(Table(table_name))\
+        .columns(*dc_fields)\
+        .insert(*dc_values)\
+        .on_conflict(*conflict)
+
+    for i, field in enumerate(dc_fields):
+        q = q.do_update(field, dc_values[0][i])
+
+    return str(q)
+
+#%% Benchmarks
+
+def bench_upsert(args):
+    import psycopg
+    import db
+
+    failures = 0
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        cur = conn.cursor()
+
+        for games in args.games:
+            rows = [p for g in range(1, games + 1) for p in synthetic_game(-g, args.pitches)]
+            game_ids = list(range(-games, 0))
+
+            cur.execute('DELETE FROM pitch WHERE game_id = ANY(%s)', [game_ids])
+            start = time.perf_counter()
+            for g in game_ids:
+                game_rows = [p for p in rows if p.game_id == g]
+                cur.execute(';'.join(legacy_upsert_query('pitch', [p], Pitch, db.PITCH_CONFLICT) for p in game_rows))
+            legacy = time.perf_counter() - start
+            legacy_rows = cur.execute('SELECT count(*) FROM pitch WHERE game_id = ANY(%s)', [game_ids]).fetchone()[0]
+
+            cur.execute('DELETE FROM pitch WHERE game_id = ANY(%s)', [game_ids])
+            start = time.perf_counter()
+            for g in game_ids:
+                db.bulk_upsert(cur, 'pitch', [p for p in rows if p.game_id == g], Pitch, conflict=db.PITCH_CONFLICT)
+            bulk = time.perf_counter() - start
+            bulk_rows = cur.execute('SELECT count(*) FROM pitch WHERE game_id = ANY(%s)', [game_ids]).fetchone()[0]
+
+            cur.execute('DELETE FROM pitch WHERE game_id = ANY(%s)', [game_ids])
+
+            ok = legacy_rows == bulk_rows == len(rows)
+            failures += not ok
+            print(f'{"  ok  " if ok else "FAIL  "}{games} games x {args.pitches} pitches: '
+                  f'legacy {len(rows) / legacy:,.0f} rows/s, copy {len(rows) / bulk:,.0f} rows/s '
+                  f'({legacy / bulk:.1f}x)')
+
+    return failures
+
+def migration_statements(name):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations', name)
+    with open(path) as f:
+        body = '\n'.join(line for line in f if not line.strip().startswith('--'))
+    return [stmt.strip() for stmt in body.split(';') if stmt.strip()]
+
+# ~150 called pitches a game, 15 games a day, 162 days a season.
+SYNTHETIC_PITCHES_QUERY = """
+INSERT INTO pitch (id, game_id, game_date, umpire_id, code, px, pz, px_mid, pz_mid,
+                   correct_call, correct_call_front, blown_strikeout, total_miss, total_miss_in)
+SELECT
+    'synthetic-' || g,
+    game,
+    make_date(2022 + game / 2430, 4, 1) + mod(game, 2430) / 15,
+    1 + mod(game, 90),
+    CASE WHEN r < 0.5 THEN 'B' ELSE 'C' END,
+    r * 3 - 1.5, r * 4 + 0.5,
+    CASE WHEN game / 2430 >= 4 THEN r * 3 - 1.5 END,
+    CASE WHEN game / 2430 >= 4 THEN r * 4 + 0.5 END,
+    miss >= 0.07,
+    miss >= 0.07 OR miss < 0.005,
+    miss < 0.004,
+    CASE WHEN miss < 0.07 THEN miss * 5 END,
+    CASE WHEN miss < 0.07 THEN round((miss * 60)::numeric, 2) END
+FROM (
+    SELECT g, g / 150 AS game, random() AS r, random() AS miss
+    FROM generate_series(0, %(rows)s - 1) AS g
+) s
+"""
+
+INDEX_ACCESS_PATHS = [
+    ('ghost cull by game_id',
+     'SELECT id FROM pitch WHERE game_id = %(game_id)s'),
+    ('midline population by season',
+     "SELECT count(*) FILTER (WHERE px_mid IS NOT NULL), count(*) FROM pitch WHERE game_date >= %(season_start)s"),
+    ('midline flip rate by season',
+     "SELECT count(*) FILTER (WHERE correct_call IS DISTINCT FROM correct_call_front), count(*) "
+     "FROM pitch WHERE game_date >= %(season_start)s AND correct_call_front IS NOT NULL"),
+    ('umpire over a date range',
+     'SELECT count(*) FILTER (WHERE correct_call), count(*) FROM pitch '
+     'WHERE umpire_id = %(umpire_id)s AND game_date BETWEEN %(range_start)s AND %(range_end)s'),
+    ('worst incorrect calls',
+     'SELECT id, total_miss FROM pitch WHERE correct_call = false ORDER BY total_miss DESC NULLS LAST LIMIT 20'),
+    ('worst blown strikeouts',
+     'SELECT id, total_miss FROM pitch WHERE blown_strikeout = true ORDER BY total_miss DESC NULLS LAST LIMIT 20'),
+]
+
+def plan_nodes(plan):
+    yield plan['Node Type'] + (f" ({plan['Index Name']})" if 'Index Name' in plan else '')
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+def explain(cur, query, params, repeat):
+    times = []
+    for _ in range(repeat):
+        cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + query, params)
+        result = cur.fetchone()[0][0]
+        times.append(result['Execution Time'])
+    plan = result['Plan']
+    buffers = plan['Shared Hit Blocks'] + plan['Shared Read Blocks']
+    scans = [node for node in plan_nodes(plan) if 'Scan' in node]
+    rows = cur.execute(query, params).fetchall()
+    return statistics.median(times), buffers, scans, rows
+
+def bench_indexes(args):
+    import psycopg
+
+    failures = 0
+    seasons = args.rows // (150 * 2430) + 1
+    params = {
+        'game_id': args.rows // 300,
+        'season_start': datetime(2022 + seasons - 1, 1, 1),
+        'umpire_id': 7,
+        'range_start': datetime(2022 + seasons - 1, 5, 1),
+        'range_end': datetime(2022 + seasons - 1, 5, 31),
+    }
+
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute('DROP SCHEMA IF EXISTS bench_indexes CASCADE')
+        cur.execute('CREATE SCHEMA bench_indexes')
+        cur.execute('CREATE TABLE bench_indexes.pitch (LIKE public.pitch INCLUDING DEFAULTS)')
+        # Unqualified `pitch` (including in the migration) now means the copy.
+        cur.execute('SET search_path = bench_indexes, public')
+
+        try:
+            start = time.perf_counter()
+            cur.execute('SELECT setseed(%s)', [args.seed])
+            cur.execute(SYNTHETIC_PITCHES_QUERY, {'rows': args.rows})
+            cur.execute('VACUUM ANALYZE pitch')
+            print(f'loaded {args.rows:,} synthetic pitches ({seasons} season(s)) in {time.perf_counter() - start:.1f}s')
+
+            before = [explain(cur, query, params, args.repeat) for _, query in INDEX_ACCESS_PATHS]
+
+            start = time.perf_counter()
+            for stmt in migration_statements('2026_add_pitch_read_indexes.sql'):
+                cur.execute(stmt)
+            cur.execute('VACUUM ANALYZE pitch')
+            print(f'built indexes in {time.perf_counter() - start:.1f}s')
+
+            after = [explain(cur, query, params, args.repeat) for _, query in INDEX_ACCESS_PATHS]
+
+            for (name, _), b, a in zip(INDEX_ACCESS_PATHS, before, after):
+                ok = b[3] == a[3]
+                failures += not ok
+                print(f'{"  ok  " if ok else "FAIL  "}{name}: {b[0]:.2f} ms / {b[1]} buffers -> '
+                      f'{a[0]:.2f} ms / {a[1]} buffers ({b[0] / max(a[0], 1e-3):.0f}x) via {", ".join(a[2])}')
+        finally:
+            cur.execute('DROP SCHEMA bench_indexes CASCADE')
+
+    return failures
+
+SEASON_QUERY = (
+    'SELECT count(*) FILTER (WHERE correct_call), count(*), round(avg(total_miss_in)::numeric, 6) '
+    'FROM {} WHERE game_date >= %(start)s AND game_date < %(end)s'
+)
+
+def scanned_relations(plan):
+    relations = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        relations |= scanned_relations(child)
+    return relations
+
+def churn(stop, conninfo, seasons):
+    """Update, delete and insert pitches on the unpartitioned table until
+    stop is set, as the updater would during the migration."""
+    import psycopg
+
+    rng = random.Random(1)
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute('SET search_path = bench_partition, public')
+        i = 0
+        while not stop.is_set():
+            game = rng.randrange(seasons * 2430)
+            cur.execute('UPDATE pitch SET total_miss = random() WHERE game_id = %s', [game])
+            cur.execute("DELETE FROM pitch WHERE id = %s", [f'synthetic-{game * 150}'])
+            cur.execute(
+                "INSERT INTO pitch (id, game_id, game_date, correct_call) "
+                "SELECT %s, game_id, game_date, false FROM pitch WHERE game_id = %s LIMIT 1",
+                [f'churn-{i}', game])
+            i += 1
+    return i
+
+def bench_partition(args):
+    import threading
+
+    import psycopg
+    import db
+    import partition_pitch
+
+    failures = 0
+
+    def check(ok, msg):
+        nonlocal failures
+        failures += not ok
+        print(("  ok  " if ok else "FAIL  ") + msg)
+
+    conninfo = os.environ['DB_URL']
+    seasons = args.rows // (150 * 2430) + 1
+    last = 2022 + seasons - 1
+    season = {'start': datetime(last, 1, 1), 'end': datetime(last + 1, 1, 1)}
+
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute('DROP SCHEMA IF EXISTS bench_partition CASCADE')
+        cur.execute('CREATE SCHEMA bench_partition')
+        cur.execute('CREATE TABLE bench_partition.pitch (LIKE public.pitch INCLUDING DEFAULTS, UNIQUE (id))')
+        cur.execute('SET search_path = bench_partition, public')
+
+        try:
+            cur.execute('SELECT setseed(%s)', [args.seed])
+            cur.execute(SYNTHETIC_PITCHES_QUERY, {'rows': args.rows})
+            cur.execute('CREATE INDEX pitch_game_id_index ON pitch (game_id)')
+            cur.execute('CREATE INDEX pitch_game_date_index ON pitch (game_date)')
+            cur.execute('VACUUM ANALYZE pitch')
+            print(f'loaded {args.rows:,} synthetic pitches ({seasons} season(s))')
+
+            before = explain(cur, SEASON_QUERY.format('pitch'), season, args.repeat)
+
+            stop = threading.Event()
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                writes = executor.submit(churn, stop, conninfo, seasons)
+                start = time.perf_counter()
+                partition_pitch.migrate(conn, args.chunk_days, do_swap=False)
+                stop.set()
+                print(f'copied with {writes.result()} concurrent writer rounds in {time.perf_counter() - start:.1f}s')
+
+            partition_pitch.swap(conn)
+            cur.execute('SET search_path = bench_partition, public')
+
+            cur.execute('SELECT count(*) FROM (SELECT * FROM pitch EXCEPT ALL SELECT * FROM pitch_unpartitioned) d')
+            missing_old = cur.fetchone()[0]
+            cur.execute('SELECT count(*) FROM (SELECT * FROM pitch_unpartitioned EXCEPT ALL SELECT * FROM pitch) d')
+            missing_new = cur.fetchone()[0]
+            check(missing_old == missing_new == 0,
+                  f'partitioned rows match the original ({missing_new} missing, {missing_old} extra)')
+            check(db.is_partitioned(cur, 'pitch'), 'pitch is partitioned')
+
+            cur.execute('VACUUM ANALYZE pitch')
+            after = explain(cur, SEASON_QUERY.format('pitch'), season, args.repeat)
+            original = cur.execute(SEASON_QUERY.format('pitch_unpartitioned'), season).fetchall()
+            cur.execute('EXPLAIN (FORMAT JSON) ' + SEASON_QUERY.format('pitch'), season)
+            scanned = scanned_relations(cur.fetchone()[0][0]['Plan'])
+            check(scanned == {db.season_partition_name(last)}, f'{last} query scans {sorted(scanned)}')
+            check(after[3] == original,
+                  f'{last} season query: {before[0]:.2f} ms / {before[1]} buffers -> '
+                  f'{after[0]:.2f} ms / {after[1]} buffers')
+
+            created = db.ensure_season_partitions(cur, [last + 5])
+            rows = synthetic_game(-1, 10)
+            for p in rows:
+                p.game_date = f'{last + 5}-06-01'
+            db.bulk_upsert(cur, 'pitch', rows, Pitch, conflict=db.PITCH_CONFLICT)
+            db.bulk_upsert(cur, 'pitch', rows, Pitch, conflict=db.PITCH_CONFLICT)
+            cur.execute('SELECT count(*) FROM {} WHERE game_id = -1'.format(db.season_partition_name(last + 5)))
+            check(created == [last + 5] and cur.fetchone()[0] == len(rows),
+                  f'pitch upserts land in the new {last + 5} partition')
+        finally:
+            cur.execute('DROP SCHEMA bench_partition CASCADE')
+
+    return failures
+
+def write_synthetic_game(conn, game_row, pitches):
+    """The updater's per-game write sequence, summaries included."""
+    import db
+    import summaries
+
+    with conn.transaction():
+        cur = conn.cursor()
+        start = time.perf_counter()
+        before = summaries.game_contribution(conn, game_row.id)
+        upkeep = time.perf_counter() - start
+        db.upsert_rows(cur, 'game', [game_row], Game)
+        db.bulk_upsert(cur, 'pitch', pitches, Pitch, conflict=db.PITCH_CONFLICT)
+        cur.execute('DELETE FROM pitch WHERE game_id = %s AND NOT (id = ANY(%s))',
+                    [game_row.id, [p.id for p in pitches]])
+        start = time.perf_counter()
+        summaries.apply_game_delta(conn, before, summaries.game_contribution(conn, game_row.id))
+        return upkeep + time.perf_counter() - start
+
+def bench_summaries(args):
+    import psycopg
+    import summaries
+
+    failures = 0
+    rng = random.Random(args.seed)
+
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute('DROP SCHEMA IF EXISTS bench_summaries CASCADE')
+        cur.execute('CREATE SCHEMA bench_summaries')
+        cur.execute('CREATE TABLE bench_summaries.game (LIKE public.game INCLUDING ALL)')
+        cur.execute('CREATE TABLE bench_summaries.pitch (LIKE public.pitch INCLUDING DEFAULTS, UNIQUE (id, game_date))')
+        cur.execute('CREATE INDEX ON bench_summaries.pitch (game_id)')
+        for summary in summaries.SUMMARIES:
+            cur.execute(f'CREATE TABLE bench_summaries.{summary.table} (LIKE public.{summary.table} INCLUDING ALL)')
+        cur.execute('SET search_path = bench_summaries, public')
+
+        try:
+            games = {}
+            first = second = 0.0
+            start = time.perf_counter()
+            for g in range(1, args.games + 1):
+                pitches = synthetic_game(-g, args.pitches, int(args.seed))
+                games[-g] = pitches
+                first += write_synthetic_game(conn, synthetic_game_row(-g, pitches, 1 + g % 20), pitches)
+            written = time.perf_counter() - start
+
+            # Rewrite every game with flipped calls, dropped pitches and, for
+            # some, a different umpire, so old contributions are subtracted.
+            for game_id, pitches in games.items():
+                kept = [p for p in pitches if rng.random() > 0.05]
+                for p in rng.sample(kept, len(kept) // 20):
+                    p.correct_call = not p.correct_call
+                    p.blown_strikeout = not p.correct_call and p.code == 'C'
+                umpire_id = 1 + (-game_id) % 20 if rng.random() > 0.2 else 100 + (-game_id) % 5
+                second += write_synthetic_game(conn, synthetic_game_row(game_id, kept, umpire_id), kept)
+
+            mismatches = summaries.check(conn)
+            for table, key, have, want in mismatches[:10]:
+                print(f'      {table} {key}: stored {have}, expected {want}')
+            ok = not mismatches
+            failures += not ok
+            print(f'{"  ok  " if ok else "FAIL  "}incremental summaries match a rebuild after '
+                  f'{args.games} games written twice ({len(mismatches)} differences)')
+
+            per_game = (first + second) / (2 * args.games) * 1000
+            print(f'summary upkeep {per_game:.2f} ms per game write '
+                  f'({per_game / (written / args.games * 1000):.0%} of a first write)')
+
+            for summary in summaries.SUMMARIES:
+                start = time.perf_counter()
+                summaries.stored(cur, summary)
+                read = time.perf_counter() - start
+                start = time.perf_counter()
+                summaries.recomputed(cur, summary)
+                scan = time.perf_counter() - start
+                print(f'{summary.table}: summary read {read * 1000:.1f} ms, '
+                      f'aggregate over pitch/game {scan * 1000:.1f} ms ({scan / read:.0f}x)')
+        finally:
+            cur.execute('DROP SCHEMA bench_summaries CASCADE')
+
+    return failures
+
+SCORED_COLUMNS = ['px_mid', 'pz_mid'] + [
+    f'{name}{suffix}' for name in ['correct_call', 'x_miss', 'y_miss', 'total_miss', 'total_miss_in']
+    for suffix in ('', '_front')]
+
+# The flags _apply_benefit_flags() sets; the team columns are add_game_data()'s.
+FLAG_COLUMNS = ['home_away_benefit', 'player_type_benefit', 'blown_walk', 'blown_strikeout', 'possible_bad_data']
+
+def same(scalar, vector):
+    if scalar is None:
+        return vector is None or vector != vector
+    return scalar == vector
+
+def bench_scoring(args):
+    import numpy as np
+    import scoring
+
+    failures = 0
+    rng = random.Random(args.seed)
+
+    for n in args.pitches:
+        calls = [synthetic_call(rng) for _ in range(n)]
+        years = [rng.choice([2025, 2026]) for _ in range(n)]
+        pitches = [dict(pitch) for pitch, _ in calls]
+
+        start = time.perf_counter()
+        for pitch, (_, coordinates), year in zip(pitches, calls, years):
+            scoring.set_trajectory(pitch, coordinates)
+            scoring.assign_call_metrics(pitch, datetime(year, 6, 1), pitch['inning_half'])
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns = scoring.columns_from_pitches(pitches, years)
+        converted = time.perf_counter() - start
+        start = time.perf_counter()
+        scored = scoring.score_columns(columns)
+        vector = time.perf_counter() - start
+
+        for name in ('inning_half', 'home_team', 'away_team', 'home_team_id', 'away_team_id'):
+            columns[name] = np.array([p.get(name) for p in pitches], dtype=object)
+        columns['balls'] = np.array([p['balls'] for p in pitches])
+        columns['strikes'] = np.array([p['strikes'] for p in pitches])
+        scored.update(scoring.benefit_columns(columns, scored['correct_call'], scored['total_miss_in']))
+
+        mismatches = [
+            (i, name, pitch[name], scored[name][i])
+            for i, pitch in enumerate(pitches) for name in SCORED_COLUMNS + FLAG_COLUMNS
+            if not same(pitch[name], scored[name][i])
+        ]
+        for i, name, want, have in mismatches[:5]:
+            print(f'      pitch {i} {name}: scalar {want!r}, batch {have!r}')
+        ok = not mismatches
+        failures += not ok
+        print(f'{"  ok  " if ok else "FAIL  "}{n:,} pitches: scalar {n / scalar:,.0f} pitches/s, '
+              f'batch {n / vector:,.0f} pitches/s ({scalar / vector:.0f}x; '
+              f'{n / (vector + converted):,.0f}/s including column build), {len(mismatches)} mismatches')
+
+    return failures
+
+RESCORE_PITCH_COLUMNS = [
+    'id', 'game_id', 'game_date', 'batter_id', 'pitcher_id', 'home_team', 'away_team', 'home_team_id', 'away_team_id',
+    'inning_half', 'balls', 'strikes', 'code', 'px', 'pz', 'sz_top', 'sz_bottom', 'abs_challenge_overturned',
+    'traj_x0', 'traj_y0', 'traj_z0', 'traj_vx0', 'traj_vy0', 'traj_vz0', 'traj_ax', 'traj_ay', 'traj_az',
+    'px_mid', 'pz_mid', 'correct_call', 'x_miss', 'y_miss', 'total_miss', 'total_miss_in',
+    'correct_call_front', 'x_miss_front', 'y_miss_front', 'total_miss_front', 'total_miss_in_front',
+    'home_away_benefit', 'player_type_benefit', 'team_benefit', 'team_benefit_id', 'team_hurt', 'team_hurt_id',
+    'blown_walk', 'blown_strikeout', 'possible_bad_data',
+]
+
+def scored_synthetic_games(games, pitches, rng):
+    """Pitch dicts scored by the updater's scalar path, over 2025 and 2026
+    games."""
+    import scoring
+
+    rows = []
+    for g in range(1, games + 1):
+        year = 2025 + g % 2
+        for i in range(pitches):
+            pitch, coordinates = synthetic_call(rng)
+            pitch.update(id=f'rescore-{g}-{i}', game_id=-g, game_date=f'{year}-06-{1 + g % 28:02d}',
+                         batter_id=600000 + i % 9, pitcher_id=500000 + g % 30,
+                         home_team='NYY', away_team='BOS', home_team_id=147, away_team_id=111)
+            scoring.set_trajectory(pitch, coordinates)
+            scoring.assign_call_metrics(pitch, datetime(year, 6, 1), pitch['inning_half'])
+            # As add_game_data().
+            if pitch['home_away_benefit'] is not None:
+                home = pitch['home_away_benefit'] == 'home'
+                pitch['team_benefit'], pitch['team_hurt'] = ('NYY', 'BOS') if home else ('BOS', 'NYY')
+                pitch['team_benefit_id'], pitch['team_hurt_id'] = (147, 111) if home else (111, 147)
+            rows.append(tuple(pitch.get(c) for c in RESCORE_PITCH_COLUMNS))
+    return rows
+
+def bench_rescore(args):
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    import rescore
+    import summaries
+
+    failures = 0
+
+    def check(ok, msg):
+        nonlocal failures
+        failures += not ok
+        print(("  ok  " if ok else "FAIL  ") + msg)
+
+    conninfo = make_conninfo(os.environ['DB_URL'], options='-c search_path=bench_rescore,public')
+    span = {'start': datetime(2025, 1, 1).date(), 'end': datetime(2026, 12, 31).date()}
+
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        conn.execute('DROP SCHEMA IF EXISTS bench_rescore CASCADE')
+        conn.execute('CREATE SCHEMA bench_rescore')
+
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute('CREATE TABLE game (LIKE public.game INCLUDING ALL)')
+            cur.execute('CREATE TABLE pitch (LIKE public.pitch INCLUDING DEFAULTS, UNIQUE (id, game_date))')
+            cur.execute('CREATE INDEX ON pitch (game_id)')
+            for summary in summaries.SUMMARIES:
+                cur.execute(f'CREATE TABLE {summary.table} (LIKE public.{summary.table} INCLUDING ALL)')
+
+            rows = scored_synthetic_games(args.games, args.pitches, random.Random(args.seed))
+            with cur.copy(f'COPY pitch ({", ".join(RESCORE_PITCH_COLUMNS)}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cur.execute('INSERT INTO game (id, game_date, umpire_id, home_team_id, away_team_id) '
+                        'SELECT DISTINCT game_id, game_date, 1 + mod(-game_id, 7), 147, 111 FROM pitch')
+
+            def settle():
+                # Counts and summaries as the updater would have left them.
+                for game_id, in cur.execute('SELECT id FROM game').fetchall():
+                    summaries.refresh_game_counts(cur, game_id)
+                summaries.rebuild(conn)
+
+            settle()
+            counts = cur.execute('SELECT id, correct_calls, incorrect_calls FROM game ORDER BY id').fetchall()
+
+            scanned, changed, _, _ = rescore.rescore(conninfo, span['start'], span['end'], log=lambda _: None)
+            check(scanned == len(rows) and changed == 0,
+                  f'rescoring {scanned:,} scalar-scored pitches changes {changed} of them')
+
+            # Rows left behind by an older rule: flipped calls and lost misses.
+            cur.execute("UPDATE pitch SET correct_call = NOT correct_call, total_miss = NULL, "
+                        "home_away_benefit = NULL WHERE mod(abs(hashtext(id)), 100) = 0")
+            stale = cur.rowcount
+            settle()
+
+            start = time.perf_counter()
+            scanned, changed, games, per_column = rescore.rescore(
+                conninfo, span['start'], span['end'], chunk_size=args.chunk_size, log=lambda _: None)
+            elapsed = time.perf_counter() - start
+            check(changed == stale, f'rescore rewrote {changed} of {stale} stale pitches in {games} games '
+                                    f'({scanned / elapsed:,.0f} pitches/s)')
+            check(cur.execute('SELECT id, correct_calls, incorrect_calls FROM game ORDER BY id').fetchall() == counts,
+                  'game call counts restored')
+            mismatches = summaries.check(conn)
+            check(not mismatches, f'season summaries match a rebuild ({len(mismatches)} differences)')
+
+            _, would, _, per_column = rescore.rescore(
+                conninfo, span['start'], span['end'], plane='front', dry_run=True, log=lambda _: None)
+            print(f'      --plane front would change {would:,} pitches '
+                  f'({per_column["correct_call"]:,} calls flipped)')
+        finally:
+            cur.execute('DROP SCHEMA bench_rescore CASCADE')
+
+    return failures
+
+# Only the game-writing path needs these; a tick must not import them up front.
+LAZY_MODULES = ['pandas', 'numpy', 'portion', 'ijson', 'psycopg', 'psycopg_pool']
+
+UPDATER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'umpire-auditor.py')
+
+def import_times(argv, env):
+    """{module: cumulative us} of the top-level imports of a `python -X
+    importtime` run, plus the set of every module imported."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *argv], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top, names = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        names.add(name.strip())
+        if not name[1:].startswith(' '):
+            top[name.strip()] = int(cumulative)
+    return top, names
+
+def bench_startup(args):
+    failures = 0
+
+    def check(ok, msg):
+        nonlocal failures
+        failures += not ok
+        print(("  ok  " if ok else "FAIL  ") + msg)
+
+    # A socket directory that does not exist: any connection attempt fails.
+    env = dict(os.environ, DB_URL='postgresql://postgres@/none?host=/nonexistent&connect_timeout=1')
+
+    runs = [import_times(['-c', 'pass'], env) for _ in range(args.repeat)]
+    interpreter = statistics.median(sum(top.values()) for top, _ in runs)
+    baseline = runs[-1][1]
+    runs = [import_times([UPDATER, '--help'], env) for _ in range(args.repeat)]
+    updater = statistics.median(sum(top.values()) for top, _ in runs) - interpreter
+
+    top, names = runs[-1]
+    own = {name: us for name, us in top.items() if name not in baseline}
+    slowest = ', '.join(f'{name} {us / 1000:.0f} ms' for name, us in sorted(own.items(), key=lambda i: -i[1])[:4])
+    check(updater / 1000 <= args.budget_ms,
+          f'updater imports {updater / 1000:.0f} ms over the bare interpreter (budget {args.budget_ms} ms): {slowest}')
+    loaded = [name for name in LAZY_MODULES if name in names]
+    check(not loaded, f'not imported at startup: {", ".join(LAZY_MODULES)}'
+                      + (f' (imported: {", ".join(loaded)})' if loaded else ''))
+
+    # An offseason day whose (immutable) schedule is already cached: no
+    # network, no database, no games.
+    from feed_cache import FeedCache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        FeedCache(cache_dir).put('schedule', '20260110-20260110', {'dates': []}, final=True)
+        argv = [sys.executable, UPDATER, '-sdate', '2026-01-10', '-edate', '2026-01-10', '--cache-dir', cache_dir]
+
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = subprocess.run(argv, env=env, capture_output=True, text=True)
+            times.append(time.perf_counter() - start)
+            if result.returncode != 0:
+                break
+
+        check(result.returncode == 0,
+              f'no-op tick exits cleanly without connecting: median {statistics.median(times) * 1000:.0f} ms wall'
+              + ('' if result.returncode == 0 else f'\n{result.stderr.strip()}'))
+
+    return failures
+
+def dataframe_call_counts(pitch_list):
+    """The Game call columns as add_game_to_db() computed them with pandas
+    before CallTally, kept verbatim for comparison."""
+    import pandas as pd
+
+    df_pitches = pd.DataFrame(pitch_list)
+    if len(df_pitches) == 0:
+        return dict(correct_calls=None, incorrect_calls=None, total_calls=None,
+                    calls_benefit_home=None, calls_benefit_away=None, correct_call_rate=None)
+
+    incorrect_calls = df_pitches.loc[df_pitches['correct_call'] == False].sort_values(by='total_miss', ascending=False)
+    correct_calls = df_pitches.loc[df_pitches['correct_call'] == True]
+    total_calls = df_pitches.loc[df_pitches['correct_call'].isin([True, False])]
+    correct_call_rate = (len(correct_calls) / len(total_calls)) * 100
+
+    calls_benefit_home = df_pitches.loc[df_pitches['home_away_benefit'] == 'home']
+    calls_benefit_away = df_pitches.loc[df_pitches['home_away_benefit'] == 'away']
+
+    return dict(
+        correct_calls=len(correct_calls), incorrect_calls=len(incorrect_calls), total_calls=len(total_calls),
+        calls_benefit_home=len(calls_benefit_home), calls_benefit_away=len(calls_benefit_away),
+        correct_call_rate=correct_call_rate)
+
+def tallied_call_counts(pitch_list):
+    from game import CallTally
+
+    tally = CallTally()
+    for pitch in pitch_list:
+        tally.add(pitch)
+    return tally.game_fields()
+
+def stored_games(conninfo, n):
+    """The Pitch rows of the n most recent games stored in conninfo."""
+    import psycopg
+
+    names = [field.name for field in dataclasses.fields(Pitch)]
+    with psycopg.connect(conninfo) as conn:
+        game_ids = [row[1] for row in conn.execute(
+            'SELECT DISTINCT game_date, game_id FROM pitch ORDER BY game_date DESC, game_id LIMIT %s', [n]
+        ).fetchall()]
+        cur = conn.execute(f'SELECT game_id, {", ".join(names)} FROM pitch WHERE game_id = ANY(%s)', [game_ids])
+        games = {}
+        for row in cur:
+            games.setdefault(row[0], []).append(Pitch(*row[1:]))
+    return list(games.values())
+
+def bench_tally(args):
+    failures = 0
+    rng = random.Random(args.seed)
+
+    # Uncalled pitches (no correct_call) and uncalled benefit flags mixed in,
+    # plus a game with no pitch tracking at all.
+    games = [
+        [dataclasses.replace(p, correct_call=None, home_away_benefit=None) if rng.random() < 0.1 else p
+         for p in synthetic_game(-game_id, args.pitches, args.seed)]
+        for game_id in range(1, args.games + 1)
+    ] + [[]]
+    sources = [('synthetic', games)]
+    if args.from_db:
+        sources.append(('stored', stored_games(os.environ['DB_URL'], args.from_db)))
+
+    for label, games in sources:
+        if not games:
+            print(f'      no {label} games')
+            continue
+
+        mismatches = []
+        dataframe = tallied = 0.0
+        for pitch_list in games:
+            start = time.perf_counter()
+            want = dataframe_call_counts(pitch_list)
+            dataframe += time.perf_counter() - start
+
+            start = time.perf_counter()
+            have = tallied_call_counts(pitch_list)
+            tallied += time.perf_counter() - start
+
+            if have != want:
+                mismatches.append((pitch_list[0].game_id if pitch_list else None, want, have))
+
+        failures += bool(mismatches)
+        n = len(games)
+        print(f'{"FAIL" if mismatches else "  ok"}  {n:,} {label} games: DataFrame '
+              f'{dataframe / n * 1e6:,.0f} us/game, tally {tallied / n * 1e6:,.0f} us/game '
+              f'({dataframe / tallied:.0f}x), {len(mismatches)} mismatches')
+        for game_id, want, have in mismatches[:5]:
+            print(f'      game {game_id}: DataFrame {want}, tally {have}')
+
+    return failures
+
+def synthetic_catcher_game(rng, pitches):
+    """(home player ids, catcher substitution events, pitch times) of a
+    game starting at 23:00."""
+    first = datetime(2026, 6, 1, 23)
+    home_ids = list(range(100, 126))
+    away_ids = list(range(200, 226))
+
+    subs = []
+    for _ in range(rng.choice([0, 0, 1, 1, 2, 3, 5])):
+        start = first + timedelta(seconds=rng.randrange(0, 3 * 3600))
+        if subs and rng.random() < 0.2:
+            start = datetime.strptime(subs[-1]['startTime'], '%Y-%m-%dT%H:%M:%S.%fZ')
+        subs.append({
+            'isSubstitution': True, 'position': {'name': 'Catcher'},
+            'player': {'id': rng.choice(home_ids + away_ids)},
+            'startTime': start.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+        })
+    # Most feeds list changes in time order; some do not.
+    if rng.random() < 0.7:
+        subs.sort(key=lambda sub: sub['startTime'])
+
+    times = [first + timedelta(seconds=i * 36, milliseconds=rng.randrange(1000)) for i in range(pitches)]
+    # Pitches exactly at a change.
+    times += [datetime.strptime(sub['startTime'], '%Y-%m-%dT%H:%M:%S.%fZ') for sub in subs]
+    return home_ids, subs, times
+
+def bench_catchers(args):
+    from catcher_timeline import CatcherTimeline
+
+    rng = random.Random(args.seed)
+    games = [synthetic_catcher_game(rng, args.pitches) for _ in range(args.games)]
+
+    legacy = timeline = 0.0
+    mismatches = []
+    for home_ids, subs, times in games:
+        start = time.perf_counter()
+        interval = legacy_catcher_interval(101, home_ids, subs)
+        want = [interval[t] for t in times]
+        legacy += time.perf_counter() - start
+
+        start = time.perf_counter()
+        catchers = CatcherTimeline(101, home_ids)
+        for sub in subs:
+            catchers.add_event(sub)
+        have = [catchers[t] for t in times]
+        timeline += time.perf_counter() - start
+
+        mismatches += [(t, w, h) for t, w, h in zip(times, want, have) if w != h]
+
+    n = len(games)
+    print(f'{"FAIL" if mismatches else "  ok"}  {n:,} games x {args.pitches} pitches: IntervalDict '
+          f'{legacy / n * 1e6:,.0f} us/game, bisect timeline {timeline / n * 1e6:,.0f} us/game '
+          f'({legacy / timeline:.0f}x), {len(mismatches)} mismatches')
+    for t, want, have in mismatches[:5]:
+        print(f'      {t}: IntervalDict {want}, timeline {have}')
+
+    return bool(mismatches)
+
+def feed_time(when):
+    return when.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def synthetic_feed(rng, innings=13):
+    """A game feed with the parts parse_plays() reads: liveData.plays and
+    liveData.boxscore."""
+    clock = datetime(2026, 6, 1, 23, 5)
+    home_ids, away_ids = list(range(100, 126)), list(range(200, 226))
+
+    def tick(seconds):
+        nonlocal clock
+        clock += timedelta(seconds=seconds, milliseconds=rng.randrange(1000))
+        return clock
+
+    def player(pid, position, substitute=False):
+        return {'person': {'id': pid}, 'position': {'name': position},
+                'gameStatus': {'isSubstitute': substitute, 'isOnBench': False}}
+
+    boxscore = {
+        'home': {'players': {f'ID{pid}': player(pid, 'Catcher' if pid == 101 else 'Pitcher') for pid in home_ids}},
+        'away': {'players': {f'ID{pid}': player(pid, 'Catcher' if pid == 201 else 'Pitcher') for pid in away_ids}},
+    }
+
+    plays = []
+    ejected = False
+    for inning in range(1, innings + 1):
+        for half in ('top', 'bottom'):
+            for _ in range(rng.randint(3, 6)):
+                events = []
+                if rng.random() < 0.03:
+                    events.append({
+                        'isPitch': False, 'isSubstitution': True, 'position': {'name': 'Catcher'},
+                        'player': {'id': rng.choice(home_ids + away_ids)}, 'startTime': feed_time(tick(40)),
+                        'details': {'eventType': 'defensive_substitution', 'description': 'Catcher change.'}})
+                if not ejected and inning > 6 and rng.random() < 0.05:
+                    ejected = True
+                    events.append({
+                        'isPitch': False, 'startTime': feed_time(tick(30)), 'player': {'id': rng.choice(home_ids)},
+                        'umpire': {'id': 9}, 'details': {'eventType': 'ejection', 'description': 'Ejected.'}})
+
+                balls = strikes = 0
+                for _ in range(rng.randint(1, 7)):
+                    pitch, coordinates = synthetic_call(rng)
+                    code = rng.choice(['B', 'C', 'B', 'C', 'S', 'F', 'X', '*B', 'V'])
+                    coordinates.update(pX=pitch['px'], pZ=pitch['pz'])
+                    if rng.random() < 0.02:
+                        del coordinates['pX']
+                    balls, strikes = min(balls + (code == 'B'), 3), min(strikes + (code in 'CSF'), 2)
+                    event = {
+                        'isPitch': True, 'playId': f'{len(plays)}-{len(events)}',
+                        'startTime': feed_time(tick(20)), 'endTime': feed_time(tick(4)),
+                        'count': {'balls': balls, 'strikes': strikes},
+                        'details': {'code': code},
+                        'pitchData': {'strikeZoneTop': pitch['sz_top'], 'strikeZoneBottom': pitch['sz_bottom'],
+                                      'coordinates': coordinates},
+                    }
+                    if code in 'BC' and rng.random() < 0.03:
+                        event['reviewDetails'] = {'reviewType': 'MJ', 'isOverturned': rng.random() < 0.5,
+                                                  'challengeTeamId': 147, 'player': {'id': 100}}
+                    events.append(event)
+
+                play = {
+                    'result': {'description': f'Play {len(plays)}.'},
+                    'about': {'inning': inning, 'halfInning': half, 'atBatIndex': len(plays)},
+                    'count': {'outs': rng.randint(0, 2)},
+                    'matchup': {'batSide': {'code': rng.choice('LR')}, 'batter': {'id': rng.choice(away_ids)},
+                                'pitcher': {'id': rng.choice(home_ids)}},
+                    'playEvents': events,
+                }
+                if rng.random() < 0.02:
+                    play['reviewDetails'] = {'reviewType': 'MJ', 'isOverturned': True, 'challengeTeamId': 111}
+                plays.append(play)
+
+    # The play in progress has no result yet.
+    del plays[-1]['result']['description']
+    return {'liveData': {'plays': {'allPlays': plays}, 'boxscore': {'teams': boxscore}}}
+
+def play_data_of(feed):
+    """liveData.plays with what add_game_to_db() adds to it, on a copy of
+    the top level so each parse gets fresh catcher timelines."""
+    import feed_parser
+
+    plays = feed['liveData']['plays']['allPlays']
+    first = next((e['startTime'] for play in plays for e in play['playEvents'] if e['isPitch']), None)
+    start = datetime.strptime(first, '%Y-%m-%dT%H:%M:%S.%fZ') - timedelta(minutes=12) if first else None
+    play_data = {
+        'allPlays': plays, 'start_time_home': start, 'start_time_away': start and start + timedelta(seconds=7),
+        'home_media_id': 'home-media', 'away_media_id': 'away-media',
+        'home_media_call_letters': 'YES', 'away_media_call_letters': 'NESN',
+        'home_media_state': 'MEDIA_ARCHIVE', 'away_media_state': 'MEDIA_ARCHIVE',
+    }
+    play_data['home_catchers'], play_data['away_catchers'] = feed_parser.catcher_timelines(
+        feed['liveData']['boxscore']['teams'])
+    return play_data
+
+def load_feed(path):
+    import json_codec
+    from feed_stream import open_entry
+
+    with open_entry(path) as f:
+        feed = json_codec.loads(f.read())
+    # Feed cache entries wrap the payload.
+    return feed.get('payload', feed)
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def bench_parser(args):
+    import feed_parser
+
+    rng = random.Random(args.seed)
+    if args.feed:
+        feeds = [(os.path.basename(path), load_feed(path)) for path in args.feed]
+    else:
+        feeds = [(f'synthetic {innings} innings', synthetic_feed(rng, innings)) for innings in (9, 13, 19)]
+
+    failures = 0
+    for label, feed in feeds:
+        plays = feed['liveData']['plays']['allPlays']
+        # A full parse and a live diff of the last few plays.
+        for play_indices in (None, set(range(max(len(plays) - 4, 0), len(plays)))):
+            want = legacy_add_pitches(play_data_of(feed), play_indices)
+            have = feed_parser.parse_plays(play_data_of(feed), play_indices)
+            ok = all(have[key] == want[key] for key in want)
+            failures += not ok
+
+            if play_indices is not None:
+                print(f'{"  ok" if ok else "FAIL"}  {label}: live diff of {len(play_indices)} plays, '
+                      f'{len(have["game_pitches"])} pitches match')
+                continue
+
+            legacy = statistics.median(
+                timed(lambda: legacy_add_pitches(play_data_of(feed))) for _ in range(args.repeat))
+            single = statistics.median(
+                timed(lambda: feed_parser.parse_plays(play_data_of(feed))) for _ in range(args.repeat))
+            events = sum(len(play['playEvents']) for play in plays)
+            print(f'{"  ok" if ok else "FAIL"}  {label}: {len(plays)} plays, {events:,} events, '
+                  f'{len(have["game_pitches"])} called pitches, {len(have["game_ejections"])} ejections; '
+                  f'add_pitches {legacy * 1000:.1f} ms, parse_plays {single * 1000:.1f} ms ({legacy / single:.1f}x)')
+            if not ok:
+                for key in want:
+                    if have[key] != want[key]:
+                        print(f'      {key} differs')
+
+    return failures
+
+def legacy_pitch_class():
+    """Pitch as it was before slots: a plain dataclass whose get_values()
+    reads vars()."""
+    specs = [
+        (f.name, f.type) if f.default is dataclasses.MISSING else (f.name, f.type, dataclasses.field(default=f.default))
+        for f in dataclasses.fields(Pitch)
+    ]
+    return dataclasses.make_dataclass('LegacyPitch', specs,
+                                      namespace={'get_values': lambda self: tuple(vars(self).values())})
+
+def parsed_games(games, pitches, seed):
+    """Per game, the pitch dicts parse_plays()/add_game_data() hand over."""
+    return [[dataclasses.asdict(p) for p in synthetic_game(-g, pitches, seed)] for g in range(1, games + 1)]
+
+def held_bytes(cls, games, pitches, keep_dicts):
+    """Bytes still allocated once `games` games of rows have been built."""
+    import tracemalloc
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    dicts = parsed_games(games, pitches, 1)
+    rows = []
+    for game in dicts:
+        rows.append([cls(**pitch) for pitch in game])
+        if not keep_dicts:
+            game.clear()
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return held
+
+def bench_pitches(args):
+    legacy_cls = legacy_pitch_class()
+    games = parsed_games(args.games, args.pitches, args.seed)
+    n = args.games * args.pitches
+    season = 2430 * args.pitches
+
+    mismatches = sum(
+        legacy_cls(**pitch).get_values() != Pitch(**pitch).get_values() for game in games for pitch in game)
+
+    def build_and_serialize(cls):
+        start = time.perf_counter()
+        for game in games:
+            for row in [cls(**pitch) for pitch in game]:
+                row.get_values()
+        return time.perf_counter() - start
+
+    legacy_time = min(build_and_serialize(legacy_cls) for _ in range(args.repeat))
+    slotted_time = min(build_and_serialize(Pitch) for _ in range(args.repeat))
+    legacy_held = held_bytes(legacy_cls, args.workers, args.pitches, keep_dicts=True)
+    slotted_held = held_bytes(Pitch, args.workers, args.pitches, keep_dicts=False)
+
+    print(f'{"FAIL" if mismatches else "  ok"}  {n:,} pitches: get_values() differs for {mismatches}')
+    print(f'      held for {args.workers} in-flight games: dataclass + dicts {legacy_held / 1024 ** 2:.1f} MB '
+          f'({legacy_held / (args.workers * args.pitches):,.0f} B/pitch), slotted {slotted_held / 1024 ** 2:.1f} MB '
+          f'({slotted_held / (args.workers * args.pitches):,.0f} B/pitch)')
+    print(f'      build + get_values: dataclass {legacy_time / n * 1e6:.2f} us/pitch, '
+          f'slotted {slotted_time / n * 1e6:.2f} us/pitch; {args.seasons}-season backfill '
+          f'({args.seasons * season:,} pitches) {legacy_time / n * args.seasons * season:.1f} s vs '
+          f'{slotted_time / n * args.seasons * season:.1f} s')
+    return bool(mismatches)
+
+def padded_feed(rng, innings, mb):
+    """synthetic_feed() filled out with the rest of a real live feed
+    (metaData, gameData, per-pitch tracking and hit data, runners and
+    credits, boxscore stats, linescore, playsByInning), with pitch tracking
+    samples added until the JSON is about `mb` MB."""
+    import json
+
+    feed = synthetic_feed(rng, innings)
+    plays = feed['liveData']['plays']['allPlays']
+
+    def numbers(keys):
+        return {key: round(rng.uniform(-100, 100), 4) for key in keys}
+
+    for play in plays:
+        play['about'].update(isTopInning=play['about']['halfInning'] == 'top',
+                             startTime=play['playEvents'][0]['startTime'], isComplete=True)
+        play['result'].update(type='atBat', event='Strikeout', eventType='strikeout', rbi=0,
+                              awayScore=rng.randint(0, 9), homeScore=rng.randint(0, 9))
+        play['runners'] = [{
+            'movement': {'originBase': None, 'start': None, 'end': '1B', 'outBase': None, 'isOut': False},
+            'details': {'event': 'Single', 'runner': {'id': 200 + r, 'fullName': f'Runner {r}'}, 'rbi': False},
+            'credits': [{'player': {'id': 100 + c}, 'position': {'code': str(c), 'name': 'Pitcher'},
+                         'credit': 'f_assist'} for c in range(3)],
+        } for r in range(rng.randint(1, 3))]
+        for event in play['playEvents']:
+            event['details'].update(description='Called Strike', isInPlay=False, isStrike=True, isBall=False,
+                                    type={'code': 'FF', 'description': 'Four-Seam Fastball'},
+                                    call={'code': event['details'].get('code'), 'description': 'Called Strike'})
+            if event['isPitch']:
+                event['pitchData'].update(numbers(['startSpeed', 'endSpeed', 'zone', 'typeConfidence',
+                                                   'plateTime', 'extension']))
+                event['pitchData']['coordinates'].update(numbers(['aY', 'aZ', 'pfxX', 'pfxZ', 'vX0', 'vY0', 'vZ0',
+                                                                  'x', 'y', 'x0', 'y0', 'z0', 'aX']))
+                event['pitchData']['breaks'] = numbers(['breakAngle', 'breakLength', 'breakY', 'breakVertical',
+                                                        'breakVerticalInduced', 'breakHorizontal', 'spinRate',
+                                                        'spinDirection'])
+                event['hitData'] = numbers(['launchSpeed', 'launchAngle', 'totalDistance', 'hardness'])
+                event['pitchNumber'] = rng.randint(1, 7)
+        play['pitchIndex'] = list(range(len(play['playEvents'])))
+        play['actionIndex'] = []
+        play['runnerIndex'] = list(range(len(play['runners'])))
+
+    players = {f'ID{pid}': {'id': pid, 'fullName': f'Player {pid}', 'isPlayer': True, 'primaryNumber': str(pid % 99),
+                            'birthDate': '1995-04-01', 'currentAge': 31, 'height': "6' 2\"", 'weight': 205,
+                            'active': True, 'primaryPosition': {'code': '1', 'name': 'Pitcher'},
+                            'batSide': {'code': 'R'}, 'pitchHand': {'code': 'R'}, 'strikeZoneTop': 3.4,
+                            'strikeZoneBottom': 1.6}
+               for pid in [*range(100, 126), *range(200, 226)]}
+    feed['metaData'] = {'wait': 10, 'timeStamp': '20260602_031512', 'gameEvents': ['strikeout'],
+                        'logicalEvents': ['countChange']}
+    feed['gameData'] = {
+        'game': {'pk': 900001, 'type': 'R', 'season': '2026'},
+        'datetime': {'dateTime': '2026-06-01T23:05:00Z', 'officialDate': '2026-06-01'},
+        'status': {'abstractGameState': 'Final', 'detailedState': 'Final'},
+        'teams': {side: {'id': team_id, 'name': name, 'abbreviation': abbreviation}
+                  for side, team_id, name, abbreviation in (('home', 147, 'New York Yankees', 'NYY'),
+                                                            ('away', 111, 'Boston Red Sox', 'BOS'))},
+        'players': players,
+        'venue': {'id': 3313, 'name': 'Yankee Stadium'},
+        'weather': {'condition': 'Clear', 'temp': '78', 'wind': '8 mph, Out To CF'},
+    }
+    for team in feed['liveData']['boxscore']['teams'].values():
+        for entry in team['players'].values():
+            entry['stats'] = {group: numbers(['gamesPlayed', 'atBats', 'hits', 'runs', 'strikeOuts', 'baseOnBalls',
+                                              'avg', 'obp', 'slg', 'ops', 'inningsPitched', 'era'])
+                              for group in ('batting', 'pitching', 'fielding')}
+    feed['liveData']['boxscore']['officials'] = [{'official': {'id': 9, 'fullName': 'Home Plate'},
+                                                  'officialType': 'Home Plate'}]
+    feed['liveData']['plays']['currentPlay'] = plays[-1]
+    feed['liveData']['plays']['scoringPlays'] = list(range(0, len(plays), 7))
+    feed['liveData']['plays']['playsByInning'] = [
+        {'startIndex': i * 8, 'endIndex': i * 8 + 7, 'top': list(range(i * 8, i * 8 + 4)),
+         'bottom': list(range(i * 8 + 4, i * 8 + 8)),
+         'hits': {'away': [{'team': {'id': 111}, 'inning': i + 1, 'pitcher': {'id': 101}, 'batter': {'id': 201},
+                            'coordinates': numbers(['x', 'y']), 'type': 'H', 'description': 'Single'}]}}
+        for i in range(innings)]
+    feed['liveData']['linescore'] = {'innings': [{'num': i + 1, 'home': {'runs': 0, 'hits': 1},
+                                                  'away': {'runs': 1, 'hits': 2}} for i in range(innings)]}
+    feed['liveData']['decisions'] = {'winner': {'id': 101}, 'loser': {'id': 201}}
+
+    pitch_events = [event for play in plays for event in play['playEvents'] if event['isPitch']]
+    missing = mb * 1024 ** 2 - len(json.dumps(feed, separators=(',', ':')))
+    samples = max(int(missing / len(pitch_events) / 8), 0)
+    for event in pitch_events:
+        event['pitchData']['samples'] = [round(rng.uniform(-100, 100), 3) for _ in range(samples)]
+    return feed
+
+def subtree(feed, path):
+    for key in path.split('.'):
+        feed = feed[key]
+    return feed
+
+def streamed_run(source, play_data, play_indices=None):
+    """What add_game_to_db() gets from a --stream fetch: the header, and the
+    parse of its streamed plays."""
+    import feed_parser
+    import feed_stream
+
+    header = feed_stream.read_header(source)
+    play_data = dict(play_data, allPlays=header['liveData']['plays']['allPlays'])
+    play_data['home_catchers'], play_data['away_catchers'] = feed_parser.catcher_timelines(
+        header['liveData']['boxscore']['teams'])
+    return header, feed_parser.parse_plays(play_data, play_indices)
+
+def decoded_run(path):
+    """The same from a full json.load of the feed."""
+    import json
+    import feed_parser
+
+    with open(path, 'rb') as f:
+        feed = json.load(f)
+    return feed, feed_parser.parse_plays(play_data_of(feed))
+
+def peak_bytes(fn):
+    """Peak of Python allocations while fn() runs, over what was already
+    allocated."""
+    import tracemalloc
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak
+
+def bench_stream(args):
+    import io
+    import json
+    import feed_parser
+    import feed_stream
+    import live_feed
+    from feed_cache import FeedCache
+    from feed_stream import FeedSource
+
+    rng = random.Random(args.seed)
+    budget = args.budget_mb * 1024 ** 2 if args.budget_mb else feed_stream.GAME_MEMORY_BUDGET
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FeedCache(os.path.join(directory, 'cache'))
+
+        for innings, mb in zip(args.innings, args.mb):
+            feed = padded_feed(rng, innings, mb)
+            label = f'{innings} innings'
+            path = os.path.join(directory, f'{innings}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(feed, f, separators=(',', ':'))
+            size = os.path.getsize(path)
+
+            with open(path, 'rb') as f:
+                cache.put_body('game', innings, io.BytesIO(f.read()), True)
+            body = open(path, 'rb')
+            sources = [('download', FeedSource(body=body)), ('cache entry', cache.get_source('game', innings))]
+
+            plays = feed['liveData']['plays']['allPlays']
+            play_data = play_data_of(feed)
+            want = feed_parser.parse_plays(play_data_of(feed))
+            diff = set(range(len(plays) - 4, len(plays)))
+            want_diff = feed_parser.parse_plays(play_data_of(feed), diff)
+
+            for name, source in sources:
+                header, have = streamed_run(source, play_data)
+                _, have_diff = streamed_run(source, play_data, diff)
+                mismatched = [path for path in feed_stream.HEADER_PATHS
+                              if subtree(header, path) != subtree(feed, path)]
+                mismatched += [key for key in want if have[key] != want[key]]
+                mismatched += ['live diff'] if have_diff != want_diff else []
+                if have['last_play_position'] != live_feed.last_play_position(feed):
+                    mismatched.append('last_play_position')
+                failures += bool(mismatched)
+                print(f'{"FAIL" if mismatched else "  ok"}  {label} from {name}: header, '
+                      f'{len(have["game_pitches"])} pitches and a live diff match the full decode'
+                      + (f' (differs: {", ".join(mismatched)})' if mismatched else ''))
+
+            decoded_peak = peak_bytes(lambda: decoded_run(path))
+            decoded_time = min(timed(lambda: decoded_run(path)) for _ in range(args.repeat))
+            for name, source in sources:
+                streamed_peak = peak_bytes(lambda: streamed_run(source, play_data))
+                streamed_time = min(timed(lambda: streamed_run(source, play_data)) for _ in range(args.repeat))
+                ok = streamed_peak <= budget
+                failures += not ok
+                print(f'{"  ok" if ok else "FAIL"}  {label} ({size / 1024 ** 2:.1f} MB of JSON) from {name}: '
+                      f'peak {streamed_peak / 1024 ** 2:.1f} MB streamed (budget {budget / 1024 ** 2:.0f} MB) vs '
+                      f'{decoded_peak / 1024 ** 2:.1f} MB decoded; {streamed_time * 1000:.0f} ms vs '
+                      f'{decoded_time * 1000:.0f} ms')
+            body.close()
+
+    return failures
+
+def decoders():
+    """(name, bytes -> object) for every JSON backend available here."""
+    import json
+    import ijson
+
+    backends = [
+        ('json (text)', lambda raw: json.loads(raw.decode('utf-8'))),
+        ('json (bytes)', json.loads),
+        ('ijson', lambda raw: next(ijson.items(raw, '', use_float=True))),
+    ]
+    try:
+        import orjson
+    except ImportError:
+        print('      orjson is not installed; skipping it')
+    else:
+        backends.append(('orjson', orjson.loads))
+    return backends
+
+def bench_decode(args):
+    import gzip
+    import json
+    import json_codec
+    from feed_cache import FeedCache
+
+    rng = random.Random(args.seed)
+    if args.feed:
+        feeds = [(os.path.basename(path), load_feed(path)) for path in args.feed]
+    else:
+        feeds = [(f'synthetic {innings} innings', padded_feed(rng, innings, mb))
+                 for innings, mb in ((9, 5), (13, 10), (19, 15))]
+
+    print(f'      json_codec backend: {json_codec.BACKEND}')
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        caches = {'plain': FeedCache(os.path.join(directory, 'plain')),
+                  'gzip': FeedCache(os.path.join(directory, 'gzip'), compress=True)}
+
+        for label, feed in feeds:
+            raw = json.dumps(feed, separators=(',', ':')).encode('utf-8')
+            mb = len(raw) / 1024 ** 2
+
+            for name, decode in decoders():
+                ok = decode(raw) == feed
+                failures += not ok
+                seconds = min(timed(lambda: decode(raw)) for _ in range(args.repeat))
+                print(f'{"  ok" if ok else "FAIL"}  {label} ({mb:.1f} MB): {name:<12} '
+                      f'{seconds * 1000:6.0f} ms, {mb / seconds:6.0f} MB/s')
+
+            # Reading a cached entry back: file read, inflate if gzipped, decode.
+            for form, cache in caches.items():
+                cache.put('game', 1, feed, True)
+                ok = cache.get('game', 1) == feed
+                failures += not ok
+                seconds = min(timed(lambda: cache.get('game', 1)) for _ in range(args.repeat))
+                size = os.path.getsize(cache._find('game', 1)) / 1024 ** 2
+                print(f'{"  ok" if ok else "FAIL"}  {label} ({mb:.1f} MB): {form} cache entry ({size:.1f} MB on disk) '
+                      f'read back in {seconds * 1000:.0f} ms, {mb / seconds:.0f} MB/s')
+
+    return failures
+
+def backfill_tasks(rng, games, feeds, mb):
+    """parse_feed() tasks of `games` games over `feeds` distinct padded
+    feeds, with the media fields and broadcast starts --backfill gives them."""
+    import json_codec
+
+    tasks = []
+    for i in range(feeds):
+        feed = padded_feed(rng, rng.randint(9, 13), mb)
+        play_data = play_data_of(feed)
+        media = {key: play_data[key] for key in (
+            'home_media_id', 'away_media_id', 'home_media_call_letters', 'away_media_call_letters',
+            'home_media_state', 'away_media_state')}
+        tasks.append({'feed': json_codec.dumps(feed), 'wrapped': False, 'media': media,
+                      'broadcast_starts': {media['home_media_id']: play_data['start_time_home'],
+                                           media['away_media_id']: play_data['start_time_away']}})
+    return [dict(tasks[i % feeds], game_id=900000 + i) for i in range(games)]
+
+def comparable_rows(result):
+    """A parse_feed() result without the sync record's wall-clock stamp."""
+    rows = result['rows']
+    return dataclasses.replace(rows, sync=dataclasses.replace(rows.sync, synced_at=None))
+
+def bench_backfill(args):
+    import multiprocessing
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    import game_rows
+    # Loaded before the workers fork, as start_backfill_pool() does.
+    import scoring
+
+    rng = random.Random(args.seed)
+    tasks = backfill_tasks(rng, args.games, args.feeds, args.mb)
+    cores = os.cpu_count()
+    processes = args.processes or sorted({1, *(n for n in (2, 4, 8, 16, 32) if n < cores), cores})
+    mb = sum(len(task['feed']) for task in tasks) / len(tasks) / 1024 ** 2
+
+    def rate(seconds):
+        return len(tasks) / seconds * 60
+
+    start = time.perf_counter()
+    want = [comparable_rows(game_rows.parse_feed(task)) for task in tasks]
+    serial = rate(time.perf_counter() - start)
+    returned = statistics.mean(len(pickle.dumps(game_rows.parse_feed(task)['rows'])) for task in tasks[:args.feeds])
+    print(f'      {len(tasks)} games ({mb:.1f} MB of JSON, {len(want[0].pitches)}+ pitches each) on {cores} cores; '
+          f'{returned / 1024:.0f} KB of rows sent back per game')
+    print(f'  ok  serial: {serial:,.0f} games/min')
+
+    failures = 0
+    for n in processes:
+        pools = [('threads', ThreadPoolExecutor(max_workers=n)),
+                 ('processes', ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context('fork')))]
+        for name, pool in pools:
+            with pool:
+                # Workers are started (and forked) before the clock does.
+                pool.submit(int).result()
+                start = time.perf_counter()
+                have = [comparable_rows(result) for result in pool.map(game_rows.parse_feed, tasks)]
+                games_per_min = rate(time.perf_counter() - start)
+            ok = have == want
+            failures += not ok
+            print(f'{"  ok" if ok else "FAIL"}  {n:>2} {name:<9}: {games_per_min:,.0f} games/min '
+                  f'({games_per_min / serial:.2f}x serial)' + ('' if ok else ', rows differ from the serial run'))
+
+    return failures
+
+#%% Main
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    upsert = sub.add_parser('upsert', help='legacy literal upserts vs COPY bulk upsert')
+    upsert.add_argument('--games', type=int, nargs='+', default=[1, 15])
+    upsert.add_argument('--pitches', type=int, default=300)
+    upsert.set_defaults(func=bench_upsert)
+
+    indexes = sub.add_parser('indexes', help='EXPLAIN timings of pitch access paths before/after the read indexes')
+    indexes.add_argument('--rows', type=int, default=1_500_000)
+    indexes.add_argument('--repeat', type=int, default=5)
+    indexes.add_argument('--seed', type=float, default=0.42)
+    indexes.set_defaults(func=bench_indexes)
+
+    partition = sub.add_parser('partition', help='Online season partitioning of pitch under concurrent writes')
+    partition.add_argument('--rows', type=int, default=1_500_000)
+    partition.add_argument('--repeat', type=int, default=5)
+    partition.add_argument('--seed', type=float, default=0.42)
+    partition.add_argument('--chunk-days', type=int, default=30)
+    partition.set_defaults(func=bench_partition)
+
+    summaries = sub.add_parser('summaries', help='Incremental season summaries vs a from-scratch rebuild')
+    summaries.add_argument('--games', type=int, default=300)
+    summaries.add_argument('--pitches', type=int, default=300)
+    summaries.add_argument('--seed', type=float, default=7)
+    summaries.set_defaults(func=bench_summaries)
+
+    scoring = sub.add_parser('scoring', help='Scalar vs vectorised call scoring: parity and throughput')
+    scoring.add_argument('--pitches', type=int, nargs='+', default=[300, 30_000, 300_000])
+    scoring.add_argument('--seed', type=int, default=3)
+    scoring.set_defaults(func=bench_scoring)
+
+    startup = sub.add_parser('startup', help='Import time and no-op tick wall time of the updater')
+    startup.add_argument('--budget-ms', type=int, default=300, help='Import time allowed over a bare interpreter')
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    tally = sub.add_parser('tally', help='Game call counts: CallTally vs the old DataFrame filters')
+    tally.add_argument('--games', type=int, default=200)
+    tally.add_argument('--pitches', type=int, default=300)
+    tally.add_argument('--from-db', type=int, default=0, metavar='N', help='Also check the N latest stored games')
+    tally.add_argument('--seed', type=int, default=7)
+    tally.set_defaults(func=bench_tally)
+
+    catchers = sub.add_parser('catchers', help='Catcher lookups: bisect timeline vs portion IntervalDict')
+    catchers.add_argument('--games', type=int, default=500)
+    catchers.add_argument('--pitches', type=int, default=150, help='Called pitches per team per game')
+    catchers.add_argument('--seed', type=int, default=11)
+    catchers.set_defaults(func=bench_catchers)
+
+    parse = sub.add_parser('parser', help='Single-pass feed_parser vs the old add_pitches()')
+    parse.add_argument('--feed', nargs='*', help='Recorded feeds (.json, or feed cache .json.gz entries)')
+    parse.add_argument('--repeat', type=int, default=15)
+    parse.add_argument('--seed', type=int, default=13)
+    parse.set_defaults(func=bench_parser)
+
+    pitches = sub.add_parser('pitches', help='Slotted Pitch rows vs the plain dataclass: memory and time')
+    pitches.add_argument('--games', type=int, default=100)
+    pitches.add_argument('--pitches', type=int, default=150, help='Called pitches per game')
+    pitches.add_argument('--workers', type=int, default=8, help='Games in flight at once')
+    pitches.add_argument('--seasons', type=int, default=3)
+    pitches.add_argument('--repeat', type=int, default=3)
+    pitches.add_argument('--seed', type=int, default=17)
+    pitches.set_defaults(func=bench_pitches)
+
+    stream = sub.add_parser('stream', help='Streamed vs fully decoded game feeds: parity and peak memory')
+    stream.add_argument('--innings', type=int, nargs='*', default=[9, 13, 19])
+    stream.add_argument('--mb', type=int, nargs='*', default=[5, 10, 15], help='JSON size of each feed')
+    stream.add_argument('--budget-mb', type=int, help='Per-game peak to enforce (default feed_stream.GAME_MEMORY_BUDGET)')
+    stream.add_argument('--repeat', type=int, default=3)
+    stream.add_argument('--seed', type=int, default=19)
+    stream.set_defaults(func=bench_stream)
+
+    decode = sub.add_parser('decode', help='JSON decode throughput per backend and cache entry form')
+    decode.add_argument('--feed', nargs='*', help='Recorded feeds (.json, or feed cache entries)')
+    decode.add_argument('--repeat', type=int, default=5)
+    decode.add_argument('--seed', type=int, default=23)
+    decode.set_defaults(func=bench_decode)
+
+    backfill = sub.add_parser('backfill', help='Backfill parse throughput: serial vs thread and process pools')
+    backfill.add_argument('--games', type=int, default=48)
+    backfill.add_argument('--feeds', type=int, default=6, help='Distinct feeds the games cycle through')
+    backfill.add_argument('--mb', type=int, default=2, help='JSON size of each feed')
+    backfill.add_argument('--processes', type=int, nargs='*', help='Worker counts (default 1 up to the core count)')
+    backfill.add_argument('--seed', type=int, default=29)
+    backfill.set_defaults(func=bench_backfill)
+
+    rescore = sub.add_parser('rescore', help='Offline re-scoring of stored pitches')
+    rescore.add_argument('--games', type=int, default=400)
+    rescore.add_argument('--pitches', type=int, default=150)
+    rescore.add_argument('--chunk-size', type=int, default=20_000)
+    rescore.add_argument('--seed', type=int, default=5)
+    rescore.set_defaults(func=bench_rescore)
+
+    args = parser.parse_args()
+    failures = args.func(args)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
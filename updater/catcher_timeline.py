@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Which catcher a team had behind the plate at any moment of a game.
+
+A timeline holds the starting catcher plus the sorted start times of the
+catcher substitutions and who came in, and answers a lookup with one bisect.
+A substitution holds from its start time on and replaces any substitution
+recorded at or after that time, so feeds listing substitutions out of order
+resolve the same way the IntervalDict they replace did (last assignment of
+[start, end of time] wins).
+"""
+
+#%%
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+TIME_FORMAT_MS = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+#%% Helpers
+
+def is_catcher_substitution(event):
+    return 'isSubstitution' in event and event['position']['name'] == 'Catcher'
+
+#%% Timeline
+
+class CatcherTimeline:
+
+    def __init__(self, starting_id, player_ids):
+        self.starting_id = starting_id
+        self.player_ids = set(player_ids)
+        self.starts = []
+        self.catcher_ids = []
+
+    def substitute(self, start, catcher_id):
+        cut = bisect_left(self.starts, start)
+        del self.starts[cut:], self.catcher_ids[cut:]
+        self.starts.append(start)
+        self.catcher_ids.append(catcher_id)
+
+    def add_event(self, event):
+        """Record a catcher substitution event if it brings in one of this
+        team's players."""
+        catcher_id = event['player']['id']
+        if catcher_id in self.player_ids:
+            self.substitute(datetime.strptime(event['startTime'], TIME_FORMAT_MS), catcher_id)
+
+    def __getitem__(self, when):
+        i = bisect_right(self.starts, when)
+        return self.catcher_ids[i - 1] if i else self.starting_id
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Shared pytest fixtures: a small recorded-shape game feed
+(fixtures/game_feed.json) and the media fields and broadcast starts the
+updater adds to it before parsing.
+
+The feed has two top-half plays with called balls and strikes (one
+overturned by an ABS challenge), a swinging strike, a pitch without
+coordinates, a catcher substitution and an ejection, and a bottom-half play
+still in progress.
+"""
+
+#%%
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+FEED_PATH = os.path.join(FIXTURE_DIR, 'game_feed.json')
+
+GAME_ID = 777001
+MEDIA = {
+    'home_media_id': 'home-media', 'away_media_id': 'away-media',
+    'home_media_call_letters': 'YES', 'away_media_call_letters': 'NESN',
+    'home_media_state': 'MEDIA_ARCHIVE', 'away_media_state': 'MEDIA_ARCHIVE',
+}
+BROADCAST_STARTS = {'home-media': datetime(2025, 6, 1, 23, 0, 0), 'away-media': datetime(2025, 6, 1, 23, 0, 5)}
+
+#%% Helpers
+
+def prepare_play_data(play_data, boxscore_teams):
+    """Add what build_game_rows() adds to liveData.plays before
+    parse_plays(): the broadcast starts, media fields and catcher timelines."""
+    import feed_parser
+
+    play_data['start_time_home'] = BROADCAST_STARTS[MEDIA['home_media_id']]
+    play_data['start_time_away'] = BROADCAST_STARTS[MEDIA['away_media_id']]
+    play_data.update(MEDIA)
+    play_data['home_catchers'], play_data['away_catchers'] = feed_parser.catcher_timelines(boxscore_teams)
+    return play_data
+
+#%% Fixtures
+
+@pytest.fixture
+def feed():
+    """The decoded fixture feed, fresh for each test (parsing adds to it)."""
+    with open(FEED_PATH, 'rb') as f:
+        return json.load(f)
+
+@pytest.fixture
+def play_data(feed):
+    """liveData.plays with what build_game_rows() adds before parse_plays()."""
+    return prepare_play_data(feed['liveData']['plays'], feed['liveData']['boxscore']['teams'])
+
+@pytest.fixture
+def game(feed):
+    """The fixture feed as fetch_game() returns it."""
+    return {'game_id': GAME_ID, 'game_data': feed, 'media': dict(MEDIA)}
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Database access for the updater: a shared connection pool and the writes for
+its dataclass rows.
+
+One ConnectionPool is created per run and shared by every worker thread. Each
+game's writes run on one pooled connection inside one transaction, so readers
+never see a half-written game; time spent waiting for a connection and inside
+each transaction is recorded for logging.
+
+Rows are streamed with binary COPY into a temporary staging table shaped after
+the dataclass, then merged into the target with a single set-based
+INSERT ... SELECT ... ON CONFLICT DO UPDATE SET col = EXCLUDED.col. This works
+for any of the row dataclasses (Pitch, Player, Game, Team, Umpire, Ejection,
+GameSync) and replaces the one-literal-statement-per-row path.
+
+Staging columns are typed from the dataclass annotations, and each column is
+cast to the target column's declared type on the way in, so strings like
+'2026-06-17' or '00:12:31.4' land in date/time columns exactly as the
+literal SQL used to.
+
+COPY cannot run in psycopg's pipeline mode, so the handful of small per-game
+rows (umpire, teams, players, game, ejections, sync record) go through
+upsert_rows(), an executemany of the same EXCLUDED-based upsert that a
+pipeline sends without a round trip per statement.
+
+pitch is partitioned by season on game_date; the partitions a run needs,
+plus next season's, are created when it starts.
+"""
+
+#%%
+import dataclasses
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+# psycopg and psycopg_pool are imported where they are used, so a tick that
+# never writes a game does not load the driver.
+
+#%% Types
+
+STAGE_TYPES = {
+    int: 'bigint',
+    float: 'double precision',
+    bool: 'boolean',
+    str: 'text',
+    datetime: 'timestamp',
+}
+
+# Target column types never change during a run, so they are looked up once
+# per table.
+_column_types = {}
+_column_types_lock = threading.Lock()
+
+def column_types(cur, table_name):
+    with _column_types_lock:
+        types = _column_types.get(table_name)
+
+    if types is None:
+        cur.execute(
+            'SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute '
+            'WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped',
+            [table_name])
+        types = dict(cur.fetchall())
+
+        with _column_types_lock:
+            _column_types[table_name] = types
+
+    return types
+
+#%% Queries
+
+def stage_table_name(table_name):
+    return f'_stage_{table_name}'
+
+def create_stage_query(table_name, dc):
+    from psycopg import sql
+
+    columns = [
+        sql.SQL('{} {}').format(sql.Identifier(field.name), sql.SQL(STAGE_TYPES[field.type]))
+        for field in dataclasses.fields(dc)
+    ]
+    # _seq records arrival order so duplicate keys resolve last-write-wins,
+    # as consecutive single-row upserts did.
+    return sql.SQL('CREATE TEMP TABLE {} (_seq bigserial, {}) ON COMMIT DROP').format(
+        sql.Identifier(stage_table_name(table_name)), sql.SQL(', ').join(columns))
+
+def copy_query(table_name, fields):
+    from psycopg import sql
+
+    return sql.SQL('COPY {} ({}) FROM STDIN (FORMAT BINARY)').format(
+        sql.Identifier(stage_table_name(table_name)),
+        sql.SQL(', ').join(map(sql.Identifier, fields)))
+
+def merge_query(table_name, fields, target_types, conflict):
+    from psycopg import sql
+
+    casts = [
+        sql.SQL('{}::{}').format(sql.Identifier(field), sql.SQL(target_types[field]))
+        for field in fields
+    ]
+    updates = [
+        sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(field))
+        for field in fields if field not in conflict
+    ]
+    conflict_columns = sql.SQL(', ').join(map(sql.Identifier, conflict))
+
+    return sql.SQL(
+        'INSERT INTO {table} ({columns}) '
+        'SELECT DISTINCT ON ({conflict}) {casts} FROM {stage} ORDER BY {conflict}, _seq DESC '
+        'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+    ).format(
+        table=sql.Identifier(table_name),
+        columns=sql.SQL(', ').join(map(sql.Identifier, fields)),
+        conflict=conflict_columns,
+        casts=sql.SQL(', ').join(casts),
+        stage=sql.Identifier(stage_table_name(table_name)),
+        updates=sql.SQL(', ').join(updates),
+    )
+
+def upsert_query(table_name, fields, conflict):
+    from psycopg import sql
+
+    updates = [
+        sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(field))
+        for field in fields if field not in conflict
+    ]
+
+    return sql.SQL(
+        'INSERT INTO {table} ({columns}) VALUES ({values}) '
+        'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+    ).format(
+        table=sql.Identifier(table_name),
+        columns=sql.SQL(', ').join(map(sql.Identifier, fields)),
+        values=sql.SQL(', ').join(sql.Placeholder() * len(fields)),
+        conflict=sql.SQL(', ').join(map(sql.Identifier, conflict)),
+        updates=sql.SQL(', ').join(updates),
+    )
+
+#%% Upserts
+
+def upsert_rows(cur, table_name, rows, dc, conflict=('id',)):
+    """Upsert a few dataclass rows with one parameterised statement each;
+    safe inside a pipeline."""
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return
+
+    fields = [field.name for field in dataclasses.fields(dc)]
+    cur.executemany(upsert_query(table_name, fields, conflict), [row.get_values() for row in rows])
+
+def bulk_upsert(cur, table_name, rows, dc, conflict=('id',)):
+    """Upsert dataclass rows into table_name. Returns the number of rows
+    inserted or updated."""
+    from psycopg import sql
+
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return 0
+
+    fields = [field.name for field in dataclasses.fields(dc)]
+    stage_types = [STAGE_TYPES[field.type] for field in dataclasses.fields(dc)]
+    target_types = column_types(cur, table_name)
+    missing = [field for field in fields if field not in target_types]
+    if missing:
+        raise ValueError(f'{table_name} has no column for {dc.__name__} field(s): {", ".join(missing)}')
+
+    with cur.connection.transaction():
+        cur.execute(create_stage_query(table_name, dc))
+
+        with cur.copy(copy_query(table_name, fields)) as copy:
+            copy.set_types(stage_types)
+            for row in rows:
+                copy.write_row(row.get_values())
+
+        cur.execute(merge_query(table_name, fields, target_types, conflict))
+        count = cur.rowcount
+        cur.execute(sql.SQL('DROP TABLE {}').format(sql.Identifier(stage_table_name(table_name))))
+
+    return count
+
+def bulk_update(cur, table_name, rows, columns, key=('id',)):
+    """Set `columns` on existing rows of table_name from tuples of key values
+    followed by column values. Returns the number of rows updated.
+
+    The staging table copies the target's column types, so values are
+    streamed with text COPY and need no casts."""
+    from psycopg import sql
+
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    fields = list(key) + list(columns)
+    stage = sql.Identifier(stage_table_name(table_name))
+
+    with cur.connection.transaction():
+        cur.execute(sql.SQL('CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA').format(
+            stage, sql.SQL(', ').join(map(sql.Identifier, fields)), sql.Identifier(table_name)))
+
+        with cur.copy(sql.SQL('COPY {} ({}) FROM STDIN').format(
+                stage, sql.SQL(', ').join(map(sql.Identifier, fields)))) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+        cur.execute(sql.SQL('UPDATE {table} t SET {updates} FROM {stage} s WHERE {match}').format(
+            table=sql.Identifier(table_name),
+            updates=sql.SQL(', ').join(sql.SQL('{0} = s.{0}').format(sql.Identifier(c)) for c in columns),
+            stage=stage,
+            match=sql.SQL(' AND ').join(sql.SQL('t.{0} = s.{0}').format(sql.Identifier(k)) for k in key)))
+        count = cur.rowcount
+        cur.execute(sql.SQL('DROP TABLE {}').format(stage))
+
+    return count
+
+#%% Season partitions
+
+# pitch is range-partitioned on game_date, one partition per season. A unique
+# constraint on a partitioned table must include the partition key, so pitch
+# rows conflict on (id, game_date) rather than id alone; a pitch's game_date
+# is fixed by its game, so this matches the same rows. An unpartitioned pitch
+# needs migrations/2026_add_pitch_id_game_date_unique_index.sql for it.
+PITCH_CONFLICT = ('id', 'game_date')
+
+def season_partition_name(season, table_name='pitch'):
+    return f'{table_name}_{season}'
+
+def season_partition_query(season, parent, table_name='pitch'):
+    from psycopg import sql
+
+    return sql.SQL('CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})').format(
+        sql.Identifier(season_partition_name(season, table_name)), sql.Identifier(parent),
+        sql.Literal(f'{season}-01-01'), sql.Literal(f'{season + 1}-01-01'))
+
+def is_partitioned(cur, table_name):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [table_name])
+    return cur.fetchone()[0]
+
+def ensure_season_partitions(cur, seasons, table_name='pitch'):
+    """Create any missing season partitions of table_name. Does nothing if
+    the table has not been partitioned yet (see partition_pitch.py)."""
+    if not is_partitioned(cur, table_name):
+        return []
+
+    for season in sorted(set(seasons)):
+        cur.execute(season_partition_query(season, table_name, table_name))
+
+    return sorted(set(seasons))
+
+#%% Connection pool
+
+@dataclass
+class TimingStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self):
+        mean = (self.total / self.count * 1000) if self.count else 0.0
+        return f'{self.count} x {mean:.1f} ms mean, {self.max * 1000:.1f} ms max'
+
+
+class Database:
+
+    def __init__(self, conn_string, max_size=8):
+        # The pool is created and connects on first use, so a run that never
+        # touches the database never connects (or imports psycopg_pool).
+        self.conn_string = conn_string
+        self.max_size = max(max_size, 1)
+        self.pool = None
+        self.pool_wait = TimingStats()
+        self.transactions = TimingStats()
+        self._lock = threading.Lock()
+        self._opened = False
+
+    def _open(self):
+        with self._lock:
+            if not self._opened:
+                from psycopg_pool import ConnectionPool
+
+                # autocommit so plain reads do not hold a transaction open;
+                # writes open one explicitly with transaction().
+                self.pool = ConnectionPool(self.conn_string, min_size=1, max_size=self.max_size,
+                                           kwargs={'autocommit': True}, open=False)
+                self.pool.open()
+                self._opened = True
+
+    @contextmanager
+    def connection(self):
+        start = time.perf_counter()
+        self._open()
+        with self.pool.connection() as conn:
+            with self._lock:
+                self.pool_wait.add(time.perf_counter() - start)
+            yield conn
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            start = time.perf_counter()
+            try:
+                with conn.transaction():
+                    yield conn
+            finally:
+                with self._lock:
+                    self.transactions.add(time.perf_counter() - start)
+
+    def log_stats(self, logger):
+        logger.info('DB pool wait: %s', self.pool_wait.summary())
+        logger.info('DB transactions: %s', self.transactions.summary())
+
+    def close(self):
+        if self._opened:
+            self.pool.close()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of MLB API responses, keyed by (kind, gamePk).
+
+Entries written as final are served without touching the network
+(read-first): a game feed once the game is Final, its EPG entry once both
+MLB.tv feeds are archived (their media states keep changing after
+the last out). Other entries are only reused while younger than the TTL.
+Every fetch writes through, and `refresh=True` ignores existing entries while
+still rewriting them, for the whole cache or (per call) for one entry. The directory is capped at `max_bytes` with
+least-recently-used eviction (file mtime is bumped on every hit) down to
+EVICT_TO of the cap, so a full cache is not rescanned on every write.
+
+A cache built with directory=None is a passthrough, so callers do not need to
+special-case runs without a cache.
+
+Entries are plain JSON ({key}.json) by default, read in one go and decoded
+with json_codec: a gzipped entry spends about as long inflating as orjson
+spends decoding it. `compress=True` writes gzipped entries ({key}.json.gz)
+instead, for a fraction of the disk; entries in either form are read, and
+rewriting an entry replaces the other form.
+
+Streamed game feeds (see feed_stream) never go through json: put_body() wraps
+the downloaded body in the entry's envelope as raw bytes, and get_source()
+reads only the envelope's leading fields before handing back a FeedSource
+over the entry.
+"""
+
+#%%
+import gzip
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+
+import json_codec
+from feed_stream import FeedSource, open_entry
+
+logger = logging.getLogger('umpireauditor')
+
+# A regular season of plain game feeds is about 20 GB, so a one-season
+# backfill fits without evicting its own entries.
+DEFAULT_MAX_BYTES = 32 * 1024 ** 3
+# Share of max_bytes an eviction frees the cache down to.
+EVICT_TO = 0.9
+DEFAULT_TTL = 60
+
+#%% Helpers
+
+def game_is_final(game_data):
+    return game_data['gameData']['status']['abstractGameState'] == 'Final'
+
+#%% Cache
+
+class FeedCache:
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, refresh=False,
+                 compress=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.refresh = refresh
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._size = sum(size for _, _, size in self._entries())
+
+    def _path(self, kind, key, compress=None):
+        compress = self.compress if compress is None else compress
+        return os.path.join(self.directory, kind, f'{key}.json.gz' if compress else f'{key}.json')
+
+    def _find(self, kind, key):
+        """Path of the existing entry for (kind, key) in either form, or None."""
+        for compress in (self.compress, not self.compress):
+            path = self._path(kind, key, compress)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _read(self, kind, key):
+        if not self.directory or self.refresh:
+            return None
+
+        path = self._find(kind, key)
+        if path is None:
+            return None
+
+        try:
+            with open_entry(path) as f:
+                entry = json_codec.loads(f.read())
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+        os.utime(path)
+        return entry
+
+    def get(self, kind, key, refresh=False):
+        """Return the cached payload if it may be served, else None."""
+        entry = None if refresh else self._read(kind, key)
+        if entry is None:
+            return None
+
+        if not entry['final'] and time.time() - entry['fetched_at'] > self.ttl:
+            return None
+
+        return entry['payload']
+
+    def load(self, kind, key):
+        """Return the cached payload regardless of age (e.g. as the base a
+        live diff is applied to), or None."""
+        entry = self._read(kind, key)
+        return entry['payload'] if entry is not None else None
+
+    def get_source(self, kind, key, refresh=False):
+        """Return a FeedSource over the cached entry if it may be served,
+        else None. Only the entry's final/fetched_at fields are decoded."""
+        import ijson
+
+        source = None
+
+        path = self._find(kind, key) if self.directory and not (self.refresh or refresh) else None
+        if path is not None:
+            try:
+                with open_entry(path) as f:
+                    # put() and put_body() both write these two ahead of the
+                    # payload, so the payload itself is never reached.
+                    head = dict(itertools.islice(ijson.kvitems(f, '', use_float=True), 2))
+                fresh = head['final'] or time.time() - head['fetched_at'] <= self.ttl
+            except (FileNotFoundError, OSError, ValueError, KeyError, ijson.JSONError):
+                fresh = False
+
+            if fresh:
+                os.utime(path)
+                source = FeedSource.cache_entry(path)
+
+        with self._lock:
+            if source is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return source
+
+    def put(self, kind, key, payload, final):
+        entry = {'final': final, 'fetched_at': time.time(), 'payload': payload}
+        self._write(kind, key, lambda f: f.write(json_codec.dumps(entry)))
+
+    def put_body(self, kind, key, body, final):
+        """Write a raw JSON body (a binary file) as the payload of an entry.
+        Returns a FeedSource over the new entry, or None without a cache."""
+        head = json_codec.dumps({'final': final, 'fetched_at': time.time()})
+
+        def write(f):
+            f.write(head[:-1] + b',"payload":')
+            body.seek(0)
+            shutil.copyfileobj(body, f)
+            f.write(b'}')
+
+        path = self._write(kind, key, write)
+        return FeedSource.cache_entry(path) if path else None
+
+    def _write(self, kind, key, write):
+        if not self.directory:
+            return None
+
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            old_size = os.path.getsize(path)
+        except FileNotFoundError:
+            old_size = 0
+
+        # Write to a temp file and rename so a concurrent reader never sees a
+        # half-written entry.
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with (gzip.open(tmp_path, 'wb', compresslevel=6) if self.compress else open(tmp_path, 'wb')) as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+        # The entry in the other form, if any, is now stale.
+        try:
+            other_path = self._path(kind, key, not self.compress)
+            old_size += os.path.getsize(other_path)
+            os.remove(other_path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self._size += os.path.getsize(path) - old_size
+            over = self._size > self.max_bytes
+
+        if over:
+            self.evict()
+
+        return path
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache is under
+        EVICT_TO of its cap."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            self._size = sum(size for _, _, size in entries)
+
+            for path, _, size in entries:
+                if self._size <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self._size -= size
+                logger.debug('Evicted cached feed %s', path)
+
+    def fetch(self, kind, key, loader, final=None, refresh=False):
+        """Serve (kind, key) from the cache or call loader() and write the
+        result through. `final` is either a bool or a callable deciding it
+        from the fresh payload (the game feed knows its own status).
+        `refresh` skips the cached entry, even a final one, and replaces it."""
+        payload = self.get(kind, key, refresh)
+        if payload is not None:
+            with self._lock:
+                self.hits += 1
+            return payload
+
+        with self._lock:
+            self.misses += 1
+
+        payload = loader()
+        is_final = final(payload) if callable(final) else bool(final)
+        self.put(kind, key, payload, is_final)
+        return payload
+
+    def log_stats(self, logger):
+        if self.directory:
+            logger.info('Feed cache: %s hits, %s misses, %.1f MB on disk',
+                        self.hits, self.misses, self._size / 1024 ** 2)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass parser of a game feed's plays.
+
+parse_plays() visits every event of liveData.plays.allPlays once and, in that
+one walk, collects the called pitches (scored as they are built), the
+ejections, the catcher substitutions and the first pitch's media offsets.
+Timestamps are parsed only for the events that are kept: called B/C pitches
+with coordinates, ejections, the first pitch and catcher changes.
+
+With play_indices (a live diff), only those plays yield pitches and
+ejections; catcher changes and the first pitch still come from every play.
+
+allPlays is only iterated, once, so it may be a feed_stream.StreamedPlays
+that decodes plays as they are reached; the position of the last play is
+returned for the sync record since such a list cannot be indexed afterwards.
+"""
+
+#%%
+from datetime import datetime
+
+from catcher_timeline import CatcherTimeline, is_catcher_substitution
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+TIME_FORMAT_MS = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+#%% Helpers
+
+def convert_timedelta(duration):
+    total_seconds = duration.total_seconds()
+
+    # Occasional bugs in the API where the date is wrong
+    if (total_seconds > 86400 or total_seconds < 0):
+        return None
+
+    milliseconds = int(total_seconds % 1 * 100)
+    seconds = f"{int(total_seconds % 60):02d}"
+    minutes = f"{int((total_seconds % 3600) // 60):02d}"
+    hours = f"{int(total_seconds // 3600):02d}"
+
+    return '{}:{}:{}.{}'.format(hours, minutes, seconds, milliseconds)
+
+def offsets(when, start_time_home, start_time_away):
+    """(timestamp_home, timestamp_away, seconds_home, seconds_away) of a feed
+    time relative to the two broadcast starts."""
+    return (
+        convert_timedelta(when - start_time_home) if start_time_home else None,
+        convert_timedelta(when - start_time_away) if start_time_away else None,
+        (when - start_time_home).seconds if start_time_home else None,
+        (when - start_time_away).seconds if start_time_away else None,
+    )
+
+def flip_overturned(pitch, review):
+    """Copy an ABS challenge review onto the pitch. An overturned call has
+    its code flipped back to what the umpire actually called, so
+    correct_call evaluates the umpire."""
+    pitch['is_abs_challenge'] = True
+    pitch['abs_challenge_overturned'] = review.get('isOverturned', False)
+    pitch['abs_challenge_team_id'] = review.get('challengeTeamId')
+    pitch['abs_challenge_player_id'] = review['player']['id'] if 'player' in review else None
+
+    if pitch['abs_challenge_overturned']:
+        pitch['code'] = 'C' if pitch['code'] == 'B' else 'B'
+
+#%% Catchers
+
+def starting_catcher(players):
+    starting_id = None
+    for value in players.values():
+        isCatcher = value['position']['name'] == 'Catcher'
+        isSub = value['gameStatus']['isSubstitute'] == True
+        onBench = value['gameStatus']['isOnBench'] == True
+        if isCatcher and not isSub and not onBench:
+            starting_id = value['person']['id']
+    return starting_id
+
+def catcher_timelines(boxscore_teams):
+    """Empty (home, away) catcher timelines from liveData.boxscore.teams,
+    for parse_plays() to fill."""
+    return tuple(
+        CatcherTimeline(starting_catcher(boxscore_teams[side]['players']),
+                        [player['person']['id'] for player in boxscore_teams[side]['players'].values()])
+        for side in ('home', 'away')
+    )
+
+#%% Plays
+
+def parse_plays(play_data, play_indices=None):
+    """Parse liveData.plays (with the broadcast starts, media fields and
+    catcher timelines added to it) into
+    {'game_pitches', 'game_ejections', 'game_media', 'last_play_position'}."""
+    # numpy comes with scoring, so it is only loaded once a game is parsed.
+    from scoring import set_trajectory, assign_call_metrics
+
+    game_pitches = []
+    game_ejections = []
+
+    start_time_home = play_data['start_time_home']
+    start_time_away = play_data['start_time_away']
+    media = {key: play_data[key] for key in (
+        'home_media_id', 'away_media_id', 'home_media_call_letters', 'away_media_call_letters',
+        'home_media_state', 'away_media_state')}
+    home_catchers = play_data['home_catchers']
+    away_catchers = play_data['away_catchers']
+
+    first_pitch_datetime_start = None
+    last_play = None
+
+    for play_index, play in enumerate(play_data['allPlays']):
+        last_play = play
+        parsed = play_indices is None or play_index in play_indices
+
+        # Pitches are only kept from plays with a result, but ejections are
+        # scanned in every parsed play: one during a play without called
+        # pitches (fouls, balls in play) must not be dropped.
+        keep_pitches = parsed and 'description' in play['result']
+        if keep_pitches:
+            description = play['result']['description']
+            inning = play['about']['inning']
+            inning_half = play['about']['halfInning']
+            outs = play['count']['outs']
+            batter_hand = play['matchup']['batSide']['code']
+            ## WHAT HAPPENS WHEN THERE'S A MID ATBAT PITCHER CHANGE?
+            batter_id = play['matchup']['batter']['id']
+            pitcher_id = play['matchup']['pitcher']['id']
+
+        # The count before each pitch is the count after the previous one.
+        count = {'balls': 0, 'strikes': 0}
+
+        for event in play['playEvents']:
+            if event['isPitch']:
+                if first_pitch_datetime_start is None:
+                    first_pitch_datetime_start = datetime.strptime(event['startTime'], TIME_FORMAT_MS)
+
+                if not keep_pitches:
+                    continue
+                count_before, count = count, event['count']
+
+                code = event['details']['code']
+                if code != 'B' and code != 'C':
+                    continue
+
+                row = event['pitchData']
+                if not 'pX' in row['coordinates']:
+                    continue
+
+                pitch_start_time = datetime.strptime(event['startTime'], TIME_FORMAT_MS)
+                timestamp_home, timestamp_away, seconds_home, seconds_away = offsets(
+                    pitch_start_time, start_time_home, start_time_away)
+
+                pitch = {
+                    "id": event['playId'],
+                    "play_description": description,
+                    "inning": inning,
+                    "inning_half": inning_half,
+                    "outs": outs,
+                    "bat_side": batter_hand,
+                    "sz_top": row['strikeZoneTop'],
+                    "sz_bottom": row['strikeZoneBottom'],
+                    "px": row['coordinates']['pX'],
+                    "pz": row['coordinates']['pZ'],
+                    "code": code,
+                    "strikes": count_before['strikes'],
+                    'balls': count_before['balls'],
+                    'datetime_start': pitch_start_time,
+                    'timestamp_start_home': timestamp_home,
+                    'timestamp_start_away': timestamp_away,
+                    'start_seconds_home': seconds_home,
+                    'start_seconds_away': seconds_away,
+                    'batter_id': batter_id,
+                    'pitcher_id': pitcher_id,
+                    'catcher_id': None,
+                    **media,
+                }
+
+                if "endTime" in event:
+                    end_time = datetime.strptime(event['endTime'], TIME_FORMAT_MS)
+                    pitch['timestamp_end_home'], pitch['timestamp_end_away'], _, _ = offsets(
+                        end_time, start_time_home, start_time_away)
+
+                # ABS Challenge tracking
+                review = event.get('reviewDetails')
+                if review and review.get('reviewType') == 'MJ':
+                    flip_overturned(pitch, review)
+
+                set_trajectory(pitch, row['coordinates'])
+                assign_call_metrics(pitch, pitch_start_time, inning_half)
+
+                game_pitches.append(pitch)
+                continue
+
+            if is_catcher_substitution(event):
+                home_catchers.add_event(event)
+                away_catchers.add_event(event)
+
+            if not parsed:
+                continue
+
+            try:
+                if event['details']['eventType'] == 'ejection':
+                    start_time = datetime.strptime(event['startTime'], TIME_FORMAT_MS)
+                    timestamp_home, timestamp_away, seconds_home, seconds_away = offsets(
+                        start_time, start_time_home, start_time_away)
+
+                    game_ejections.append({
+                        'description': event['details']['description'],
+                        'timestamp_start_home': timestamp_home,
+                        'timestamp_start_away': timestamp_away,
+                        'start_seconds_home': seconds_home,
+                        'start_seconds_away': seconds_away,
+                        'player_id': event['player']['id'],
+                        'umpire_id': event['umpire']['id'],
+                        'home_media_id': media['home_media_id'],
+                        'away_media_id': media['away_media_id']
+                    })
+            except KeyError:
+                pass
+
+        # Fill missing ABS challenge data from play-level reviewDetails.
+        # The MLB API sometimes omits reviewDetails on individual pitch events
+        # but includes it on the play (at-bat) object itself.
+        play_review = play.get('reviewDetails') if keep_pitches else None
+        if play_review and play_review.get('reviewType') == 'MJ' and game_pitches:
+            last_pitch = game_pitches[-1]
+            if not last_pitch.get('is_abs_challenge') and last_pitch.get('play_description') == description:
+                flip_overturned(last_pitch, play_review)
+
+                # Recalculate correctness and miss distances (front + midline)
+                # with the updated code. Trajectory was already set on the
+                # main path, so px_mid/pz_mid are present.
+                assign_call_metrics(last_pitch, last_pitch['datetime_start'], inning_half)
+
+    # Catchers are looked up once every substitution in the feed is known.
+    for pitch in game_pitches:
+        catchers = home_catchers if pitch['inning_half'] == 'top' else away_catchers
+        pitch['catcher_id'] = catchers[pitch['datetime_start']]
+
+    if first_pitch_datetime_start is not None:
+        _, _, first_seconds_home, first_seconds_away = offsets(
+            first_pitch_datetime_start, start_time_home, start_time_away)
+    else:
+        first_seconds_home = first_seconds_away = None
+
+    game_media = {
+        **media,
+        "first_pitch_datetime_start": first_pitch_datetime_start,
+        "first_pitch_start_seconds_home": first_seconds_home,
+        "first_pitch_start_seconds_away": first_seconds_away,
+    }
+
+    # (atBatIndex, pitch index) of the most recent play event, as
+    # live_feed.last_play_position() reads it off a decoded feed.
+    if last_play is not None:
+        last_play_position = (last_play['about']['atBatIndex'], len(last_play['playEvents']) - 1)
+    else:
+        last_play_position = (None, None)
+
+    return {'game_pitches': game_pitches, 'game_ejections': game_ejections, 'game_media': game_media,
+            'last_play_position': last_play_position}
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming decode of game feeds, for runs that must not hold whole feeds.
+
+A full live feed of an extra-inning game is 5-15 MB of JSON and several times
+that once decoded. With --stream the updater never decodes one whole:
+
+  read_header()  decodes only the subtrees the updater reads outside the
+                 play list (metaData, gameData.game/datetime/status/teams/
+                 players, liveData.boxscore) into a small game_data dict
+  StreamedPlays  stands in for liveData.plays.allPlays and decodes one play
+                 at a time each time it is iterated
+
+Both read the JSON from a FeedSource, either a feed cache entry on disk or a
+spooled download, so the feed's bytes stay out of memory too. A game's
+decoded state is then its header, one play and the rows derived so far,
+which stays under GAME_MEMORY_BUDGET whatever the feed's size.
+"""
+
+#%%
+import gzip
+from contextlib import contextmanager
+
+# Bytes of Python objects one game may hold while it is decoded and parsed
+# from a FeedSource (header, current play and the derived pitch rows).
+GAME_MEMORY_BUDGET = 16 * 1024 ** 2
+
+HEADER_PATHS = [
+    'metaData',
+    'gameData.game',
+    'gameData.datetime',
+    'gameData.status',
+    'gameData.teams',
+    'gameData.players',
+    'liveData.boxscore',
+]
+PLAYS_PATH = 'liveData.plays.allPlays.item'
+
+#%% Sources
+
+def open_entry(path):
+    """Open a feed cache entry, plain or gzipped, for binary reading."""
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+class FeedSource:
+    """Where a feed's JSON can be read from, as many times as needed: a
+    feed cache entry (the feed under its 'payload' key) or a binary file
+    holding the raw body."""
+
+    def __init__(self, path=None, body=None, prefix=''):
+        self.path = path
+        self.body = body
+        self.prefix = prefix
+
+    @classmethod
+    def cache_entry(cls, path):
+        return cls(path=path, prefix='payload.')
+
+    @contextmanager
+    def open(self):
+        if self.path is not None:
+            with open_entry(self.path) as f:
+                yield f
+        else:
+            self.body.seek(0)
+            yield self.body
+
+#%% Decoding
+
+def _place(game_data, path, value):
+    *parents, key = path.split('.')
+    node = game_data
+    for parent in parents:
+        node = node.setdefault(parent, {})
+    node[key] = value
+
+def read_header(source):
+    """game_data with the HEADER_PATHS subtrees of the feed and a
+    StreamedPlays as liveData.plays.allPlays."""
+    # Only --stream runs decode this way, so ijson stays out of startup.
+    import ijson
+
+    wanted = {source.prefix + path: path for path in HEADER_PATHS}
+    game_data = {}
+    builder = building = None
+
+    with source.open() as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == building and event in ('end_map', 'end_array'):
+                    _place(game_data, wanted.pop(building), builder.value)
+                    builder = None
+                    if not wanted:
+                        break
+            elif prefix in wanted:
+                if event in ('start_map', 'start_array'):
+                    builder, building = ijson.ObjectBuilder(), prefix
+                    builder.event(event, value)
+                elif event != 'map_key':
+                    _place(game_data, wanted.pop(prefix), value)
+
+    game_data.setdefault('liveData', {})['plays'] = {'allPlays': StreamedPlays(source)}
+    return game_data
+
+class StreamedPlays:
+    """liveData.plays.allPlays of a streamed feed. Each iteration decodes the
+    plays afresh, one at a time; nothing is kept between iterations."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def __iter__(self):
+        import ijson
+
+        with self.source.open() as f:
+            yield from ijson.items(f, self.source.prefix + PLAYS_PATH, use_float=True)
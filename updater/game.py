@@ -36,6 +36,49 @@ class Game:
    first_pitch_datetime_start: datetime
    first_pitch_start_seconds_home: int
    first_pitch_start_seconds_away: int
+   home_broadcast_start: datetime = None
+   away_broadcast_start: datetime = None
    
    def get_values(self):
-       return tuple(vars(self).values())
\ No newline at end of file
+       return tuple(vars(self).values())
+
+#%%
+@dataclass
+class CallTally:
+   """A game's call counts, added up one pitch at a time as its Pitch rows
+   are built."""
+   pitches: int = 0
+   correct_calls: int = 0
+   incorrect_calls: int = 0
+   calls_benefit_home: int = 0
+   calls_benefit_away: int = 0
+
+   def add(self, pitch):
+       self.pitches += 1
+       if pitch.correct_call is not None:
+           if pitch.correct_call:
+               self.correct_calls += 1
+           else:
+               self.incorrect_calls += 1
+
+       if pitch.home_away_benefit == 'home':
+           self.calls_benefit_home += 1
+       elif pitch.home_away_benefit == 'away':
+           self.calls_benefit_away += 1
+
+   def game_fields(self):
+       """The call columns of the Game row. A game without pitch tracking
+       (e.g. the Tokyo Dome games) has them all None."""
+       if self.pitches == 0:
+           return dict(correct_calls=None, incorrect_calls=None, total_calls=None,
+                       calls_benefit_home=None, calls_benefit_away=None, correct_call_rate=None)
+
+       total_calls = self.correct_calls + self.incorrect_calls
+       return dict(
+           correct_calls=self.correct_calls,
+           incorrect_calls=self.incorrect_calls,
+           total_calls=total_calls,
+           calls_benefit_home=self.calls_benefit_home,
+           calls_benefit_away=self.calls_benefit_away,
+           correct_call_rate=self.correct_calls / total_calls * 100 if total_calls else None,
+       )
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+The rows the updater derives from one game feed.
+
+build_game_rows() turns a fetched game (its decoded feed, media ids and the
+broadcast starts) into a GameRows: the reference rows (umpire, teams,
+players), the game, its pitches and ejections, and the sync record that
+fingerprints them. It only computes, so it runs the same on a worker thread
+or, for backfills, in a worker process: parse_feed() decodes a raw feed
+there and returns the rows to the single writer in the main process.
+"""
+
+#%%
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime
+
+import feed_parser
+import game_sync
+import json_codec
+from ejection import Ejection
+from game import Game, CallTally
+from game_sync import GameSync
+from pitch import Pitch
+from player import Player
+from team import Team
+from umpire import Umpire
+
+# Regular, Wildcard, Divisional, League, WS
+TRACKED_GAME_TYPES = ['R', 'F', 'D', 'L', 'W']
+
+# An empty liveData.boxscore.officials in a raw feed, compact or pretty-printed.
+NO_OFFICIALS = re.compile(rb'"officials"\s*:\s*\[\s*\]')
+
+#%% Get HP Umpire
+
+def get_hp_umpire(official):
+    if (official['officialType'] == 'Home Plate'):
+        return True
+    else:
+        return False
+
+#%% Parse Player Data
+
+def parse_player_data(player_data):
+    if (player_data['isPlayer'] == False and 'batSide' not in player_data):
+        return
+    else:
+        return Player(id = player_data['id'], name = player_data['fullName'])
+
+#%% Add Game Data
+
+def add_game_data(pitch, game_data):
+    pitch['umpire_id'] = game_data['umpire_id']
+    pitch['umpire_name'] = game_data['umpire_name']
+    pitch['game_id'] = game_data['game_id']
+    pitch['home_team'] = game_data['home_team']
+    pitch['away_team'] = game_data['away_team']
+    pitch['home_team_id'] = game_data['home_team_id']
+    pitch['away_team_id'] = game_data['away_team_id']
+    pitch['game_date'] = game_data['game_date']
+
+    if pitch['correct_call'] != True:
+
+        if pitch['home_away_benefit'] == 'home':
+            pitch['team_benefit'] = game_data['home_team']
+            pitch['team_benefit_id'] = game_data['home_team_id']
+            pitch['team_hurt'] = game_data['away_team']
+            pitch['team_hurt_id'] = game_data['away_team_id']
+        elif pitch['home_away_benefit'] == 'away':
+            pitch['team_benefit'] = game_data['away_team']
+            pitch['team_benefit_id'] = game_data['away_team_id']
+            pitch['team_hurt'] = game_data['home_team']
+            pitch['team_hurt_id'] = game_data['home_team_id']
+
+    return Pitch(**pitch)
+
+#%% Add Ejection Data
+def add_game_ejection_data(ejection, game_data):
+    ejection['id'] = hashlib.sha256((str(game_data['game_id']) + str(game_data['umpire_id']) + str(ejection['player_id'])).encode('utf-8')).hexdigest()
+    ejection['umpire_id'] = game_data['umpire_id']
+    ejection['umpire_name'] = game_data['umpire_name']
+    ejection['game_id'] = game_data['game_id']
+    ejection['home_team'] = game_data['home_team']
+    ejection['away_team'] = game_data['away_team']
+    ejection['home_team_id'] = game_data['home_team_id']
+    ejection['away_team_id'] = game_data['away_team_id']
+    ejection['game_date'] = game_data['game_date']
+
+    return Ejection(**ejection)
+
+#%% Reference Rows
+
+def reference_rows(game_data):
+    """The plate umpire, home team, away team and player rows of a game."""
+    officials = game_data['liveData']['boxscore']['officials']
+
+    hp_umpire = next(filter(get_hp_umpire, officials))['official']
+    umpire_obj = Umpire(id = hp_umpire['id'], name = hp_umpire['fullName'])
+
+    team_data = game_data['gameData']['teams']
+
+    home_team = team_data['home']
+    home_team_obj = Team(
+        id = home_team['id'],
+        name = home_team['name'],
+        abbreviation = home_team['abbreviation'])
+
+    away_team = team_data['away']
+    away_team_obj = Team(
+        id = away_team['id'],
+        name = away_team['name'],
+        abbreviation = away_team['abbreviation'])
+
+    game_players = game_data['gameData']['players']
+    player_rows = [p for p in map(parse_player_data, game_players.values()) if p is not None]
+
+    return (umpire_obj, home_team_obj, away_team_obj, player_rows)
+
+#%% Tracked games
+
+def is_tracked(game_data):
+    """Whether the updater keeps rows for a game: a tracked game type with
+    umpires assigned (there are none on rainouts)."""
+    if game_data['gameData']['game']['type'] not in TRACKED_GAME_TYPES:
+        return False
+
+    officials = game_data['liveData']['boxscore']['officials']
+    return len(officials) != 0
+
+def has_officials(feed):
+    """is_tracked()'s officials check on a raw feed (or feed cache entry),
+    without decoding it. 'officials' is only a key of liveData.boxscore, which
+    comes after the plays, so the last occurrence is searched for."""
+    position = feed.rfind(b'"officials"')
+    return position == -1 or NO_OFFICIALS.match(feed, position) is None
+
+#%% Game rows
+
+@dataclass
+class GameRows:
+    umpire: Umpire
+    home_team: Team
+    away_team: Team
+    players: list
+    game: Game
+    pitches: list
+    ejections: list
+    sync: GameSync
+    incremental: bool = False
+
+    def reference_rows(self):
+        return (self.umpire, self.home_team, self.away_team, self.players)
+
+def build_game_rows(game, broadcast_starts):
+    """GameRows of a fetched game; see fetch_game() in umpire-auditor.py for
+    the keys of `game`."""
+
+#%%%
+
+    game_id = game['game_id']
+    game_data = game['game_data']
+    media = game['media']
+    play_indices = game.get('play_indices')
+    incremental = play_indices is not None
+
+#%%% Reference rows
+
+    umpire_obj, home_team_obj, away_team_obj, player_rows = reference_rows(game_data)
+
+    hp_umpire_id = umpire_obj.id
+    hp_umpire_name = umpire_obj.name
+    home_team_id = home_team_obj.id
+    home_team_abbreviation = home_team_obj.abbreviation
+    away_team_id = away_team_obj.id
+    away_team_abbreviation = away_team_obj.abbreviation
+
+#%%% Game
+
+    game_date = game_data['gameData']['datetime']['officialDate']
+    game_type = game_data['gameData']['game']['type']
+
+#%%% ADD PITCHES
+
+    play_data = game_data['liveData']['plays']
+
+    play_data['start_time_away'] = broadcast_starts[media['away_media_id']]
+    play_data['start_time_home'] = broadcast_starts[media['home_media_id']]
+    play_data.update(media)
+
+    # Filled with the catcher changes as parse_plays() walks the play events.
+    play_data['home_catchers'], play_data['away_catchers'] = feed_parser.catcher_timelines(
+        game_data['liveData']['boxscore']['teams'])
+
+    pitches_data = feed_parser.parse_plays(play_data, play_indices)
+
+    pitch_rows = pitches_data.pop('game_pitches')
+
+    pitch_game_data = {
+        'umpire_id': hp_umpire_id,
+        'umpire_name': hp_umpire_name,
+        'game_id': game_id,
+        'home_team': home_team_abbreviation,
+        'away_team': away_team_abbreviation,
+        'home_team_id': home_team_id,
+        'away_team_id': away_team_id,
+        'game_date': game_date
+    }
+
+    # The game's call counts are tallied in the same pass that builds its
+    # Pitch rows. Each parsed dict is let go once its Pitch exists, so a
+    # game's pitches are never held twice.
+    tally = CallTally()
+    pitch_list = []
+    for i in range(len(pitch_rows)):
+        pitch = add_game_data(pitch_rows[i], pitch_game_data)
+        pitch_rows[i] = None
+        tally.add(pitch)
+        pitch_list.append(pitch)
+
+    ejection_rows = pitches_data['game_ejections']
+    ejection_list = list(map(lambda p: add_game_ejection_data(p, pitch_game_data), ejection_rows))
+
+#%%# Create Game
+
+    media_data = pitches_data['game_media']
+
+    # Games like the one at Tokyo Dome are regular season but have no pitch
+    # tracking; their call columns stay None.
+    game_object = Game(
+        id = game_id,
+        home_team = home_team_abbreviation,
+        away_team = away_team_abbreviation,
+        game_date = game_date,
+        game_type = game_type,
+        **tally.game_fields(),
+        umpire_name = hp_umpire_name,
+        umpire_id = hp_umpire_id,
+        home_team_id = home_team_id,
+        away_team_id = away_team_id,
+        home_media_id = media_data['home_media_id'],
+        away_media_id = media_data['away_media_id'],
+        home_media_call_letters = media_data['home_media_call_letters'],
+        away_media_call_letters = media_data['away_media_call_letters'],
+        home_media_state = media_data['home_media_state'],
+        away_media_state = media_data['away_media_state'],
+        first_pitch_datetime_start = media_data['first_pitch_datetime_start'],
+        first_pitch_start_seconds_home = media_data['first_pitch_start_seconds_home'],
+        first_pitch_start_seconds_away = media_data['first_pitch_start_seconds_away'],
+        home_broadcast_start = play_data['start_time_home'],
+        away_broadcast_start = play_data['start_time_away'],
+    )
+
+#%%% Sync check
+
+    # Every derived row goes into the fingerprint, so a feed that moved only
+    # in ways the updater ignores (e.g. a boxscore note) skips all writes.
+    # An incremental pass only sees the changed plays, so its rows are not a
+    # fingerprint of the whole game.
+    rows = [umpire_obj, home_team_obj, away_team_obj, *player_rows, game_object, *pitch_list, *ejection_list]
+    last_at_bat_index, last_pitch_index = pitches_data['last_play_position']
+    sync = GameSync(
+        id = game_id,
+        status = game_sync.feed_status(game_data),
+        feed_timestamp = game_sync.feed_timestamp(game_data),
+        fingerprint = None if incremental else game_sync.fingerprint(rows),
+        synced_at = datetime.utcnow(),
+        last_at_bat_index = last_at_bat_index,
+        last_pitch_index = last_pitch_index)
+
+
+    return GameRows(
+        umpire = umpire_obj,
+        home_team = home_team_obj,
+        away_team = away_team_obj,
+        players = player_rows,
+        game = game_object,
+        pitches = pitch_list,
+        ejections = ejection_list,
+        sync = sync,
+        incremental = incremental)
+
+#%% Worker processes
+
+def parse_feed(task):
+    """Worker process entry point of a backfill: decode a raw game feed and
+    build its rows. `task` is a dict of game_id, feed (the JSON bytes, a
+    feed cache entry when `wrapped`), media and the game's broadcast_starts.
+    Returns a dict of game_id, final and rows (None for an untracked game)."""
+    game_data = json_codec.loads(task['feed'])
+    if task['wrapped']:
+        game_data = game_data['payload']
+
+    final = game_sync.feed_status(game_data) == 'Final'
+    if not is_tracked(game_data):
+        return {'game_id': task['game_id'], 'final': final, 'rows': None}
+
+    game = {'game_id': task['game_id'], 'game_data': game_data, 'media': task['media']}
+    return {'game_id': task['game_id'], 'final': final, 'rows': build_game_rows(game, task['broadcast_starts'])}
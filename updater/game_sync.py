@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Per-game sync record.
+
+After a game is written successfully the updater stores its status, the feed
+`metaData.timeStamp`, the last play position and a fingerprint of the derived
+rows. The next cron tick can then skip a Final game whose feed timestamp has
+not moved, pick a live game up from where it left off, and skip the writes
+for a game whose feed changed without changing any derived row.
+"""
+
+#%%
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+
+#%%
+@dataclass
+class GameSync:
+    id: int
+    status: str
+    feed_timestamp: str
+    fingerprint: str
+    synced_at: datetime
+    # Position of the last play event written, so a live game can be picked
+    # up incrementally on the next tick.
+    last_at_bat_index: int = None
+    last_pitch_index: int = None
+
+    def get_values(self):
+        return tuple(vars(self).values())
+
+#%% Helpers
+
+def feed_status(game_data):
+    return game_data['gameData']['status']['abstractGameState']
+
+def feed_timestamp(game_data):
+    return game_data['metaData']['timeStamp']
+
+def fingerprint(rows):
+    """Stable hash of a sequence of dataclass rows (anything with get_values)."""
+    h = hashlib.sha256()
+    for row in rows:
+        h.update(repr(row.get_values()).encode('utf-8'))
+    return h.hexdigest()
+
+def is_final(record):
+    return record is not None and record.status == 'Final'
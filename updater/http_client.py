@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Shared HTTP client for every outbound request the updater makes.
+
+One requests.Session holds a keep-alive connection pool per host, so the
+statsapi, mastapi and media-gateway calls reuse TCP+TLS connections instead
+of paying setup on every small request. The default transport adds gzip
+negotiation, timeouts and bounded retry with exponential backoff; per-host
+counters (requests, errors, bytes, latency) are kept for logging.
+
+JSON responses are decoded from the raw body bytes with json_codec (orjson
+when installed) rather than through Response.json().
+
+Tests can pass their own requests transport adapter (anything implementing
+requests.adapters.BaseAdapter) to swap the network for a local fake.
+"""
+
+#%%
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import json_codec
+
+#%% Defaults
+
+# (connect, read) seconds. The game feed for an extra-inning game can be
+# 10+ MB, so the read timeout is generous.
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_POOL_SIZE = 16
+# Streamed downloads are held in memory up to this size, then spill to disk.
+DEFAULT_SPOOL_BYTES = 1024 ** 2
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+#%% Stats
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mean_ms(self):
+        return (self.seconds / self.requests * 1000) if self.requests else 0.0
+
+#%% Client
+
+def default_transport(pool_size=DEFAULT_POOL_SIZE, retries=RETRY_TOTAL, backoff=RETRY_BACKOFF):
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        # The GraphQL mediaInfo POST is a read-only query, so it is as safe
+        # to retry as the GETs.
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+
+class HttpClient:
+
+    def __init__(self, transport=None, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+        if transport is None:
+            transport = default_transport(pool_size)
+
+        self.session.mount('https://', transport)
+        self.session.mount('http://', transport)
+
+        self._stats = defaultdict(HostStats)
+        self._lock = threading.Lock()
+
+    def _record(self, host, elapsed, size, ok):
+        with self._lock:
+            stats = self._stats[host]
+            stats.requests += 1
+            stats.seconds += elapsed
+            stats.bytes += size
+            if not ok:
+                stats.errors += 1
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        size = 0
+        ok = False
+
+        try:
+            res = self.session.request(method, url, **kwargs)
+            res.raise_for_status()
+            size = len(res.content)
+            ok = True
+            return res
+        finally:
+            self._record(host, time.perf_counter() - start, size, ok)
+
+    def download(self, url, params=None, spool_bytes=DEFAULT_SPOOL_BYTES):
+        """GET url into a binary temporary file, positioned at its start,
+        without holding the whole body in memory."""
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        body = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        size = 0
+        ok = False
+
+        try:
+            with self.session.get(url, params=params, timeout=self.timeout, stream=True) as res:
+                res.raise_for_status()
+                for chunk in res.iter_content(DOWNLOAD_CHUNK_BYTES):
+                    body.write(chunk)
+                    size += len(chunk)
+            body.seek(0)
+            ok = True
+            return body
+        finally:
+            if not ok:
+                body.close()
+            self._record(host, time.perf_counter() - start, size, ok)
+
+    def get(self, url, params=None):
+        return self.request('GET', url, params=params)
+
+    def post(self, url, json=None):
+        return self.request('POST', url, json=json)
+
+    def get_bytes(self, url, params=None):
+        return self.get(url, params).content
+
+    def get_json(self, url, params=None):
+        return json_codec.loads(self.get_bytes(url, params))
+
+    def post_json(self, url, json=None):
+        return json_codec.loads(self.post(url, json).content)
+
+    def stats(self):
+        with self._lock:
+            return {host: HostStats(**vars(s)) for host, s in self._stats.items()}
+
+    def log_stats(self, logger):
+        for host, s in sorted(self.stats().items()):
+            logger.info('HTTP %s: %s requests, %s errors, %.1f KB, %.0f ms mean',
+                        host, s.requests, s.errors, s.bytes / 1024, s.mean_ms)
+
+    def close(self):
+        self.session.close()
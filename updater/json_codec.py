@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+JSON encoding and decoding for API responses and feed cache entries.
+
+Decoding the game feeds is most of the updater's CPU time. orjson decodes
+them about twice as fast as the stdlib json module and is used when it is
+installed; otherwise the stdlib is used, with the same results. Both work on
+bytes, so responses are decoded straight from the body without requests
+first guessing its text encoding.
+
+BACKEND names the one in use.
+"""
+
+#%%
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+#%% Codec
+
+def loads(data):
+    """Decode JSON from bytes (or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj):
+    """Encode obj as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental updates for in-progress games.
+
+Rather than re-downloading a live feed every tick, the updater asks the stats
+API for the JSON-patch diff since the feed it processed last (kept in the feed
+cache) and applies it locally. The patch paths also tell us which plays
+changed, so only those are re-parsed, re-scored and upserted. Anything that
+cannot be lined up safely (the API answering with a full feed that reorders
+plays, a patch touching the play list wholesale, a state mismatch with the
+last sync) makes the caller fall back to a full rebuild.
+
+A diff can only be applied to the exact feed the last sync wrote, so this
+only runs when that feed is in a feed cache that outlives the run
+(--cache-dir on a persistent directory). The Render cron job starts every
+tick in a fresh container without one, so there every live game is fully
+rebuilt each tick; the saving applies to long-lived hosts that run the
+updater in a loop or keep the cache on a disk.
+"""
+
+#%%
+import logging
+
+import mlb_api
+
+logger = logging.getLogger('umpireauditor')
+
+PLAYS_PATH = ['liveData', 'plays', 'allPlays']
+
+class PatchError(Exception):
+    pass
+
+#%% JSON patch
+
+def _pointer(path):
+    return [p.replace('~1', '/').replace('~0', '~') for p in path.split('/')[1:]]
+
+def _child(node, key):
+    return node[int(key)] if isinstance(node, list) else node[key]
+
+def apply_patch(doc, ops):
+    """Apply RFC 6902 add/replace/remove ops to doc in place. Returns the
+    (possibly replaced) document."""
+    for op in ops:
+        kind = op['op']
+        parts = _pointer(op['path'])
+
+        if not parts:
+            if kind not in ('add', 'replace'):
+                raise PatchError(f'unsupported root op {kind}')
+            doc = op['value']
+            continue
+
+        parent = doc
+        for key in parts[:-1]:
+            parent = _child(parent, key)
+        key = parts[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if key == '-' else int(key)
+            if kind == 'add':
+                parent.insert(index, op['value'])
+            elif kind == 'replace':
+                parent[index] = op['value']
+            elif kind == 'remove':
+                del parent[index]
+            else:
+                raise PatchError(f'unsupported op {kind}')
+        else:
+            if kind in ('add', 'replace'):
+                parent[key] = op['value']
+            elif kind == 'remove':
+                del parent[key]
+            else:
+                raise PatchError(f'unsupported op {kind}')
+
+    return doc
+
+def touched_plays(ops, play_count):
+    """Indices into allPlays touched by a patch, or None if the patch shifts
+    or replaces the play list so indices from the previous feed are no longer
+    comparable. play_count is the number of plays before the patch."""
+    changed = set()
+
+    for op in ops:
+        parts = _pointer(op['path'])
+        prefix = parts[:len(PLAYS_PATH)]
+
+        if prefix != PLAYS_PATH[:len(prefix)]:
+            continue
+        if len(parts) <= len(PLAYS_PATH):
+            return None
+
+        key = parts[len(PLAYS_PATH)]
+        index = play_count if key == '-' else int(key)
+
+        if len(parts) == len(PLAYS_PATH) + 1:
+            # Appending a play is the normal case; inserting or removing one
+            # in the middle shifts every later index.
+            if op['op'] == 'add' and index == play_count:
+                play_count += 1
+            elif op['op'] != 'replace':
+                return None
+
+        changed.add(index)
+
+    return changed
+
+#%% State
+
+def last_play_position(game_data):
+    """(atBatIndex, pitch index) of the most recent play event in a feed."""
+    all_plays = game_data['liveData']['plays']['allPlays']
+    if not all_plays:
+        return (None, None)
+    last_play = all_plays[-1]
+    return (last_play['about']['atBatIndex'], len(last_play['playEvents']) - 1)
+
+def matches_sync(previous, sync):
+    """The cached previous feed is only a valid base if it is exactly the feed
+    the last successful sync wrote."""
+    if previous is None or sync is None:
+        return False
+    return (previous['metaData']['timeStamp'] == sync.feed_timestamp and
+            last_play_position(previous) == (sync.last_at_bat_index, sync.last_pitch_index))
+
+#%% Fetch
+
+def fetch_changes(game_id, previous):
+    """Bring `previous` up to date. Returns (game_data, changed play indices)
+    where the indices are None when a full rebuild is needed."""
+    start_timecode = previous['metaData']['timeStamp']
+    previous_plays = previous['liveData']['plays']['allPlays']
+    response = mlb_api.get_game_diff(game_id, start_timecode)
+
+    # The endpoint answers with the whole feed when the diff would be larger;
+    # compare play by play against the previous feed instead.
+    if isinstance(response, dict):
+        plays = response['liveData']['plays']['allPlays']
+        if len(plays) < len(previous_plays):
+            return (response, None)
+        changed = {i for i, play in enumerate(plays) if i >= len(previous_plays) or play != previous_plays[i]}
+        return (response, changed)
+
+    play_count = len(previous_plays)
+    changed = set()
+    game_data = previous
+
+    for patch_set in response:
+        ops = patch_set['diff']
+        touched = touched_plays(ops, play_count)
+        if touched is None:
+            changed = None
+        elif changed is not None:
+            changed |= touched
+        game_data = apply_patch(game_data, ops)
+        play_count = len(game_data['liveData']['plays']['allPlays'])
+
+    logger.debug('Applied %s patch set(s) to game id %s since %s', len(response), game_id, start_timecode)
+    return (game_data, changed)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Broadcast metadata for MLB.tv feeds.
+
+The media-gateway `mediaInfo` query accepts a list of ids, so instead of one
+round trip per feed the updater collects the home and away media ids for
+every game in a run, de-duplicates them and resolves them in a few chunked
+calls.
+
+Once both feeds of a game are archived their media ids, call letters and
+broadcast starts stop changing. Those are kept on the `game` row and loaded
+back as Broadcast records, so archived games skip the EPG and mediaInfo
+requests entirely.
+"""
+
+#%%
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+import mlb_api
+
+logger = logging.getLogger('umpireauditor')
+
+MILESTONE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+ARCHIVED_STATE = 'MEDIA_ARCHIVE'
+
+# Ids per mediaInfo call. A full slate is ~30 feeds, so this is one or two
+# requests per run while keeping the GraphQL payload small.
+MEDIA_INFO_CHUNK = 25
+
+#%% Media feeds
+
+def is_archived(media):
+    """Whether both MLB.tv feeds of a game's media fields are archived."""
+    return (media['home_media_id'] is not None and media['away_media_id'] is not None and
+            media['home_media_state'] == ARCHIVED_STATE and media['away_media_state'] == ARCHIVED_STATE)
+
+def epg_media(media_response):
+    """The media fields of a game (ids, call letters and states of the home
+    and away feeds) from its EPG search response."""
+    media_items = media_response['results'][0]['videoFeeds']
+
+    if (len(media_items) == 0):
+        media_items = media_response['results'][1]['videoFeeds']
+
+    if (len(media_items) == 0):
+        media_items = media_response['results'][2]['videoFeeds']
+
+    if (len(media_items) > 1):
+        first_item_media = media_items[0]
+        second_item_media = media_items[1]
+        home_media_id = first_item_media["mediaId"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["mediaId"]
+        away_media_id = first_item_media["mediaId"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["mediaId"]
+
+        home_media_call_letters = first_item_media["callLetters"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["callLetters"]
+        away_media_call_letters = first_item_media["callLetters"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["callLetters"]
+        home_media_state = first_item_media["mediaState"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["mediaState"]
+        away_media_state = first_item_media["mediaState"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["mediaState"]
+
+    elif (len(media_items) == 1):
+        home_media_id = media_items[0]["mediaId"]
+        away_media_id = media_items[0]["mediaId"]
+        home_media_call_letters = media_items[0]["callLetters"]
+        away_media_call_letters = media_items[0]["callLetters"]
+        home_media_state = media_items[0]["mediaState"]
+        away_media_state = media_items[0]["mediaState"]
+
+    return {
+        'home_media_id': home_media_id,
+        'away_media_id': away_media_id,
+        'home_media_call_letters': home_media_call_letters,
+        'away_media_call_letters': away_media_call_letters,
+        'home_media_state': home_media_state,
+        'away_media_state': away_media_state
+    }
+
+#%% Stored broadcasts
+
+@dataclass
+class Broadcast:
+    id: int
+    home_media_id: str
+    away_media_id: str
+    home_media_call_letters: str
+    away_media_call_letters: str
+    home_media_state: str
+    away_media_state: str
+    home_broadcast_start: datetime
+    away_broadcast_start: datetime
+
+    def is_archived(self):
+        # Rows written before the broadcast start columns existed have them
+        # NULL; reusing those would store every pitch without offsets.
+        return (is_archived(self.media()) and
+                self.home_broadcast_start is not None and self.away_broadcast_start is not None)
+
+    def media(self):
+        return {
+            'home_media_id': self.home_media_id,
+            'away_media_id': self.away_media_id,
+            'home_media_call_letters': self.home_media_call_letters,
+            'away_media_call_letters': self.away_media_call_letters,
+            'home_media_state': self.home_media_state,
+            'away_media_state': self.away_media_state
+        }
+
+    def broadcast_starts(self):
+        return {self.home_media_id: self.home_broadcast_start, self.away_media_id: self.away_broadcast_start}
+
+BROADCAST_COLUMNS = [
+    'id',
+    'home_media_id', 'away_media_id',
+    'home_media_call_letters', 'away_media_call_letters',
+    'home_media_state', 'away_media_state',
+    'home_broadcast_start', 'away_broadcast_start',
+]
+
+#%% Milestones
+
+def broadcast_start(media_info):
+    """BROADCAST_START milestone of one mediaInfo entry as a naive UTC
+    datetime, or None if the feed has no usable milestone."""
+    try:
+        milestones = media_info["milestones"]
+        start_times = [milestone["absoluteTime"] for milestone in milestones if milestone["milestoneType"] == "BROADCAST_START"]
+        return datetime.strptime(start_times[0], MILESTONE_TIME_FORMAT)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+def _lookup_one(media_id):
+    media_info = mlb_api.get_media_info([media_id])
+    return broadcast_start(media_info[0]) if media_info else None
+
+#%% Batched resolver
+
+def resolve_broadcast_starts(media_ids, chunk_size=MEDIA_INFO_CHUNK):
+    """Map each distinct media id to its broadcast start (or None).
+
+    Entries are lined up with the requested ids by position, so a chunk whose
+    response length does not match is re-resolved one id at a time. Ids whose
+    lookup fails outright are left out of the result so the games that need
+    them fail loudly instead of being stored without offsets."""
+    starts = {None: None}
+    unique_ids = list(dict.fromkeys(media_id for media_id in media_ids if media_id))
+
+    for i in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[i:i + chunk_size]
+
+        try:
+            media_info = mlb_api.get_media_info(chunk)
+        except Exception as e:
+            logger.error('Error resolving media chunk %s: %s', chunk, e)
+            media_info = None
+
+        if media_info is not None and len(media_info) == len(chunk):
+            for media_id, info in zip(chunk, media_info):
+                starts[media_id] = broadcast_start(info)
+            continue
+
+        for media_id in chunk:
+            try:
+                starts[media_id] = _lookup_one(media_id)
+            except Exception as e:
+                logger.error('Error resolving media id %s: %s', media_id, e)
+
+    logger.debug('Resolved %s media ids in %s chunk(s)', len(unique_ids), -(-len(unique_ids) // chunk_size))
+    return starts
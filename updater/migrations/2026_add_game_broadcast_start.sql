@@ -0,0 +1,10 @@
+-- Resolved BROADCAST_START milestones for each game's home and away feeds,
+-- stored next to the existing media columns so archived games can be
+-- reprocessed without re-querying the media APIs. Naive UTC, matching the
+-- milestone times the updater computes offsets from.
+--
+-- Safe to re-run: every ADD COLUMN uses IF NOT EXISTS.
+
+ALTER TABLE game
+    ADD COLUMN IF NOT EXISTS home_broadcast_start timestamp,
+    ADD COLUMN IF NOT EXISTS away_broadcast_start timestamp;
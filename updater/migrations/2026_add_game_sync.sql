@@ -0,0 +1,13 @@
+-- Per-game sync record used by the cron to skip unchanged Final games.
+-- status / feed_timestamp come from the live feed (abstractGameState and
+-- metaData.timeStamp); fingerprint is a hash of every row derived from it.
+--
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS game_sync (
+    id             int UNIQUE NOT NULL,
+    status         varchar,
+    feed_timestamp varchar,
+    fingerprint    varchar,
+    synced_at      timestamptz
+);
@@ -0,0 +1,9 @@
+-- Last processed play position for incremental live-game ingestion: the
+-- atBatIndex of the newest play and the index of its newest play event at the
+-- time of the last successful sync.
+--
+-- Safe to re-run: every ADD COLUMN uses IF NOT EXISTS.
+
+ALTER TABLE game_sync
+    ADD COLUMN IF NOT EXISTS last_at_bat_index int,
+    ADD COLUMN IF NOT EXISTS last_pitch_index  int;
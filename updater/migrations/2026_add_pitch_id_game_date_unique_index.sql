@@ -0,0 +1,17 @@
+-- Unique index on pitch (id, game_date), the ON CONFLICT target of the
+-- updater's pitch upserts (db.PITCH_CONFLICT). Without it an unpartitioned
+-- pitch, which only has UNIQUE (id), rejects every pitch upsert with "there
+-- is no unique or exclusion constraint matching the ON CONFLICT
+-- specification". Apply it before deploying an updater that upserts on
+-- (id, game_date).
+--
+-- It is the index step 0 of partition_pitch.py builds, under the same name,
+-- so partitioning later reuses it. A pitch that is already partitioned has
+-- UNIQUE (id, game_date) from partition_pitch.py or schema.sql; skip this
+-- file there (indexes cannot be built CONCURRENTLY on a partitioned table).
+--
+-- CONCURRENTLY so the live table is not locked against the updater's writes;
+-- run outside a transaction (plain `psql -f`, not -1). Safe to re-run.
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS pitch_id_game_date_index
+    ON pitch (id, game_date);
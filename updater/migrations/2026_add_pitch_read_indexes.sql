@@ -0,0 +1,33 @@
+-- Read-path indexes for pitch. Without them the ghost-pitch cull (game_id),
+-- validate_midline.py (game_date) and the queries.py reports (date range,
+-- umpire, worst incorrect calls / blown strikeouts) are all sequential scans.
+--
+-- The game_date index carries the columns validate_midline.py aggregates so
+-- its season checks can be answered from the index alone. The partial
+-- indexes only hold the few percent of rows that are incorrect calls, in the
+-- order the reports rank them.
+--
+-- CONCURRENTLY so the live table is not locked against the updater's writes;
+-- run outside a transaction (plain `psql -f`, not -1). Safe to re-run.
+--
+-- Apply it while pitch is still unpartitioned: partition_pitch.py copies
+-- every index of pitch onto the partitioned table it swaps in. On a pitch
+-- that is already partitioned this file fails, since CONCURRENTLY is not
+-- supported there. Build each index with CREATE INDEX ... ON ONLY pitch,
+-- then CONCURRENTLY on every pitch_<season> partition, then ALTER INDEX ...
+-- ATTACH PARTITION each partition's index to the parent.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pitch_game_id_index
+    ON pitch (game_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pitch_game_date_index
+    ON pitch (game_date) INCLUDE (px_mid, correct_call, correct_call_front);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pitch_umpire_id_game_date_index
+    ON pitch (umpire_id, game_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pitch_incorrect_total_miss_index
+    ON pitch (total_miss DESC NULLS LAST) WHERE correct_call = false;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pitch_blown_strikeout_total_miss_index
+    ON pitch (total_miss DESC NULLS LAST) WHERE blown_strikeout = true;
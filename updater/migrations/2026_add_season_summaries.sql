@@ -0,0 +1,38 @@
+-- Season summary tables behind the umpire, team and player reports, kept
+-- current by the updater's per-game transaction (see summaries.py). Populate
+-- them once after applying with `python3 summaries.py --rebuild`.
+--
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS umpire_season_summary (
+    season             int NOT NULL,
+    umpire_id          int NOT NULL,
+    games              int NOT NULL DEFAULT 0,
+    correct_calls      int NOT NULL DEFAULT 0,
+    incorrect_calls    int NOT NULL DEFAULT 0,
+    total_calls        int NOT NULL DEFAULT 0,
+    calls_benefit_home int NOT NULL DEFAULT 0,
+    calls_benefit_away int NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, umpire_id)
+);
+
+CREATE TABLE IF NOT EXISTS team_season_summary (
+    season                  int NOT NULL,
+    team_id                 int NOT NULL,
+    incorrect_calls_benefit int NOT NULL DEFAULT 0,
+    incorrect_calls_hurt    int NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, team_id)
+);
+
+CREATE TABLE IF NOT EXISTS player_season_summary (
+    season           int NOT NULL,
+    player_id        int NOT NULL,
+    role             varchar NOT NULL,
+    blown_strikes    int NOT NULL DEFAULT 0,
+    blown_balls      int NOT NULL DEFAULT 0,
+    x_misses         int NOT NULL DEFAULT 0,
+    y_misses         int NOT NULL DEFAULT 0,
+    blown_strikeouts int NOT NULL DEFAULT 0,
+    blown_walks      int NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, player_id, role)
+);
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Thin wrappers around the MLB endpoints the updater reads. Every call goes
+through the shared HttpClient in `client`; replace it (e.g. with one built on
+a fake transport) to redirect all traffic.
+"""
+
+#%%
+from http_client import HttpClient
+
+#%% Endpoints
+
+STATSAPI_URL = 'https://statsapi.mlb.com/api'
+EPG_URL = 'https://mastapi.mobile.mlbinfra.com/api/epg/v3/search'
+MEDIA_GATEWAY_URL = 'https://media-gateway.mlb.com/graphql'
+
+MEDIA_INFO_QUERY = """query mediaInfo($ids: [String]) {
+    mediaInfo(ids: $ids) {
+        milestones {
+          milestoneType
+          relativeTime
+          absoluteTime
+        }
+    }
+}"""
+
+client = HttpClient()
+
+#%% Stats API
+
+def get_game(game_id):
+    return client.get_json(f'{STATSAPI_URL}/v1.1/game/{game_id}/feed/live')
+
+def get_game_body(game_id):
+    """The live feed's JSON, undecoded."""
+    return client.get_bytes(f'{STATSAPI_URL}/v1.1/game/{game_id}/feed/live')
+
+def download_game(game_id):
+    """The live feed as an unparsed body in a temporary file, for
+    feed_stream."""
+    return client.download(f'{STATSAPI_URL}/v1.1/game/{game_id}/feed/live')
+
+def get_game_diff(game_id, start_timecode):
+    # Either a list of JSON-patch sets or, when the diff would be too large,
+    # the full feed.
+    return client.get_json(f'{STATSAPI_URL}/v1.1/game/{game_id}/feed/live/diffPatch', params={'startTimecode': start_timecode})
+
+def get_game_timestamps(game_id):
+    return client.get_json(f'{STATSAPI_URL}/v1.1/game/{game_id}/feed/live/timestamps')
+
+def get_schedule(start_date, end_date):
+    params = {'sportId': 1, 'startDate': start_date.strftime('%m/%d/%Y'), 'endDate': end_date.strftime('%m/%d/%Y')}
+    return client.get_json(f'{STATSAPI_URL}/v1/schedule', params=params)
+
+#%% Media
+
+def search_epg(game_id):
+    return client.get_json(EPG_URL, params={'exp': 'MLB', 'gamePk': game_id})
+
+def get_media_info(media_ids):
+    res = client.post_json(MEDIA_GATEWAY_URL, json={'query': MEDIA_INFO_QUERY, 'variables': {'ids': media_ids}})
+    return res['data']['mediaInfo']
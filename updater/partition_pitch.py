@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Online conversion of `pitch` to one range partition per season.
+
+Steps, each committed on its own so the updater can keep writing throughout:
+  0. Build a unique index on `pitch` (id, game_date) CONCURRENTLY, so the
+     updater's ON CONFLICT (id, game_date) upserts work before the swap too.
+  1. Create `pitch_partitioned`, shaped like `pitch` and range-partitioned on
+     game_date, with a partition for every stored season plus the next one,
+     the same indexes and foreign keys, and UNIQUE (id, game_date) as the
+     upsert target (a unique constraint on a partitioned table has to include
+     the partition key).
+  2. Install a trigger on `pitch` that mirrors every insert, update and
+     delete into the new table while the copy runs.
+  3. Copy the existing rows --chunk-days of game_date at a time.
+  4. Swap under a brief exclusive lock: drop any copied row whose original
+     was deleted mid-copy, check the row counts match, rename `pitch` to
+     `pitch_unpartitioned` and the new table to `pitch`.
+
+The old table is kept for rollback; drop it once validate_midline.py and a
+normal updater run pass. Re-running resumes an interrupted migration: the new
+table and its partitions are created IF NOT EXISTS and rows already copied
+are skipped.
+
+Run it after the earlier pitch migrations. Indexes cannot be built
+CONCURRENTLY on a partitioned table, so later pitch index migrations must
+create them per partition.
+
+Usage:  python3 partition_pitch.py [--chunk-days 7] [--no-swap]
+Reads DB_URL from the environment.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg
+from psycopg import sql
+
+import db
+
+TABLE = 'pitch'
+NEW_TABLE = 'pitch_partitioned'
+OLD_TABLE = 'pitch_unpartitioned'
+MIRROR = 'pitch_mirror_to_partitioned'
+
+INDEX_DEF = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (ONLY )?(\S+) (USING .*)$')
+
+#%% Steps
+
+def table_columns(cur, table_name):
+    cur.execute(
+        'SELECT attname FROM pg_attribute '
+        'WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum',
+        [table_name])
+    return [r[0] for r in cur.fetchall()]
+
+def table_indexes(cur, table_name):
+    """(name, definition) of the indexes to carry over: everything but the
+    unique index on id, which UNIQUE (id, game_date) replaces."""
+    cur.execute(
+        'SELECT i.relname, pg_get_indexdef(x.indexrelid) FROM pg_index x '
+        'JOIN pg_class i ON i.oid = x.indexrelid '
+        'WHERE x.indrelid = %s::regclass AND NOT x.indisunique ORDER BY i.relname',
+        [table_name])
+    return cur.fetchall()
+
+def stored_seasons(cur):
+    cur.execute(sql.SQL('SELECT min(game_date), max(game_date) FROM {}').format(sql.Identifier(TABLE)))
+    first, last = cur.fetchone()
+    this_year = date.today().year
+    first = first.year if first else this_year
+    last = max(last.year if last else this_year, this_year)
+    return range(first, last + 2)
+
+def create_partitioned_table(cur):
+    cur.execute(sql.SQL(
+        'CREATE TABLE IF NOT EXISTS {new} (LIKE {old} INCLUDING DEFAULTS, '
+        'CONSTRAINT {key} UNIQUE (id, game_date)) PARTITION BY RANGE (game_date)'
+    ).format(new=sql.Identifier(NEW_TABLE), old=sql.Identifier(TABLE),
+             key=sql.Identifier(f'{NEW_TABLE}_id_game_date_key')))
+
+    for season in stored_seasons(cur):
+        cur.execute(db.season_partition_query(season, NEW_TABLE, TABLE))
+
+    for name, definition in table_indexes(cur, TABLE):
+        unique, _, _, _, rest = INDEX_DEF.match(definition).groups()
+        cur.execute(sql.SQL('CREATE {}INDEX IF NOT EXISTS {} ON {} {}').format(
+            sql.SQL(unique or ''), sql.Identifier(f'{name}_partitioned'),
+            sql.Identifier(NEW_TABLE), sql.SQL(rest)))
+
+    cur.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'", [TABLE])
+    for name, definition in cur.fetchall():
+        cur.execute(sql.SQL(
+            'DO $$ BEGIN ALTER TABLE {} ADD CONSTRAINT {} {}; '
+            'EXCEPTION WHEN duplicate_object THEN NULL; END $$'
+        ).format(sql.Identifier(NEW_TABLE), sql.Identifier(name), sql.SQL(definition)))
+
+def install_mirror(cur):
+    columns = table_columns(cur, TABLE)
+    updates = sql.SQL(', ').join(
+        sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(c)) for c in columns if c not in db.PITCH_CONFLICT)
+
+    # Delete-then-insert so an update that changes game_date moves the row;
+    # ON CONFLICT covers a copy chunk that inserted the row concurrently.
+    cur.execute(sql.SQL('''
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {new} WHERE id = OLD.id AND game_date = OLD.game_date;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {new} SELECT NEW.* ON CONFLICT (id, game_date) DO UPDATE SET {updates};
+            END IF;
+            RETURN NULL;
+        END $$
+    ''').format(function=sql.Identifier(MIRROR), new=sql.Identifier(NEW_TABLE), updates=updates))
+
+    cur.execute(sql.SQL(
+        'CREATE OR REPLACE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON {old} '
+        'FOR EACH ROW EXECUTE FUNCTION {function}()'
+    ).format(trigger=sql.Identifier(MIRROR), old=sql.Identifier(TABLE), function=sql.Identifier(MIRROR)))
+
+def copy_rows(conn, chunk_days):
+    cur = conn.cursor()
+    cur.execute(sql.SQL('SELECT min(game_date), max(game_date) FROM {}').format(sql.Identifier(TABLE)))
+    first, last = cur.fetchone()
+    if first is None:
+        return 0
+
+    copied = 0
+    start = first
+    while start <= last:
+        end = start + timedelta(days=chunk_days)
+        # Rows the mirror already wrote are newer than this snapshot.
+        with conn.transaction():
+            cur.execute(sql.SQL(
+                'INSERT INTO {new} SELECT * FROM {old} WHERE game_date >= %s AND game_date < %s '
+                'ON CONFLICT (id, game_date) DO NOTHING'
+            ).format(new=sql.Identifier(NEW_TABLE), old=sql.Identifier(TABLE)), [start, end])
+            copied += cur.rowcount
+        print(f'copied {start}..{end - timedelta(days=1)}: {cur.rowcount} rows')
+        start = end
+
+    return copied
+
+def swap(conn):
+    cur = conn.cursor()
+    with conn.transaction():
+        cur.execute(sql.SQL('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE').format(sql.Identifier(TABLE)))
+
+        # A row deleted between a chunk's snapshot and its insert was copied
+        # after the mirror removed it.
+        cur.execute(sql.SQL(
+            'DELETE FROM {new} n WHERE NOT EXISTS '
+            '(SELECT 1 FROM {old} o WHERE o.id = n.id AND o.game_date = n.game_date)'
+        ).format(new=sql.Identifier(NEW_TABLE), old=sql.Identifier(TABLE)))
+        resurrected = cur.rowcount
+
+        cur.execute(sql.SQL('SELECT (SELECT count(*) FROM {old}), (SELECT count(*) FROM {new})').format(
+            new=sql.Identifier(NEW_TABLE), old=sql.Identifier(TABLE)))
+        old_count, new_count = cur.fetchone()
+        if old_count != new_count:
+            raise RuntimeError(f'{TABLE} has {old_count} rows but {NEW_TABLE} has {new_count}; not swapping')
+
+        indexes = table_indexes(cur, TABLE)
+
+        cur.execute(sql.SQL('DROP TRIGGER {} ON {}').format(sql.Identifier(MIRROR), sql.Identifier(TABLE)))
+        cur.execute(sql.SQL('DROP FUNCTION {}()').format(sql.Identifier(MIRROR)))
+        cur.execute(sql.SQL('ALTER TABLE {} RENAME TO {}').format(sql.Identifier(TABLE), sql.Identifier(OLD_TABLE)))
+
+        for name, _ in indexes:
+            cur.execute(sql.SQL('ALTER INDEX {} RENAME TO {}').format(
+                sql.Identifier(name), sql.Identifier(f'{name}_unpartitioned')))
+            cur.execute(sql.SQL('ALTER INDEX {} RENAME TO {}').format(
+                sql.Identifier(f'{name}_partitioned'), sql.Identifier(name)))
+
+        cur.execute(sql.SQL('ALTER TABLE {} RENAME TO {}').format(sql.Identifier(NEW_TABLE), sql.Identifier(TABLE)))
+        cur.execute(sql.SQL('ALTER TABLE {} RENAME CONSTRAINT {} TO {}').format(
+            sql.Identifier(TABLE), sql.Identifier(f'{NEW_TABLE}_id_game_date_key'),
+            sql.Identifier(f'{TABLE}_id_game_date_key')))
+
+    return resurrected, new_count
+
+#%% Main
+
+def migrate(conn, chunk_days=7, do_swap=True):
+    """Run every step on an autocommit connection. Returns False if `pitch`
+    is already partitioned."""
+    cur = conn.cursor()
+    if db.is_partitioned(cur, TABLE):
+        return False
+
+    cur.execute(sql.SQL('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} (id, game_date)').format(
+        sql.Identifier(f'{TABLE}_id_game_date_index'), sql.Identifier(TABLE)))
+
+    with conn.transaction():
+        create_partitioned_table(cur)
+        install_mirror(cur)
+
+    start = time.perf_counter()
+    copied = copy_rows(conn, chunk_days)
+    print(f'copied {copied} rows in {time.perf_counter() - start:.1f}s')
+
+    if do_swap:
+        resurrected, count = swap(conn)
+        print(f'swapped in partitioned {TABLE} ({count} rows, {resurrected} deleted mid-copy); '
+              f'the old table is kept as {OLD_TABLE}')
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--chunk-days', type=int, default=7, help='Days of game_date copied per transaction')
+    parser.add_argument('--no-swap', action='store_true', help='Copy and keep mirroring, but do not swap the tables yet')
+    args = parser.parse_args()
+
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        if not migrate(conn, args.chunk_days, not args.no_swap):
+            print(f'{TABLE} is already partitioned')
+            sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+In-process cache of the reference rows (players, teams, umpires).
+
+These almost never change across a season, yet every game carries its umpire,
+both teams and 60+ players. The cache is loaded from the DB once at startup;
+each batch of games then writes only the entities that are new or whose
+values changed, in one go, instead of re-upserting them for every game.
+"""
+
+#%%
+import threading
+
+from player import Player
+from team import Team
+from umpire import Umpire
+
+#%% Tables
+
+REFERENCE_TABLES = {
+    'umpire': Umpire,
+    'team': Team,
+    'player': Player,
+}
+
+#%% Cache
+
+class RefCache:
+
+    def __init__(self):
+        self._known = {table: {} for table in REFERENCE_TABLES}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, cur):
+        for table, dc in REFERENCE_TABLES.items():
+            columns = ', '.join(field for field in dc.__dataclass_fields__)
+            cur.execute(f'SELECT {columns} FROM {table}')
+            self._known[table] = {row[0]: tuple(row) for row in cur.fetchall()}
+
+    def pending(self, table, rows):
+        """The rows of `table` that are new or differ from what is stored,
+        de-duplicated by id (last one wins)."""
+        changed = {}
+
+        with self._lock:
+            known = self._known[table]
+            for row in rows:
+                if row is None:
+                    continue
+                if known.get(row.id) == row.get_values():
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    changed[row.id] = row
+
+        return list(changed.values())
+
+    def add(self, table, rows):
+        with self._lock:
+            for row in rows:
+                self._known[table][row.id] = row.get_values()
+
+    def log_stats(self, logger):
+        logger.info('Reference cache: %s hits, %s misses', self.hits, self.misses)
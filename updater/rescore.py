@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Re-score stored pitches from their saved trajectories, with no network.
+
+pitch keeps everything set_trajectory() and assign_call_metrics() read: the
+traj_* params, px/pz, sz_top/sz_bottom, the umpire's code and the ABS
+overturn flag. This streams the pitches of a date range out of Postgres
+through a server-side cursor, whole games at a time, scores each chunk with
+scoring.score_columns(), and writes back only the rows whose metrics or
+benefit flags changed. The call counts and season summaries of the games
+touched are updated in the same transaction as their pitches.
+
+Usage:  python3 rescore.py --start-date 2026-03-01 --end-date 2026-11-30
+                           [--plane auto|midline|front] [--chunk-size 50000]
+                           [--dry-run]
+  --plane    which plane the primary metrics use: 'auto' is the updater's
+             rule (midline from 2026 on), the others force one plane
+  --dry-run  score and report what would change without writing
+Reads DB_URL from the environment.
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from datetime import date
+
+import numpy as np
+import psycopg
+from psycopg import sql
+
+import db
+import scoring
+import summaries
+
+#%% Columns
+
+FLOAT_INPUTS = ['px', 'pz', 'sz_top', 'sz_bottom', *scoring.TRAJ_COLUMNS, 'balls', 'strikes']
+OBJECT_INPUTS = ['code', 'inning_half', 'home_team', 'away_team', 'home_team_id', 'away_team_id']
+
+FLOAT_OUTPUTS = ['px_mid', 'pz_mid'] + [
+    f'{name}{suffix}' for name in ['x_miss', 'y_miss', 'total_miss', 'total_miss_in'] for suffix in ('', '_front')]
+OBJECT_OUTPUTS = ['correct_call', 'correct_call_front', *scoring.BENEFIT_COLUMNS]
+OUTPUTS = FLOAT_OUTPUTS + OBJECT_OUTPUTS
+
+KEY = ['id', 'game_id', 'game_date', 'year', 'abs_challenge_overturned']
+
+def select_query():
+    # MLB games never span New Year, so the game_date year is the year of
+    # the pitch start time assign_call_metrics() goes by.
+    columns = [
+        sql.SQL('id, game_id, game_date, extract(year FROM game_date)::int, '
+                'coalesce(abs_challenge_overturned, false)'),
+        *(sql.Identifier(c) for c in FLOAT_INPUTS + OBJECT_INPUTS + OUTPUTS),
+    ]
+    return sql.SQL(
+        'SELECT {} FROM pitch WHERE game_date >= %(start)s AND game_date <= %(end)s ORDER BY game_id, id'
+    ).format(sql.SQL(', ').join(columns))
+
+#%% Scoring
+
+def python_value(value):
+    if value is None or isinstance(value, (str, int)):
+        return value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    return None if np.isnan(value) else float(value)
+
+def score_chunk(rows, plane):
+    """Score a chunk of selected rows. Returns (updates, changed game ids,
+    Counter of changed columns), updates as tuples of id, game_date and
+    OUTPUTS."""
+    values = dict(zip(KEY + FLOAT_INPUTS + OBJECT_INPUTS + OUTPUTS, zip(*rows)))
+
+    columns = {name: scoring.float_column(values[name]) for name in FLOAT_INPUTS}
+    columns.update({name: np.array(values[name], dtype=object) for name in OBJECT_INPUTS})
+    columns['abs_challenge_overturned'] = np.array(values['abs_challenge_overturned'], dtype=bool)
+    columns['year'] = np.array(values['year'], dtype=np.int64)
+
+    scored = scoring.score_columns(columns, plane)
+    scored.update(scoring.benefit_columns(columns, scored['correct_call'], scored['total_miss_in']))
+
+    changed = np.zeros(len(rows), dtype=bool)
+    per_column = Counter()
+    for name in FLOAT_OUTPUTS:
+        old = scoring.float_column(values[name])
+        differs = ~((old == scored[name]) | (np.isnan(old) & np.isnan(scored[name])))
+        per_column[name] = int(differs.sum())
+        changed |= differs
+    for name in OBJECT_OUTPUTS:
+        differs = ~(np.array(values[name], dtype=object) == scored[name].astype(object)).astype(bool)
+        per_column[name] = int(differs.sum())
+        changed |= differs
+
+    indices = np.flatnonzero(changed)
+    updates = [
+        (values['id'][i], values['game_date'][i], *(python_value(scored[name][i]) for name in OUTPUTS))
+        for i in indices.tolist()
+    ]
+    games = sorted({values['game_id'][i] for i in indices.tolist()})
+    return updates, games, per_column
+
+def write_chunk(conn, updates, games):
+    """Write a chunk's changed rows and refresh its games' aggregates in one
+    transaction."""
+    cur = conn.cursor()
+    with conn.transaction():
+        before = {game_id: summaries.game_contribution(conn, game_id) for game_id in games}
+        db.bulk_update(cur, 'pitch', updates, OUTPUTS, key=db.PITCH_CONFLICT)
+
+        with conn.pipeline():
+            for game_id in games:
+                summaries.refresh_game_counts(cur, game_id)
+
+        for game_id in games:
+            summaries.apply_game_delta(conn, before[game_id], summaries.game_contribution(conn, game_id))
+
+#%% Streaming
+
+def game_chunks(cur, chunk_size):
+    """Yield lists of rows of at least chunk_size rows (bar the last), cut at
+    game boundaries so a game is never split across chunks."""
+    pending = []
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        pending.extend(rows)
+        if len(pending) < chunk_size:
+            continue
+
+        # Hold back the last game, whose rows may continue in the next fetch.
+        last_game = pending[-1][1]
+        cut = len(pending)
+        while cut > 0 and pending[cut - 1][1] == last_game:
+            cut -= 1
+        if cut > 0:
+            yield pending[:cut]
+            pending = pending[cut:]
+
+    if pending:
+        yield pending
+
+def rescore(conninfo, start, end, plane='auto', chunk_size=50_000, dry_run=False, log=print):
+    """Re-score the pitches from start to end (inclusive). Returns
+    (rows scanned, rows changed, games changed, Counter of changed columns)."""
+    scanned = changed = 0
+    changed_games = set()
+    per_column = Counter()
+    began = time.perf_counter()
+
+    with psycopg.connect(conninfo) as read_conn, psycopg.connect(conninfo, autocommit=True) as write_conn:
+        with read_conn.cursor(name='rescore') as cur:
+            cur.itersize = chunk_size
+            cur.execute(select_query(), {'start': start, 'end': end})
+
+            for rows in game_chunks(cur, chunk_size):
+                updates, games, chunk_columns = score_chunk(rows, plane)
+                if updates and not dry_run:
+                    write_chunk(write_conn, updates, games)
+
+                scanned += len(rows)
+                changed += len(updates)
+                changed_games.update(games)
+                per_column.update(chunk_columns)
+                log(f'{scanned:,} pitches scanned, {changed:,} changed '
+                    f'({scanned / (time.perf_counter() - began):,.0f} pitches/s)')
+
+    return scanned, changed, len(changed_games), per_column
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-sdate', '--start-date', type=date.fromisoformat, required=True)
+    parser.add_argument('-edate', '--end-date', type=date.fromisoformat, required=True)
+    parser.add_argument('--plane', choices=['auto', 'midline', 'front'], default='auto')
+    parser.add_argument('--chunk-size', type=int, default=50_000, help='Pitches scored per batch')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+
+    scanned, changed, games, per_column = rescore(
+        os.environ['DB_URL'], args.start_date, args.end_date, args.plane, args.chunk_size, args.dry_run)
+
+    print()
+    print(f'{"Would change" if args.dry_run else "Changed"} {changed:,} of {scanned:,} pitches in {games:,} games')
+    for name, count in per_column.most_common():
+        if count:
+            print(f'  {name}: {count:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Ranged schedule resolution.
+
+The schedule is requested one calendar month at a time with
+startDate/endDate instead of one request per day, and each month's response
+goes through the feed cache. Months that ended before yesterday are treated
+as immutable; anything more recent is only reused while fresh. Chunks are
+yielded as they resolve so game processing can start after the first one.
+"""
+
+#%%
+from datetime import timedelta
+
+import mlb_api
+
+# detailedState of games that were never played on the listed date (a
+# rainout is Postponed); their feeds have no officials or pitches.
+CALLED_OFF_STATES = ('Postponed', 'Cancelled')
+
+#%% Chunks
+
+def month_chunks(sdate, edate):
+    """Yield (start, end) date pairs covering sdate..edate, split at month
+    boundaries."""
+    start = sdate
+    while start <= edate:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        end = min(next_month - timedelta(days=1), edate)
+        yield (start, end)
+        start = end + timedelta(days=1)
+
+#%% Resolver
+
+def scheduled_games(schedule, seen=None):
+    """One entry per game of a schedule response. A suspended game is listed
+    on both the day it started and the day it resumed; the later listing
+    wins. Games already in `seen` (from earlier chunks) are left out, and
+    the rest added to it."""
+    games = {}
+    for day in schedule.get('dates', []):
+        for game in day['games']:
+            games[game['gamePk']] = {'game_id': game['gamePk'], 'status': game['status']['abstractGameState'],
+                                     'detailed_state': game['status'].get('detailedState'),
+                                     'game_type': game['gameType']}
+
+    if seen is not None:
+        games = {game_id: game for game_id, game in games.items() if game_id not in seen}
+        seen.update(games)
+
+    return list(games.values())
+
+def resolve_schedule(sdate, edate, today, feed_cache):
+    """Yield (start, end, games) for each month chunk of the range, each game
+    in only one chunk."""
+    seen = set()
+    for start, end in month_chunks(sdate, edate):
+        # Yesterday's late games can still be live when the cron runs after
+        # midnight, so only chunks ending before then are immutable.
+        immutable = end < today - timedelta(days=1)
+        key = f'{start:%Y%m%d}-{end:%Y%m%d}'
+        schedule = feed_cache.fetch('schedule', key, lambda: mlb_api.get_schedule(start, end), final=immutable)
+        yield (start, end, scheduled_games(schedule, seen))
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Call scoring: whether a called pitch was correct and by how much it missed.
+
+The scalar functions score one pitch dict at a time for the updater. The
+batch engine, score_columns(), does the same for whole columns of pitches
+(a game, a season) in one NumPy pass with identical results, for re-scoring
+and benchmarks.
+"""
+
+#%%
+import math
+
+import numpy as np
+
+#%% Constants
+
+PLATE_WIDTH = 17.0 / 12 / 2
+BALL_RADIUS = 2.94 / 12 /2
+HALF_STRIKE_ZONE = PLATE_WIDTH + BALL_RADIUS
+
+#%% Pitch location helpers
+
+def width_strike(pitch):
+    return abs(pitch['px']) < HALF_STRIKE_ZONE
+
+def height_strike(pitch):
+    return (pitch['pz'] < (pitch['sz_top'] + BALL_RADIUS) and pitch['pz'] > pitch['sz_bottom'] - BALL_RADIUS)
+
+def strike(pitch):
+    return width_strike(pitch) and height_strike(pitch)
+
+
+#%% Trajectory / plate-plane helpers
+
+# Home plate is 17" deep (front edge -> back tip) in the feed's convention:
+# pX/pZ are reported at the front edge (y = 17/12 ft). The "midline" is the
+# depth midpoint, halfway between the front edge and the back tip.
+PLATE_DEPTH_FT = 17.0 / 12
+FRONT_PLANE_Y = PLATE_DEPTH_FT
+MID_PLANE_Y = PLATE_DEPTH_FT / 2
+
+# Keys of the 9-param constant-accel model in pitchData.coordinates.
+TRAJ_KEYS = ['x0', 'y0', 'z0', 'vX0', 'vY0', 'vZ0', 'aX', 'aY', 'aZ']
+
+
+def extract_trajectory(coordinates):
+    """Return the 9 trajectory params from a pitchData.coordinates dict, or
+    None if any are missing OR null (older feeds / bad data). A null value
+    would otherwise blow up the arithmetic in location_at_plane()."""
+    if any(coordinates.get(k) is None for k in TRAJ_KEYS):
+        return None
+    return {k: coordinates[k] for k in TRAJ_KEYS}
+
+
+def location_at_plane(params, y_plane):
+    """Solve the constant-accel trajectory for the (px, pz) where the ball
+    crosses y = y_plane (ft). Returns (None, None) if it never reaches the
+    plane (non-positive discriminant / no positive root)."""
+    aY, vY0, y0 = params['aY'], params['vY0'], params['y0']
+    a = 0.5 * aY
+    if a == 0:
+        return (None, None)
+    disc = vY0 ** 2 - 4 * a * (y0 - y_plane)
+    if disc < 0:
+        return (None, None)
+    root = math.sqrt(disc)
+    candidates = [t for t in ((-vY0 - root) / (2 * a), (-vY0 + root) / (2 * a)) if t > 0]
+    if not candidates:
+        return (None, None)
+    t = min(candidates)
+    px = params['x0'] + params['vX0'] * t + 0.5 * params['aX'] * t ** 2
+    pz = params['z0'] + params['vZ0'] * t + 0.5 * params['aZ'] * t ** 2
+    return (px, pz)
+
+
+def location_metrics(px, pz, sz_top, sz_bottom, code, overturned=False):
+    """Correctness + miss distances for a called pitch at an arbitrary (px, pz),
+    replicating the original updater rules so it is plane-agnostic:
+      - called strikes ('C'): x_miss/y_miss always computed; total_miss only on
+        an incorrect call.
+      - called balls ('B'): only correct_call is meaningful (misses left None).
+    ABS overturns force the call incorrect regardless of geometry.
+    Returns (correct_call, x_miss, y_miss, total_miss, total_miss_in)."""
+    abs_px = abs(px)
+    is_width = abs_px < HALF_STRIKE_ZONE
+    is_height = (pz < sz_top + BALL_RADIUS) and (pz > sz_bottom - BALL_RADIUS)
+    is_strike = is_width and is_height
+
+    if code != 'C':  # 'B'
+        correct = not is_strike
+        if overturned and correct:
+            correct = False
+        return (correct, None, None, None, None)
+
+    correct = is_strike
+    x_miss = 0 if is_width else abs_px - HALF_STRIKE_ZONE
+    if is_height:
+        y_miss = 0
+    elif pz > (sz_top + BALL_RADIUS):
+        y_miss = pz - sz_top - BALL_RADIUS
+    else:
+        y_miss = sz_bottom - BALL_RADIUS - pz
+
+    if overturned and correct:
+        correct = False
+        x_miss = max(abs_px - HALF_STRIKE_ZONE, 0)
+
+    if not correct:
+        total_miss = math.sqrt(x_miss ** 2 + y_miss ** 2)
+        total_miss_in = round(total_miss * 12, 2)
+    else:
+        total_miss = None
+        total_miss_in = None
+    return (correct, x_miss, y_miss, total_miss, total_miss_in)
+
+
+def set_trajectory(pitch, coordinates):
+    """Store the raw trajectory params and the derived midline (px_mid/pz_mid)
+    on the pitch dict. Falls back to the front-of-plate coords when the feed
+    has no trajectory or the plane solve fails."""
+    params = extract_trajectory(coordinates)
+    if params:
+        pitch['traj_x0'] = params['x0']
+        pitch['traj_y0'] = params['y0']
+        pitch['traj_z0'] = params['z0']
+        pitch['traj_vx0'] = params['vX0']
+        pitch['traj_vy0'] = params['vY0']
+        pitch['traj_vz0'] = params['vZ0']
+        pitch['traj_ax'] = params['aX']
+        pitch['traj_ay'] = params['aY']
+        pitch['traj_az'] = params['aZ']
+        px_mid, pz_mid = location_at_plane(params, MID_PLANE_Y)
+    else:
+        px_mid, pz_mid = (None, None)
+    if px_mid is None:
+        px_mid, pz_mid = pitch['px'], pitch['pz']
+    pitch['px_mid'] = px_mid
+    pitch['pz_mid'] = pz_mid
+
+
+def _apply_benefit_flags(pitch, inning_half):
+    """Set benefit / blown-call / possible_bad_data flags from the PRIMARY
+    correct_call (possible_bad_data only on 'C'). Reset to dataclass defaults
+    first so a re-score (e.g. after a play-level ABS code flip) cannot leave
+    stale flags from the first scoring pass."""
+    pitch['home_away_benefit'] = None
+    pitch['player_type_benefit'] = None
+    pitch['team_benefit'] = None
+    pitch['team_benefit_id'] = None
+    pitch['team_hurt'] = None
+    pitch['team_hurt_id'] = None
+    pitch['blown_walk'] = False
+    pitch['blown_strikeout'] = False
+    pitch['possible_bad_data'] = False
+    if pitch['correct_call'] == False:
+        if pitch['code'] == 'B':
+            pitch['home_away_benefit'] = "away" if inning_half == "top" else "home"
+            pitch['player_type_benefit'] = 'batter'
+            pitch['blown_walk'] = pitch['balls'] == 3
+        if pitch['code'] == 'C':
+            pitch['home_away_benefit'] = "home" if inning_half == "top" else "away"
+            pitch['player_type_benefit'] = 'pitcher'
+            pitch['blown_strikeout'] = pitch['strikes'] == 2
+            pitch['possible_bad_data'] = (pitch.get('total_miss_in') or 0) > 7
+
+
+def assign_call_metrics(pitch, pitch_start_time, inning_half):
+    """Compute the front-of-plate metrics (*_front) plus the primary metrics.
+    The primary uses the midline location for 2026+ games (when a trajectory
+    was available), and the front-of-plate location otherwise. Requires
+    set_trajectory() to have run first (px_mid/pz_mid + traj_* present)."""
+    overturned = pitch.get('abs_challenge_overturned', False)
+    code = pitch['code']
+    sz_top, sz_bottom = pitch['sz_top'], pitch['sz_bottom']
+
+    fc, fx, fy, ft, fti = location_metrics(
+        pitch['px'], pitch['pz'], sz_top, sz_bottom, code, overturned)
+    pitch['correct_call_front'] = fc
+    pitch['x_miss_front'] = fx
+    pitch['y_miss_front'] = fy
+    pitch['total_miss_front'] = ft
+    pitch['total_miss_in_front'] = fti
+
+    has_traj = pitch.get('traj_x0') is not None
+    if pitch_start_time.year >= 2026 and has_traj:
+        pc, px_, py_, pt, pti = location_metrics(
+            pitch['px_mid'], pitch['pz_mid'], sz_top, sz_bottom, code, overturned)
+    else:
+        pc, px_, py_, pt, pti = fc, fx, fy, ft, fti
+    pitch['correct_call'] = pc
+    pitch['x_miss'] = px_
+    pitch['y_miss'] = py_
+    pitch['total_miss'] = pt
+    pitch['total_miss_in'] = pti
+
+    _apply_benefit_flags(pitch, inning_half)
+
+
+#%% Batch engine
+
+# Trajectory columns, in TRAJ_KEYS order, as stored on the pitch row.
+TRAJ_COLUMNS = ['traj_x0', 'traj_y0', 'traj_z0', 'traj_vx0', 'traj_vy0', 'traj_vz0', 'traj_ax', 'traj_ay', 'traj_az']
+
+METRIC_COLUMNS = ['correct_call', 'x_miss', 'y_miss', 'total_miss', 'total_miss_in']
+
+def float_column(values):
+    """Float64 array with NaN for None."""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+def columns_from_pitches(pitches, years):
+    """Score input columns from pitch dicts (after set_trajectory()) and the
+    year of each pitch's start time."""
+    columns = {name: float_column([p[name] for p in pitches]) for name in ('px', 'pz', 'sz_top', 'sz_bottom')}
+    for name in TRAJ_COLUMNS:
+        columns[name] = float_column([p.get(name) for p in pitches])
+    columns['code'] = np.array([p['code'] for p in pitches], dtype=object)
+    columns['abs_challenge_overturned'] = np.array(
+        [bool(p.get('abs_challenge_overturned', False)) for p in pitches], dtype=bool)
+    columns['year'] = np.asarray(years, dtype=np.int64)
+    return columns
+
+def square(values):
+    """values ** 2 as the scalar path computes it. Python's float ** 2 goes
+    through libm pow(), which can differ from x * x in the last bit; an
+    array ** 2 is x * x, while float_power() calls pow()."""
+    return np.float_power(values, 2.0)
+
+def locations_at_plane(traj, y_plane):
+    """Vectorised location_at_plane(): (px, pz) arrays, NaN where the scalar
+    version returns None (no trajectory, a == 0, negative discriminant or no
+    positive root)."""
+    x0, y0, z0, vX0, vY0, vZ0, aX, aY, aZ = traj
+    with np.errstate(all='ignore'):
+        a = 0.5 * aY
+        disc = square(vY0) - 4 * a * (y0 - y_plane)
+        root = np.sqrt(disc)
+        t1 = (-vY0 - root) / (2 * a)
+        t2 = (-vY0 + root) / (2 * a)
+        t = np.minimum(np.where(t1 > 0, t1, np.inf), np.where(t2 > 0, t2, np.inf))
+        solved = (a != 0) & (disc >= 0) & np.isfinite(t)
+        t = np.where(solved, t, np.nan)
+        px = x0 + vX0 * t + 0.5 * aX * square(t)
+        pz = z0 + vZ0 * t + 0.5 * aZ * square(t)
+    return px, pz
+
+def metrics_at(px, pz, sz_top, sz_bottom, called_strike, overturned):
+    """Vectorised location_metrics(): correct_call as bools, the misses as
+    floats with NaN where the scalar version returns None."""
+    abs_px = np.abs(px)
+    is_width = abs_px < HALF_STRIKE_ZONE
+    above = pz > (sz_top + BALL_RADIUS)
+    is_height = (pz < sz_top + BALL_RADIUS) & (pz > sz_bottom - BALL_RADIUS)
+    is_strike = is_width & is_height
+
+    # An overturned call is incorrect whatever the geometry. For a strike
+    # that was geometrically correct the scalar path re-derives x_miss as
+    # max(abs_px - HALF_STRIKE_ZONE, 0), which is 0 inside the zone.
+    correct = np.where(called_strike, is_strike, ~is_strike) & ~overturned
+
+    x_miss = np.where(is_width, 0.0, abs_px - HALF_STRIKE_ZONE)
+    y_miss = np.where(is_height, 0.0,
+                      np.where(above, pz - sz_top - BALL_RADIUS, sz_bottom - BALL_RADIUS - pz))
+    total_miss = np.sqrt(square(x_miss) + square(y_miss))
+
+    x_miss = np.where(called_strike, x_miss, np.nan)
+    y_miss = np.where(called_strike, y_miss, np.nan)
+    total_miss = np.where(called_strike & ~correct, total_miss, np.nan)
+
+    # np.round() scales by 100 and rounds half to even in binary, which can
+    # differ from round() on values that print as an exact half; the few
+    # incorrect calls per game go through round() itself.
+    total_miss_in = np.full(len(total_miss), np.nan)
+    missed = ~np.isnan(total_miss)
+    total_miss_in[missed] = [round(v * 12, 2) for v in total_miss[missed].tolist()]
+
+    return correct, x_miss, y_miss, total_miss, total_miss_in
+
+def score_columns(columns, plane='auto'):
+    """Score every pitch in `columns` (see columns_from_pitches()) in one
+    pass: the batch form of set_trajectory() + assign_call_metrics().
+
+    plane picks the primary metrics: 'auto' is the updater's rule (midline
+    from 2026 on), 'midline' and 'front' force one plane for every season.
+    Returns a dict of arrays: px_mid, pz_mid, the METRIC_COLUMNS and their
+    _front variants. Misses are NaN where the scalar path stores None."""
+    px, pz = columns['px'], columns['pz']
+    sz_top, sz_bottom = columns['sz_top'], columns['sz_bottom']
+    called_strike = columns['code'] == 'C'
+    overturned = columns['abs_challenge_overturned']
+
+    traj = [columns[name] for name in TRAJ_COLUMNS]
+    has_traj = ~np.isnan(traj).any(axis=0)
+    px_plane, pz_plane = locations_at_plane(traj, MID_PLANE_Y)
+    # As set_trajectory(): fall back to the front-of-plate coords.
+    px_mid = np.where(np.isnan(px_plane), px, px_plane)
+    pz_mid = np.where(np.isnan(px_plane), pz, pz_plane)
+
+    front = metrics_at(px, pz, sz_top, sz_bottom, called_strike, overturned)
+    mid = metrics_at(px_mid, pz_mid, sz_top, sz_bottom, called_strike, overturned)
+
+    # The primary metrics use the midline from 2026 on, when the feed had a
+    # trajectory.
+    if plane == 'auto':
+        use_mid = (columns['year'] >= 2026) & has_traj
+    elif plane == 'midline':
+        use_mid = has_traj
+    elif plane == 'front':
+        use_mid = np.zeros(len(px), dtype=bool)
+    else:
+        raise ValueError(f'Unknown plane: {plane}')
+
+    scored = {'px_mid': px_mid, 'pz_mid': pz_mid}
+    for name, f, m in zip(METRIC_COLUMNS, front, mid):
+        scored[name] = np.where(use_mid, m, f)
+        scored[f'{name}_front'] = f
+    return scored
+
+BENEFIT_COLUMNS = [
+    'home_away_benefit', 'player_type_benefit', 'team_benefit', 'team_benefit_id', 'team_hurt', 'team_hurt_id',
+    'blown_walk', 'blown_strikeout', 'possible_bad_data',
+]
+
+def benefit_columns(columns, correct_call, total_miss_in):
+    """Vectorised _apply_benefit_flags() plus the team benefit/hurt columns
+    add_game_data() fills in. Needs code, inning_half, balls and strikes in
+    `columns` and, for the team columns, home_team/away_team and their ids.
+    Strings and ids come back as object arrays with None."""
+    code, top = columns['code'], columns['inning_half'] == 'top'
+    missed_ball = ~correct_call & (code == 'B')
+    missed_strike = ~correct_call & (code == 'C')
+
+    # A missed ball helps the batting side, a missed strike the fielding side.
+    home = (missed_ball & ~top) | (missed_strike & top)
+    away = (missed_ball & top) | (missed_strike & ~top)
+
+    def pick(when_home, when_away):
+        return np.where(home, when_home, np.where(away, when_away, None))
+
+    flags = {
+        'home_away_benefit': pick('home', 'away'),
+        'player_type_benefit': np.where(missed_ball, 'batter', np.where(missed_strike, 'pitcher', None)),
+        'team_benefit': pick(columns['home_team'], columns['away_team']),
+        'team_benefit_id': pick(columns['home_team_id'], columns['away_team_id']),
+        'team_hurt': pick(columns['away_team'], columns['home_team']),
+        'team_hurt_id': pick(columns['away_team_id'], columns['home_team_id']),
+        'blown_walk': missed_ball & (columns['balls'] == 3),
+        'blown_strikeout': missed_strike & (columns['strikes'] == 2),
+        'possible_bad_data': missed_strike & (np.nan_to_num(total_miss_in) > 7),
+    }
+    return flags
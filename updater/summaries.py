@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Season summary tables behind the umpire, team and player reports.
+
+  umpire_season_summary  (season, umpire_id)       call counts of the games
+                                                   the umpire worked
+  team_season_summary    (season, team_id)         incorrect calls that
+                                                   benefited / hurt the team
+  player_season_summary  (season, player_id, role) incorrect calls by kind,
+                                                   role 'batter' or 'pitcher'
+
+They are kept current inside the updater's per-game transaction: the game's
+contribution is read before its rows are written and again afterwards, and
+only the difference is added, so a re-upserted game is counted once. The
+contributions are the same aggregate queries the rebuild runs over every
+game, so the two agree by construction.
+
+Usage:  python3 summaries.py [--rebuild | --check]
+  --rebuild  recompute the tables from pitch and game from scratch
+  --check    compare the stored tables with a from-scratch recompute and
+             exit non-zero on any difference
+Reads DB_URL from the environment.
+"""
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+
+# psycopg is imported where it is used, so importing the module (as the
+# updater does at startup) does not load the driver.
+
+#%% Summaries
+
+@dataclass
+class Summary:
+    table: str
+    keys: tuple
+    counters: tuple
+    # Aggregate of the counters by key, over the rows matched by {game} /
+    # {pitch}, with ORDER BY the keys so concurrent games lock summary rows
+    # in the same order.
+    query: str
+
+SUMMARIES = [
+    Summary(
+        'umpire_season_summary',
+        ('season', 'umpire_id'),
+        ('games', 'correct_calls', 'incorrect_calls', 'total_calls', 'calls_benefit_home', 'calls_benefit_away'),
+        """
+        SELECT extract(year FROM game_date)::int AS season, umpire_id,
+            count(*) FILTER (WHERE total_calls > 0),
+            coalesce(sum(correct_calls), 0),
+            coalesce(sum(incorrect_calls), 0),
+            coalesce(sum(total_calls), 0),
+            coalesce(sum(calls_benefit_home), 0),
+            coalesce(sum(calls_benefit_away), 0)
+        FROM game
+        WHERE {game} AND umpire_id IS NOT NULL AND game_date IS NOT NULL
+        GROUP BY 1, 2 ORDER BY 1, 2
+        """),
+    Summary(
+        'team_season_summary',
+        ('season', 'team_id'),
+        ('incorrect_calls_benefit', 'incorrect_calls_hurt'),
+        """
+        SELECT season, team_id, sum(benefit), sum(hurt)
+        FROM (
+            SELECT extract(year FROM game_date)::int AS season, team_benefit_id AS team_id, 1 AS benefit, 0 AS hurt
+            FROM pitch WHERE {pitch} AND correct_call = false AND team_benefit_id IS NOT NULL
+            UNION ALL
+            SELECT extract(year FROM game_date)::int, team_hurt_id, 0, 1
+            FROM pitch WHERE {pitch} AND correct_call = false AND team_hurt_id IS NOT NULL
+        ) c
+        GROUP BY 1, 2 ORDER BY 1, 2
+        """),
+    Summary(
+        'player_season_summary',
+        ('season', 'player_id', 'role'),
+        ('blown_strikes', 'blown_balls', 'x_misses', 'y_misses', 'blown_strikeouts', 'blown_walks'),
+        """
+        SELECT season, player_id, role,
+            count(*) FILTER (WHERE code = 'C'),
+            count(*) FILTER (WHERE code = 'B'),
+            count(*) FILTER (WHERE x_miss > 0),
+            count(*) FILTER (WHERE y_miss > 0),
+            count(*) FILTER (WHERE blown_strikeout),
+            count(*) FILTER (WHERE blown_walk)
+        FROM (
+            SELECT extract(year FROM game_date)::int AS season, batter_id AS player_id, 'batter' AS role,
+                code, x_miss, y_miss, blown_strikeout, blown_walk
+            FROM pitch WHERE {pitch} AND correct_call = false AND batter_id IS NOT NULL
+            UNION ALL
+            SELECT extract(year FROM game_date)::int, pitcher_id, 'pitcher',
+                code, x_miss, y_miss, blown_strikeout, blown_walk
+            FROM pitch WHERE {pitch} AND correct_call = false AND pitcher_id IS NOT NULL
+        ) c
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        """),
+]
+
+def contribution_query(summary, one_game=True):
+    """The summary's aggregate for the game %(game_id)s, or over every game."""
+    from psycopg import sql
+
+    if one_game:
+        game, pitch = sql.SQL('id = %(game_id)s'), sql.SQL('game_id = %(game_id)s')
+    else:
+        game, pitch = sql.SQL('true'), sql.SQL('true')
+    return sql.SQL(summary.query).format(game=game, pitch=pitch)
+
+def upsert_delta_query(summary):
+    from psycopg import sql
+
+    columns = summary.keys + summary.counters
+    return sql.SQL(
+        'INSERT INTO {table} ({columns}) VALUES ({values}) '
+        'ON CONFLICT ({keys}) DO UPDATE SET {updates}'
+    ).format(
+        table=sql.Identifier(summary.table),
+        columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+        values=sql.SQL(', ').join(sql.Placeholder() * len(columns)),
+        keys=sql.SQL(', ').join(map(sql.Identifier, summary.keys)),
+        updates=sql.SQL(', ').join(
+            sql.SQL('{0} = {1}.{0} + EXCLUDED.{0}').format(sql.Identifier(c), sql.Identifier(summary.table))
+            for c in summary.counters),
+    )
+
+def delete_empty_query(summary):
+    from psycopg import sql
+
+    return sql.SQL('DELETE FROM {table} WHERE {keys} AND {empty}').format(
+        table=sql.Identifier(summary.table),
+        keys=sql.SQL(' AND ').join(sql.SQL('{} = %s').format(sql.Identifier(k)) for k in summary.keys),
+        empty=sql.SQL(' AND ').join(sql.SQL('{} = 0').format(sql.Identifier(c)) for c in summary.counters),
+    )
+
+#%% Game counts
+
+# The call counts on the game row, recomputed from its stored pitches, for
+# writes that did not tally them from the whole feed (incremental live
+# passes, re-scores).
+REFRESH_GAME_COUNTS_QUERY = """
+UPDATE game SET
+    correct_calls = c.correct_calls,
+    incorrect_calls = c.incorrect_calls,
+    total_calls = c.total_calls,
+    calls_benefit_home = c.calls_benefit_home,
+    calls_benefit_away = c.calls_benefit_away,
+    correct_call_rate = c.correct_calls * 100.0 / c.total_calls
+FROM (
+    SELECT
+        count(*) FILTER (WHERE correct_call) AS correct_calls,
+        count(*) FILTER (WHERE NOT correct_call) AS incorrect_calls,
+        count(correct_call) AS total_calls,
+        count(*) FILTER (WHERE home_away_benefit = 'home') AS calls_benefit_home,
+        count(*) FILTER (WHERE home_away_benefit = 'away') AS calls_benefit_away
+    FROM pitch
+    WHERE game_id = %(game_id)s
+) c
+WHERE game.id = %(game_id)s AND c.total_calls > 0
+"""
+
+def refresh_game_counts(cur, game_id):
+    """Recompute a game's call counts from its stored pitch rows."""
+    cur.execute(REFRESH_GAME_COUNTS_QUERY, {'game_id': game_id})
+
+#%% Incremental maintenance
+
+def game_contribution(conn, game_id):
+    """{table: {key: counters}} of one game, as currently stored.
+
+    Called first in the game's transaction, it also takes a transaction-level
+    advisory lock on the game id, so two overlapping runs cannot both apply
+    a delta against the same before-state."""
+    with conn.pipeline():
+        conn.execute('SELECT pg_advisory_xact_lock(%s)', [game_id])
+        cursors = []
+        for summary in SUMMARIES:
+            cur = conn.cursor()
+            cur.execute(contribution_query(summary), {'game_id': game_id})
+            cursors.append(cur)
+
+    return {
+        summary.table: {row[:len(summary.keys)]: row[len(summary.keys):] for row in cur.fetchall()}
+        for summary, cur in zip(SUMMARIES, cursors)
+    }
+
+def apply_game_delta(conn, before, after):
+    """Add after - before to the summary tables. Returns the number of
+    summary rows changed."""
+    changed = 0
+
+    with conn.pipeline():
+        cur = conn.cursor()
+        for summary in SUMMARIES:
+            old, new = before[summary.table], after[summary.table]
+            zero = (0,) * len(summary.counters)
+
+            deltas = []
+            for key in sorted(old.keys() | new.keys()):
+                delta = tuple(n - o for n, o in zip(new.get(key, zero), old.get(key, zero)))
+                if delta != zero:
+                    deltas.append((key, delta))
+
+            if not deltas:
+                continue
+
+            cur.executemany(upsert_delta_query(summary), [key + delta for key, delta in deltas])
+            # A row whose counters all dropped to zero is the same as no row.
+            cur.executemany(delete_empty_query(summary), [key for key, _ in deltas])
+            changed += len(deltas)
+
+    return changed
+
+#%% Rebuild
+
+def non_empty(summary, rows):
+    return {row[:len(summary.keys)]: row[len(summary.keys):] for row in rows if any(row[len(summary.keys):])}
+
+def stored(cur, summary):
+    from psycopg import sql
+
+    columns = summary.keys + summary.counters
+    cur.execute(sql.SQL('SELECT {} FROM {}').format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)), sql.Identifier(summary.table)))
+    return non_empty(summary, cur.fetchall())
+
+def recomputed(cur, summary):
+    cur.execute(contribution_query(summary, one_game=False))
+    return non_empty(summary, cur.fetchall())
+
+def rebuild(conn):
+    """Replace every summary table with a from-scratch recompute, in one
+    transaction."""
+    from psycopg import sql
+
+    cur = conn.cursor()
+    with conn.transaction():
+        for summary in SUMMARIES:
+            cur.execute(sql.SQL('LOCK TABLE {} IN EXCLUSIVE MODE').format(sql.Identifier(summary.table)))
+            cur.execute(sql.SQL('DELETE FROM {}').format(sql.Identifier(summary.table)))
+            cur.execute(sql.SQL('INSERT INTO {} ({}) {}').format(
+                sql.Identifier(summary.table),
+                sql.SQL(', ').join(map(sql.Identifier, summary.keys + summary.counters)),
+                contribution_query(summary, one_game=False)))
+            cur.execute(sql.SQL('DELETE FROM {} WHERE {}').format(
+                sql.Identifier(summary.table),
+                sql.SQL(' AND ').join(sql.SQL('{} = 0').format(sql.Identifier(c)) for c in summary.counters)))
+            cur.execute(sql.SQL('SELECT count(*) FROM {}').format(sql.Identifier(summary.table)))
+            print(f'rebuilt {summary.table}: {cur.fetchone()[0]} rows')
+
+def check(conn):
+    """Compare the stored tables with a from-scratch recompute. Returns a
+    list of (table, key, stored, expected) mismatches."""
+    mismatches = []
+    cur = conn.cursor()
+    # One snapshot, so a concurrent game write cannot show up as a mismatch.
+    with conn.transaction():
+        cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        for summary in SUMMARIES:
+            have, want = stored(cur, summary), recomputed(cur, summary)
+            for key in sorted(have.keys() | want.keys(), key=repr):
+                if have.get(key) != want.get(key):
+                    mismatches.append((summary.table, key, have.get(key), want.get(key)))
+    return mismatches
+
+
+def main():
+    import psycopg
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--rebuild', action='store_true', help='Recompute the summary tables from scratch')
+    group.add_argument('--check', action='store_true', help='Compare the stored tables with a recompute')
+    args = parser.parse_args()
+
+    with psycopg.connect(os.environ['DB_URL'], autocommit=True) as conn:
+        if args.rebuild:
+            rebuild(conn)
+            return
+
+        mismatches = check(conn)
+        for table, key, have, want in mismatches[:20]:
+            print(f'FAIL  {table} {key}: stored {have}, expected {want}')
+        if mismatches:
+            print(f'\nCHECK FAILED: {len(mismatches)} summary row(s) differ')
+            sys.exit(1)
+        print('CHECK PASSED')
+
+
+if __name__ == '__main__':
+    main()
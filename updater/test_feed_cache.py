@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+feed_cache.FeedCache: final entries are served for good unless a call asks
+for a refresh, which downloads the entry again and writes it back.
+"""
+
+#%%
+import pytest
+
+from feed_cache import FeedCache
+
+#%% Tests
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = FeedCache(str(tmp_path))
+    cache.fetch('game', 1, lambda: {'version': 1}, final=True)
+    return cache
+
+def test_final_entry_is_served_for_good(cache):
+    assert cache.fetch('game', 1, lambda: {'version': 2}, final=True) == {'version': 1}
+
+def test_refresh_replaces_final_entry(cache):
+    assert cache.fetch('game', 1, lambda: {'version': 2}, final=True, refresh=True) == {'version': 2}
+    assert cache.fetch('game', 1, lambda: {'version': 3}, final=True) == {'version': 2}
+
+def test_refresh_skips_final_entry_source(cache):
+    pytest.importorskip('ijson')
+
+    assert cache.get_source('game', 1) is not None
+    assert cache.get_source('game', 1, refresh=True) is None
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+feed_parser.parse_plays() on the fixture feed: which pitches are kept, how
+they are scored, the catcher and media offsets given to each, and the
+ejections, first pitch and last play position of a full parse and of a diff.
+"""
+
+#%%
+from datetime import datetime
+
+import feed_parser
+
+#%% Tests
+
+def test_parse_plays_keeps_called_pitches_with_coordinates(play_data):
+    parsed = feed_parser.parse_plays(play_data)
+    pitches = {pitch['id']: pitch for pitch in parsed['game_pitches']}
+
+    # a-3 is a swinging strike, b-2 has no coordinates and c-1 is in a play
+    # without a result yet.
+    assert list(pitches) == ['a-1', 'a-2', 'a-4', 'b-1', 'b-3']
+    assert [pitch['correct_call'] for pitch in pitches.values()] == [False, True, False, True, False]
+    # The catcher substitution comes before b-1.
+    assert [pitch['catcher_id'] for pitch in pitches.values()] == [101, 101, 101, 102, 102]
+
+    # A strike three well off the plate.
+    assert pitches['a-4']['blown_strikeout'] is True
+    assert pitches['a-4']['possible_bad_data'] is True
+    assert pitches['a-4']['total_miss_in'] == 8.03
+
+    # An overturned ABS challenge: the ball the umpire called is recorded as
+    # the called strike it was, in the count before the pitch.
+    assert pitches['b-3']['code'] == 'C'
+    assert pitches['b-3']['is_abs_challenge'] is True
+    assert pitches['b-3']['balls'] == 2
+
+    # Offsets from the two broadcast starts, 23:00:00 and 23:00:05.
+    assert pitches['a-1']['timestamp_start_home'] == '00:10:00.0'
+    assert pitches['a-1']['start_seconds_home'] == 600
+    assert pitches['a-1']['start_seconds_away'] == 595
+
+def test_parse_plays_ejections_and_media(play_data):
+    parsed = feed_parser.parse_plays(play_data)
+
+    [ejection] = parsed['game_ejections']
+    assert (ejection['player_id'], ejection['umpire_id']) == (210, 9)
+    assert ejection['start_seconds_home'] == 780
+
+    assert parsed['game_media']['first_pitch_datetime_start'] == datetime(2025, 6, 1, 23, 10)
+    assert parsed['game_media']['first_pitch_start_seconds_home'] == 600
+    assert parsed['last_play_position'] == (2, 0)
+
+def test_parse_plays_diff_keeps_catcher_and_first_pitch(play_data):
+    parsed = feed_parser.parse_plays(play_data, play_indices={1})
+
+    # Only play 1 yields pitches, but the substitution and the first pitch are
+    # still read from every play.
+    assert [(pitch['id'], pitch['catcher_id']) for pitch in parsed['game_pitches']] == [('b-1', 102), ('b-3', 102)]
+    assert [ejection['player_id'] for ejection in parsed['game_ejections']] == [210]
+    assert parsed['game_media']['first_pitch_datetime_start'] == datetime(2025, 6, 1, 23, 10)
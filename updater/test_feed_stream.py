@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+feed_stream's streaming decode against a full json decode of the fixture
+feed, read from a spooled body and from plain and gzipped cache entries, and
+its per-game memory budget on a padded multi-MB feed under tracemalloc.
+"""
+
+#%%
+import copy
+import json
+import random
+import tracemalloc
+from io import BytesIO
+
+import pytest
+
+import feed_parser
+from conftest import FEED_PATH, GAME_ID, prepare_play_data
+from feed_cache import FeedCache
+from feed_stream import GAME_MEMORY_BUDGET, HEADER_PATHS, FeedSource, StreamedPlays, read_header
+
+# feed_stream only imports ijson once a feed is decoded.
+pytest.importorskip('ijson')
+
+#%% Fixtures
+
+@pytest.fixture(params=['body', 'entry', 'gzipped entry'])
+def source(request, tmp_path):
+    """A FeedSource over the fixture feed's bytes."""
+    with open(FEED_PATH, 'rb') as f:
+        body = BytesIO(f.read())
+    if request.param == 'body':
+        return FeedSource(body=body)
+    cache = FeedCache(str(tmp_path), compress=request.param == 'gzipped entry')
+    return cache.put_body('game', GAME_ID, body, True)
+
+@pytest.fixture(scope='module')
+def padded_feed_path(tmp_path_factory):
+    """The fixture feed's plays repeated and each pitch padded with
+    tracking samples, to about PADDED_MB of JSON: a long extra-inning feed."""
+    with open(FEED_PATH, 'rb') as f:
+        feed = json.load(f)
+
+    rng = random.Random(5)
+    *plays, last = feed['liveData']['plays']['allPlays']
+    padded = [copy.deepcopy(play) for _ in range(PADDED_REPEAT) for play in plays] + [last]
+    pitches = [event for play in padded for event in play['playEvents'] if event.get('isPitch')]
+    samples = PADDED_MB * 1024 ** 2 // len(pitches) // 8
+    for event in pitches:
+        event.setdefault('pitchData', {})['samples'] = [round(rng.uniform(-100, 100), 3) for _ in range(samples)]
+    feed['liveData']['plays']['allPlays'] = padded
+
+    path = tmp_path_factory.mktemp('padded') / 'feed.json'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(feed, f, separators=(',', ':'))
+    return path
+
+PADDED_REPEAT = 40
+PADDED_MB = 4
+
+def subtree(tree, path):
+    for key in path.split('.'):
+        tree = tree[key]
+    return tree
+
+#%% Tests
+
+def test_read_header_decodes_header_subtrees(source, feed):
+    header = read_header(source)
+
+    for path in HEADER_PATHS:
+        assert subtree(header, path) == subtree(feed, path), path
+    assert isinstance(header['liveData']['plays']['allPlays'], StreamedPlays)
+
+def test_streamed_plays_match_full_decode(source, feed):
+    plays = StreamedPlays(source)
+
+    assert list(plays) == feed['liveData']['plays']['allPlays']
+    # Each iteration decodes the plays afresh.
+    assert list(plays) == feed['liveData']['plays']['allPlays']
+
+def test_parse_plays_of_streamed_plays_matches_full_decode(source, play_data):
+    streamed = dict(play_data, allPlays=StreamedPlays(source))
+
+    assert feed_parser.parse_plays(streamed) == feed_parser.parse_plays(play_data)
+    assert (feed_parser.parse_plays(streamed, play_indices={1})
+            == feed_parser.parse_plays(play_data, play_indices={1}))
+
+def traced(fn):
+    """(fn(), peak of Python allocations while it ran)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        return (result, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+def streamed_run(source):
+    header = read_header(source)
+    play_data = prepare_play_data(header['liveData']['plays'], header['liveData']['boxscore']['teams'])
+    return feed_parser.parse_plays(play_data)
+
+def decoded_run(path):
+    with open(path, 'rb') as f:
+        feed = json.load(f)
+    play_data = prepare_play_data(feed['liveData']['plays'], feed['liveData']['boxscore']['teams'])
+    return feed_parser.parse_plays(play_data)
+
+def test_streamed_game_stays_under_memory_budget(padded_feed_path, tmp_path):
+    with open(padded_feed_path, 'rb') as f:
+        body = BytesIO(f.read())
+    entry = FeedCache(str(tmp_path)).put_body('game', GAME_ID, body, True)
+
+    decoded, decoded_peak = traced(lambda: decoded_run(padded_feed_path))
+    streamed, streamed_peak = traced(lambda: streamed_run(entry))
+
+    assert len(decoded['game_pitches']) == 5 * PADDED_REPEAT
+    assert streamed == decoded
+    # A full decode of the same feed is well over the budget, so the budget
+    # is tight enough to catch a streamed run holding the whole feed.
+    assert decoded_peak > GAME_MEMORY_BUDGET
+    assert streamed_peak <= GAME_MEMORY_BUDGET
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+game.CallTally against the DataFrame filters add_game_to_db() used to count
+a game's calls with.
+"""
+
+#%%
+import pytest
+
+from conftest import BROADCAST_STARTS
+from game import CallTally
+from game_rows import build_game_rows
+
+#%% Helpers
+
+def dataframe_call_counts(pitch_list):
+    """The Game call columns as they were computed with pandas."""
+    pd = pytest.importorskip('pandas')
+
+    df_pitches = pd.DataFrame(pitch_list)
+    if len(df_pitches) == 0:
+        return dict(correct_calls=None, incorrect_calls=None, total_calls=None,
+                    calls_benefit_home=None, calls_benefit_away=None, correct_call_rate=None)
+
+    incorrect_calls = df_pitches.loc[df_pitches['correct_call'] == False]
+    correct_calls = df_pitches.loc[df_pitches['correct_call'] == True]
+    total_calls = df_pitches.loc[df_pitches['correct_call'].isin([True, False])]
+    calls_benefit_home = df_pitches.loc[df_pitches['home_away_benefit'] == 'home']
+    calls_benefit_away = df_pitches.loc[df_pitches['home_away_benefit'] == 'away']
+
+    return dict(
+        correct_calls=len(correct_calls), incorrect_calls=len(incorrect_calls), total_calls=len(total_calls),
+        calls_benefit_home=len(calls_benefit_home), calls_benefit_away=len(calls_benefit_away),
+        correct_call_rate=(len(correct_calls) / len(total_calls)) * 100)
+
+def tallied(pitch_list):
+    tally = CallTally()
+    for pitch in pitch_list:
+        tally.add(pitch)
+    return tally.game_fields()
+
+#%% Tests
+
+def test_tally_matches_dataframe_counts(game):
+    rows = build_game_rows(game, BROADCAST_STARTS)
+
+    counts = tallied(rows.pitches)
+    assert counts == dataframe_call_counts(rows.pitches)
+    # a-2 and b-1 are right; a-1 (a ball on a strike), a-4 (a strike off the
+    # plate) and the overturned b-3 are wrong. Missed balls help the away
+    # batters, missed strikes the home pitcher.
+    assert counts == dict(correct_calls=2, incorrect_calls=3, total_calls=5, calls_benefit_home=2,
+                          calls_benefit_away=1, correct_call_rate=40.0)
+    assert {name: getattr(rows.game, name) for name in counts} == counts
+
+def test_tally_of_game_without_pitches():
+    assert tallied([]) == dataframe_call_counts([])
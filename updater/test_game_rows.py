@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+game_rows.has_officials() on raw feeds against is_tracked()'s decoded check.
+"""
+
+#%%
+import json
+
+import pytest
+
+import json_codec
+from game_rows import has_officials, is_tracked
+
+#%% Tests
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('officials', [True, False])
+def test_has_officials_matches_is_tracked(feed, indent, officials):
+    if not officials:
+        feed['liveData']['boxscore']['officials'] = []
+    raw = json.dumps(feed, indent=indent).encode()
+
+    assert has_officials(raw) is officials
+    assert is_tracked(feed) is officials
+    # A feed cache entry wraps the feed under 'payload'.
+    assert has_officials(json_codec.dumps({'final': True, 'fetched_at': 0.0, 'payload': feed})) is officials
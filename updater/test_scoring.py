@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+scoring.score_columns() and benefit_columns() against the scalar
+set_trajectory()/assign_call_metrics() path they vectorise.
+"""
+
+#%%
+import math
+import random
+from datetime import datetime
+
+import numpy as np
+
+import scoring
+
+#%% Pitches
+
+def called_pitch(rng):
+    """A called pitch dict and its coordinates, with some trajectories
+    missing or unsolvable and some ABS overturns."""
+    coordinates = {
+        'x0': rng.uniform(-3, 3), 'y0': 50.0, 'z0': rng.uniform(5, 6.5),
+        'vX0': rng.uniform(-10, 10), 'vY0': rng.uniform(-140, -110), 'vZ0': rng.uniform(-10, 2),
+        'aX': rng.uniform(-20, 20), 'aY': rng.uniform(20, 35), 'aZ': rng.uniform(-35, -10),
+    }
+    kind = rng.random()
+    if kind < 0.05:
+        coordinates['aZ'] = None
+    elif kind < 0.1:
+        coordinates['aY'] = 0.0
+    elif kind < 0.15:
+        coordinates['vY0'] = 5.0
+
+    pitch = {
+        'px': rng.uniform(-1.5, 1.5), 'pz': rng.uniform(0.5, 4.5),
+        'sz_top': rng.uniform(3.2, 3.6), 'sz_bottom': rng.uniform(1.5, 1.7),
+        'code': rng.choice('BC'), 'balls': rng.randint(0, 3), 'strikes': rng.randint(0, 2),
+        'inning_half': rng.choice(['top', 'bottom']),
+        'home_team': 'NYY', 'away_team': 'BOS', 'home_team_id': 147, 'away_team_id': 111,
+    }
+    if rng.random() < 0.05:
+        pitch['abs_challenge_overturned'] = True
+    return pitch, coordinates
+
+def same(scalar, batch):
+    if scalar is None:
+        return batch is None or (isinstance(batch, float) and math.isnan(batch))
+    return scalar == batch
+
+#%% Tests
+
+def test_score_columns_matches_scalar_path():
+    rng = random.Random(3)
+    calls = [called_pitch(rng) for _ in range(2000)]
+    years = [rng.choice([2025, 2026]) for _ in calls]
+
+    pitches = [dict(pitch) for pitch, _ in calls]
+    for pitch, (_, coordinates), year in zip(pitches, calls, years):
+        scoring.set_trajectory(pitch, coordinates)
+        scoring.assign_call_metrics(pitch, datetime(year, 6, 1), pitch['inning_half'])
+
+    columns = scoring.columns_from_pitches(pitches, years)
+    scored = scoring.score_columns(columns)
+    for name in ('inning_half', 'home_team', 'away_team', 'home_team_id', 'away_team_id'):
+        columns[name] = np.array([p[name] for p in pitches], dtype=object)
+    columns['balls'] = np.array([p['balls'] for p in pitches])
+    columns['strikes'] = np.array([p['strikes'] for p in pitches])
+    scored.update(scoring.benefit_columns(columns, scored['correct_call'], scored['total_miss_in']))
+
+    # The team columns are filled in by game_rows.add_game_data() on the
+    # scalar path, from the benefiting side.
+    for pitch in pitches:
+        benefit, hurt = {'home': ('home', 'away'), 'away': ('away', 'home')}.get(pitch['home_away_benefit'], (None, None))
+        pitch['team_benefit'] = pitch.get(f'{benefit}_team')
+        pitch['team_benefit_id'] = pitch.get(f'{benefit}_team_id')
+        pitch['team_hurt'] = pitch.get(f'{hurt}_team')
+        pitch['team_hurt_id'] = pitch.get(f'{hurt}_team_id')
+
+    names = (['px_mid', 'pz_mid'] + scoring.METRIC_COLUMNS + [f'{name}_front' for name in scoring.METRIC_COLUMNS]
+             + scoring.BENEFIT_COLUMNS)
+    mismatches = [(i, name, pitch[name], scored[name][i])
+                  for i, pitch in enumerate(pitches) for name in names
+                  if not same(pitch[name], scored[name][i])]
+    assert mismatches == []
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+umpire-auditor.py's write path, driven end to end against a fake connection
+that records every statement and COPY row, so a write that raises fails here
+instead of being logged per game by process_game().
+"""
+
+#%%
+import dataclasses
+import importlib.util
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+from conftest import BROADCAST_STARTS, GAME_ID, MEDIA
+from ejection import Ejection
+from feed_cache import FeedCache
+from game import Game
+from game_rows import build_game_rows
+from game_sync import GameSync
+from pitch import Pitch
+
+TABLES = {'game': Game, 'pitch': Pitch, 'ejection': Ejection, 'game_sync': GameSync}
+
+#%% Fake database
+
+class FakeCopy:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_types(self, types):
+        pass
+
+    def write_row(self, values):
+        self.rows.append(tuple(values))
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.connection = conn
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, params=None):
+        text = self.connection.record(query, params)
+        self._rows = []
+        if 'pg_attribute' in text:
+            # db.column_types(): every dataclass field is a column.
+            self._rows = [(field.name, 'text') for field in dataclasses.fields(TABLES[params[0]])]
+
+    def executemany(self, query, params_seq):
+        for params in params_seq:
+            self.connection.record(query, params)
+
+    def fetchall(self):
+        return self._rows
+
+    def copy(self, query):
+        table = re.search(r'"_stage_(\w+)"', self.connection.record(query)).group(1)
+        return FakeCopy(self.connection.copied.setdefault(table, []))
+
+class FakeConnection:
+
+    def __init__(self):
+        self.statements = []
+        self.copied = {}
+
+    def record(self, query, params=None):
+        text = query if isinstance(query, str) else query.as_string(None)
+        self.statements.append((text, params))
+        return text
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def execute(self, query, params=None):
+        cur = self.cursor()
+        cur.execute(query, params)
+        return cur
+
+    @contextmanager
+    def pipeline(self):
+        yield
+
+    @contextmanager
+    def transaction(self):
+        yield
+
+    def upserted(self, table):
+        """Parameters of every INSERT ... VALUES into table."""
+        return [params for text, params in self.statements
+                if text.startswith(f'INSERT INTO "{table}"') and 'VALUES' in text]
+
+class FakeDatabase:
+
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    @contextmanager
+    def connection(self):
+        yield self.conn
+
+    @contextmanager
+    def transaction(self):
+        yield self.conn
+
+#%% Fixtures
+
+@pytest.fixture
+def auditor():
+    """umpire-auditor.py as a module, with a fake database."""
+    path = os.path.join(os.path.dirname(__file__), 'umpire-auditor.py')
+    spec = importlib.util.spec_from_file_location('umpire_auditor', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.database = FakeDatabase()
+    return module
+
+#%% Tests
+
+def test_write_game_rows_writes_every_row(auditor, game):
+    rows = build_game_rows(game, BROADCAST_STARTS)
+    assert rows.pitches and rows.ejections
+
+    auditor.write_game_rows(rows, None)
+    conn = auditor.database.conn
+
+    assert conn.upserted('game') == [rows.game.get_values()]
+    assert conn.copied['pitch'] == [pitch.get_values() for pitch in rows.pitches]
+    assert any(text.startswith('INSERT INTO "pitch"') and 'ON CONFLICT ("id", "game_date")' in text
+               for text, _ in conn.statements)
+    assert conn.upserted('ejection') == [ejection.get_values() for ejection in rows.ejections]
+    assert conn.upserted('game_sync') == [rows.sync.get_values()]
+
+    culls = [params for text, params in conn.statements if text == auditor.CULL_GHOST_PITCHES_QUERY]
+    assert culls == [{'game_id': GAME_ID, 'game_date': '2025-06-01',
+                      'pitch_ids': [pitch.id for pitch in rows.pitches]}]
+
+def test_write_game_rows_unchanged_writes_only_sync(auditor, game):
+    rows = build_game_rows(game, BROADCAST_STARTS)
+    previous = dataclasses.replace(rows.sync)
+
+    auditor.write_game_rows(rows, previous)
+    conn = auditor.database.conn
+
+    assert conn.upserted('game_sync') == [rows.sync.get_values()]
+    assert [text for text, _ in conn.statements if 'game_sync' not in text] == []
+
+def test_fetch_game_body_skips_media_without_officials(auditor, feed, monkeypatch):
+    feed['liveData']['boxscore']['officials'] = []
+    monkeypatch.setattr(auditor, 'fetch_feed_body', lambda game_id, refresh: (json.dumps(feed).encode(), False))
+    monkeypatch.setattr(auditor, 'fetch_game_media', lambda game_id: pytest.fail('media fetched'))
+
+    assert auditor.fetch_game_body({'game_id': GAME_ID, 'game_type': 'R'}) is None
+
+def test_process_games_resolves_broadcast_starts_once_per_chunk(auditor, feed, monkeypatch):
+    scheduled = [{'game_id': GAME_ID + i, 'status': 'Final', 'detailed_state': 'Final', 'game_type': 'R'}
+                 for i in range(5)]
+    rainout = {'game_id': GAME_ID + 5, 'status': 'Final', 'detailed_state': 'Postponed', 'game_type': 'R'}
+    resolved, fetched, windows = [], [], []
+
+    monkeypatch.setattr(auditor, 'fetch_game_media', lambda game_id: dict(MEDIA))
+    monkeypatch.setattr(auditor.media, 'resolve_broadcast_starts',
+                        lambda media_ids: resolved.append(media_ids) or dict(BROADCAST_STARTS))
+    monkeypatch.setattr(auditor, 'fetch_game_feed', lambda game_id, sync, refresh: fetched.append(game_id) or (feed, None))
+    monkeypatch.setattr(auditor, 'prepare_database', lambda seasons: None)
+    monkeypatch.setattr(auditor, 'write_reference_rows', lambda references: windows.append(len(list(references))))
+    monkeypatch.setattr(auditor, 'process_game', lambda game, broadcast_starts: None)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        auditor.process_games(executor, scheduled + [rainout], {2025}, force=True, window=2)
+
+    assert len(resolved) == 1 and len(resolved[0]) == 10
+    assert sorted(fetched) == [game['game_id'] for game in scheduled]
+    assert windows == [2, 2, 1]
+
+def test_corrected_final_game_is_downloaded_again(auditor, feed, tmp_path, monkeypatch):
+    auditor.feed_cache = FeedCache(str(tmp_path))
+    auditor.feed_cache.put('game', GAME_ID, {'stale': True}, True)
+    sync = GameSync(id=GAME_ID, status='Final', feed_timestamp='20250601_231500', fingerprint='f',
+                    synced_at=None, last_at_bat_index=None, last_pitch_index=None)
+
+    monkeypatch.setattr(auditor.mlb_api, 'get_game_timestamps', lambda game_id: ['20250601_231500', '20250602_101500'])
+    monkeypatch.setattr(auditor.mlb_api, 'get_game', lambda game_id: feed)
+    monkeypatch.setattr(auditor, 'fetch_game_media', lambda game_id: dict(MEDIA))
+
+    game = auditor.check_game({'game_id': GAME_ID, 'status': 'Final', 'game_type': 'R'}, sync)
+    assert game['refresh'] is True
+
+    assert auditor.fetch_game(game)['game_data'] == feed
+    assert auditor.feed_cache.get('game', GAME_ID) == feed
@@ -2,28 +2,34 @@
 # coding: utf-8
 
 #%% Import Libraries
-import statsapi
 import logging
-import requests
-import pandas as pd
-import math
 from datetime import date, timedelta, datetime
 from zoneinfo import ZoneInfo
 import os
-import psycopg
-from pypika import PostgreSQLQuery, Table
-import dataclasses
 import sys
 import argparse
-import hashlib
-import portion as P
+import io
+from concurrent.futures import ThreadPoolExecutor
 
 from pitch import Pitch
 from game import Game
-from umpire import Umpire
-from player import Player
-from team import Team
 from ejection import Ejection
+import mlb_api
+import media
+from media import Broadcast
+from feed_cache import FeedCache, game_is_final, DEFAULT_MAX_BYTES
+import feed_stream
+from feed_stream import FeedSource, StreamedPlays
+import game_sync
+from game_sync import GameSync
+import game_rows
+from game_rows import build_game_rows, has_officials, is_tracked, reference_rows, TRACKED_GAME_TYPES
+import live_feed
+import db
+from db import Database
+from ref_cache import RefCache, REFERENCE_TABLES
+import schedule
+import summaries
 
 # Config logging
 logger = logging.getLogger('umpireauditor')
@@ -35,872 +41,580 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-#%% Conn String
-
-conn_string = os.environ['DB_URL']
-
-#%% Upsert Query
-
-def dataclass_upsert_query(table_name, rows, dc):
-    dc_fields = [field.name for field in dataclasses.fields(dc)]
-    dc_values = [row.get_values() for row in rows]
-
-    db_table = Table(table_name)
-
-    q = PostgreSQLQuery.into(db_table)\
-        .columns(*dc_fields)\
-        .insert(*dc_values)\
-        .on_conflict('id')
-
-    for i, field in enumerate(dc_fields):
-        q = q.do_update(field, dc_values[0][i])
-
-
-    return str(q)
-
-#%% Constants
-
-PLATE_WIDTH = 17.0 / 12 / 2
-BALL_RADIUS = 2.94 / 12 /2
-HALF_STRIKE_ZONE = PLATE_WIDTH + BALL_RADIUS
-
-TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
-TIME_FORMAT_MS = "%Y-%m-%dT%H:%M:%S.%fZ"
-
-#%% Pitch location helpers
-
-def width_strike(pitch):
-    return abs(pitch['px']) < HALF_STRIKE_ZONE
-
-def height_strike(pitch):
-    return (pitch['pz'] < (pitch['sz_top'] + BALL_RADIUS) and pitch['pz'] > pitch['sz_bottom'] - BALL_RADIUS)
-
-def strike(pitch):
-    return width_strike(pitch) and height_strike(pitch)
-
-
-#%% Trajectory / plate-plane helpers
-
-# Home plate is 17" deep (front edge -> back tip) in the feed's convention:
-# pX/pZ are reported at the front edge (y = 17/12 ft). The "midline" is the
-# depth midpoint, halfway between the front edge and the back tip.
-PLATE_DEPTH_FT = 17.0 / 12
-FRONT_PLANE_Y = PLATE_DEPTH_FT
-MID_PLANE_Y = PLATE_DEPTH_FT / 2
-
-# Keys of the 9-param constant-accel model in pitchData.coordinates.
-TRAJ_KEYS = ['x0', 'y0', 'z0', 'vX0', 'vY0', 'vZ0', 'aX', 'aY', 'aZ']
-
-
-def extract_trajectory(coordinates):
-    """Return the 9 trajectory params from a pitchData.coordinates dict, or
-    None if any are missing OR null (older feeds / bad data). A null value
-    would otherwise blow up the arithmetic in location_at_plane()."""
-    if any(coordinates.get(k) is None for k in TRAJ_KEYS):
-        return None
-    return {k: coordinates[k] for k in TRAJ_KEYS}
-
-
-def location_at_plane(params, y_plane):
-    """Solve the constant-accel trajectory for the (px, pz) where the ball
-    crosses y = y_plane (ft). Returns (None, None) if it never reaches the
-    plane (non-positive discriminant / no positive root)."""
-    aY, vY0, y0 = params['aY'], params['vY0'], params['y0']
-    a = 0.5 * aY
-    if a == 0:
-        return (None, None)
-    disc = vY0 ** 2 - 4 * a * (y0 - y_plane)
-    if disc < 0:
-        return (None, None)
-    root = math.sqrt(disc)
-    candidates = [t for t in ((-vY0 - root) / (2 * a), (-vY0 + root) / (2 * a)) if t > 0]
-    if not candidates:
-        return (None, None)
-    t = min(candidates)
-    px = params['x0'] + params['vX0'] * t + 0.5 * params['aX'] * t ** 2
-    pz = params['z0'] + params['vZ0'] * t + 0.5 * params['aZ'] * t ** 2
-    return (px, pz)
-
-
-def location_metrics(px, pz, sz_top, sz_bottom, code, overturned=False):
-    """Correctness + miss distances for a called pitch at an arbitrary (px, pz),
-    replicating the original updater rules so it is plane-agnostic:
-      - called strikes ('C'): x_miss/y_miss always computed; total_miss only on
-        an incorrect call.
-      - called balls ('B'): only correct_call is meaningful (misses left None).
-    ABS overturns force the call incorrect regardless of geometry.
-    Returns (correct_call, x_miss, y_miss, total_miss, total_miss_in)."""
-    abs_px = abs(px)
-    is_width = abs_px < HALF_STRIKE_ZONE
-    is_height = (pz < sz_top + BALL_RADIUS) and (pz > sz_bottom - BALL_RADIUS)
-    is_strike = is_width and is_height
-
-    if code != 'C':  # 'B'
-        correct = not is_strike
-        if overturned and correct:
-            correct = False
-        return (correct, None, None, None, None)
-
-    correct = is_strike
-    x_miss = 0 if is_width else abs_px - HALF_STRIKE_ZONE
-    if is_height:
-        y_miss = 0
-    elif pz > (sz_top + BALL_RADIUS):
-        y_miss = pz - sz_top - BALL_RADIUS
-    else:
-        y_miss = sz_bottom - BALL_RADIUS - pz
-
-    if overturned and correct:
-        correct = False
-        x_miss = max(abs_px - HALF_STRIKE_ZONE, 0)
-
-    if not correct:
-        total_miss = math.sqrt(x_miss ** 2 + y_miss ** 2)
-        total_miss_in = round(total_miss * 12, 2)
-    else:
-        total_miss = None
-        total_miss_in = None
-    return (correct, x_miss, y_miss, total_miss, total_miss_in)
-
-
-def set_trajectory(pitch, coordinates):
-    """Store the raw trajectory params and the derived midline (px_mid/pz_mid)
-    on the pitch dict. Falls back to the front-of-plate coords when the feed
-    has no trajectory or the plane solve fails."""
-    params = extract_trajectory(coordinates)
-    if params:
-        pitch['traj_x0'] = params['x0']
-        pitch['traj_y0'] = params['y0']
-        pitch['traj_z0'] = params['z0']
-        pitch['traj_vx0'] = params['vX0']
-        pitch['traj_vy0'] = params['vY0']
-        pitch['traj_vz0'] = params['vZ0']
-        pitch['traj_ax'] = params['aX']
-        pitch['traj_ay'] = params['aY']
-        pitch['traj_az'] = params['aZ']
-        px_mid, pz_mid = location_at_plane(params, MID_PLANE_Y)
-    else:
-        px_mid, pz_mid = (None, None)
-    if px_mid is None:
-        px_mid, pz_mid = pitch['px'], pitch['pz']
-    pitch['px_mid'] = px_mid
-    pitch['pz_mid'] = pz_mid
-
-
-def _apply_benefit_flags(pitch, inning_half):
-    """Set benefit / blown-call / possible_bad_data flags from the PRIMARY
-    correct_call (possible_bad_data only on 'C'). Reset to dataclass defaults
-    first so a re-score (e.g. after a play-level ABS code flip) cannot leave
-    stale flags from the first scoring pass."""
-    pitch['home_away_benefit'] = None
-    pitch['player_type_benefit'] = None
-    pitch['team_benefit'] = None
-    pitch['team_benefit_id'] = None
-    pitch['team_hurt'] = None
-    pitch['team_hurt_id'] = None
-    pitch['blown_walk'] = False
-    pitch['blown_strikeout'] = False
-    pitch['possible_bad_data'] = False
-    if pitch['correct_call'] == False:
-        if pitch['code'] == 'B':
-            pitch['home_away_benefit'] = "away" if inning_half == "top" else "home"
-            pitch['player_type_benefit'] = 'batter'
-            pitch['blown_walk'] = pitch['balls'] == 3
-        if pitch['code'] == 'C':
-            pitch['home_away_benefit'] = "home" if inning_half == "top" else "away"
-            pitch['player_type_benefit'] = 'pitcher'
-            pitch['blown_strikeout'] = pitch['strikes'] == 2
-            pitch['possible_bad_data'] = (pitch.get('total_miss_in') or 0) > 7
-
-
-def assign_call_metrics(pitch, pitch_start_time, inning_half):
-    """Compute the front-of-plate metrics (*_front) plus the primary metrics.
-    The primary uses the midline location for 2026+ games (when a trajectory
-    was available), and the front-of-plate location otherwise. Requires
-    set_trajectory() to have run first (px_mid/pz_mid + traj_* present)."""
-    overturned = pitch.get('abs_challenge_overturned', False)
-    code = pitch['code']
-    sz_top, sz_bottom = pitch['sz_top'], pitch['sz_bottom']
-
-    fc, fx, fy, ft, fti = location_metrics(
-        pitch['px'], pitch['pz'], sz_top, sz_bottom, code, overturned)
-    pitch['correct_call_front'] = fc
-    pitch['x_miss_front'] = fx
-    pitch['y_miss_front'] = fy
-    pitch['total_miss_front'] = ft
-    pitch['total_miss_in_front'] = fti
-
-    has_traj = pitch.get('traj_x0') is not None
-    if pitch_start_time.year >= 2026 and has_traj:
-        pc, px_, py_, pt, pti = location_metrics(
-            pitch['px_mid'], pitch['pz_mid'], sz_top, sz_bottom, code, overturned)
-    else:
-        pc, px_, py_, pt, pti = fc, fx, fy, ft, fti
-    pitch['correct_call'] = pc
-    pitch['x_miss'] = px_
-    pitch['y_miss'] = py_
-    pitch['total_miss'] = pt
-    pitch['total_miss_in'] = pti
-
-    _apply_benefit_flags(pitch, inning_half)
-
-
-#%% Convert Timedelta
-
-def convert_timedelta(duration):
-    total_seconds = duration.total_seconds()
-
-    # Occasional bugs in the API where the date is wrong
-    if (total_seconds > 86400 or total_seconds < 0):
-        return None
-
-    milliseconds = int(total_seconds % 1 * 100)
-    seconds = f"{int(total_seconds % 60):02d}"
-    minutes = f"{int((total_seconds % 3600) // 60):02d}"
-    hours = f"{int(total_seconds // 3600):02d}"
+#%% Feed cache / database
+
+# Replaced in the entry point once the command line has been parsed.
+feed_cache = FeedCache()
+database = None
+database_ready = False
+ref_cache = RefCache()
+# --stream: full game feeds are decoded incrementally (see feed_stream).
+stream_feeds = False
+# --backfill: worker processes that decode and parse the feeds.
+backfill_pool = None
+backfill_processes = 0
+
+# Games fetched and processed at once unless --workers says otherwise. Each
+# in-flight game holds its whole decoded feed (tens of MB for a long game),
+# so the default stays small enough for the Render cron instance.
+DEFAULT_WORKERS = 2
+
+# Games per backfill batch for each worker process: enough to keep every
+# worker busy while the next batch is fetched and the last one written.
+BACKFILL_BATCH_PER_PROCESS = 4
+
+#%% Reference Rows
+
+def write_reference_rows(references):
+    """Write the new or changed umpires, teams and players of a batch of games
+    (one reference_rows() tuple per game) in one transaction, before any of
+    the games' own rows reference them."""
+    rows = {table: [] for table in REFERENCE_TABLES}
+
+    for umpire_obj, home_team_obj, away_team_obj, player_rows in references:
+        rows['umpire'].append(umpire_obj)
+        rows['team'] += [home_team_obj, away_team_obj]
+        rows['player'] += player_rows
+
+    pending = {table: ref_cache.pending(table, table_rows) for table, table_rows in rows.items()}
+    if not any(pending.values()):
+        return
 
-    return '{}:{}:{}.{}'.format(hours, minutes, seconds, milliseconds)
+    with database.transaction() as conn:
+        cur = conn.cursor()
+        for table, dc in REFERENCE_TABLES.items():
+            db.bulk_upsert(cur, table, pending[table], dc)
 
-#%% Game Start Time
+    for table, table_rows in pending.items():
+        logger.debug('Wrote %s new or changed %s rows', len(table_rows), table)
+        ref_cache.add(table, table_rows)
 
-def game_start_time(media_id):
+#%% Fetch Game
 
-    url = 'https://media-gateway.mlb.com/graphql'
-    query = """query mediaInfo($ids: [String]) {
-        mediaInfo(ids: $ids) {
-            milestones {
-              milestoneType
-              relativeTime
-              absoluteTime
-            }
-        }
-    }"""
+def fetch_game_feed(game_id, sync, refresh=False):
+    """Return (game_data, play_indices). A live game whose last sync matches
+    the cached feed is brought up to date with a diff and play_indices names
+    the plays that changed; otherwise the full feed is fetched (through the
+    cache unless `refresh`, streamed with --stream) and play_indices is None."""
 
-    variables = {'ids': media_id}
-    res = requests.post(url, json={'query': query, 'variables': variables})
-    mediaInfo = res.json()["data"]["mediaInfo"]
+    if sync is not None and sync.status == 'Live':
+        previous = feed_cache.load('game', game_id)
 
-    try:
-        milestones = mediaInfo[0]["milestones"]
-        broadcast_start = [milestone["absoluteTime"] for milestone in milestones if milestone["milestoneType"] == "BROADCAST_START"]
-        return datetime.strptime(broadcast_start[0], TIME_FORMAT_MS)
-    except:
-        return None
-
-#%% Add Pitches Function
-
-def add_pitches(game_data):
-    game_pitches = []
-    game_ejections = []
-
-    all_plays = game_data['allPlays']
-    start_time_home = game_data['start_time_home']
-    start_time_away = game_data['start_time_away']
-    home_media_id = game_data['home_media_id']
-    away_media_id = game_data['away_media_id']
-    home_media_call_letters = game_data['home_media_call_letters']
-    away_media_call_letters = game_data['away_media_call_letters']
-    home_media_state = game_data['home_media_state']
-    away_media_state = game_data['away_media_state']
-    home_catcher_interval = game_data['home_catcher_interval']
-    away_catcher_interval = game_data['away_catcher_interval']
-
-    first_pitch_datetime_start = None
-    first_pitch_start_seconds_home = None
-    first_pitch_start_seconds_away = None
-
-    for play in all_plays:
-        play_events = play['playEvents']
-        play_pitches = [event for event in play_events if event['isPitch']]
-        if len(play_pitches) > 0:
-            first_pitch_datetime_start = datetime.strptime(play_pitches[0]['startTime'], TIME_FORMAT_MS)
-            first_pitch_start_seconds_home = (first_pitch_datetime_start - start_time_home).seconds if start_time_home else None
-            first_pitch_start_seconds_away = (first_pitch_datetime_start - start_time_away).seconds if start_time_away else None
-            break
-
-    game_media = {
-        "home_media_id": home_media_id,
-        "away_media_id": away_media_id,
-        "home_media_call_letters": home_media_call_letters,
-        "away_media_call_letters": away_media_call_letters,
-        "home_media_state": home_media_state,
-        "away_media_state": away_media_state,
-        "first_pitch_datetime_start": first_pitch_datetime_start,
-        "first_pitch_start_seconds_home": first_pitch_start_seconds_home,
-        "first_pitch_start_seconds_away": first_pitch_start_seconds_away
-    }
-
-    for play in all_plays:
-        play_events = play['playEvents']
-
-        # Ejections must be scanned at the play level, not inside the pitch
-        # loop below. The pitch loop skips plays whose pitches are not called
-        # balls/strikes (e.g. fouls, balls in play), which would silently drop
-        # any ejection that occurred during such a play.
-        for event in play_events:
+        if live_feed.matches_sync(previous, sync):
             try:
-                if event['details']['eventType'] == 'ejection':
-                    start_time = datetime.strptime(event['startTime'], TIME_FORMAT_MS)
-
-                    ejection = {
-                        'description': event['details']['description'],
-                        'timestamp_start_home': convert_timedelta(start_time - start_time_home) if start_time_home else None,
-                        'timestamp_start_away': convert_timedelta(start_time - start_time_away) if start_time_away else None,
-                        'start_seconds_home': (start_time - start_time_home).seconds if start_time_home else None,
-                        'start_seconds_away': (start_time - start_time_away).seconds if start_time_away else None,
-                        'player_id': event['player']['id'],
-                        'umpire_id': event['umpire']['id'],
-                        'home_media_id': home_media_id,
-                        'away_media_id': away_media_id
-                    }
-
-                    game_ejections.append(ejection)
-            except KeyError:
-                pass
-
-        if not 'description' in play['result']:
-            continue
-
-        description = play['result']['description']
-        inning = play['about']['inning']
-        inning_half = play['about']['halfInning']
-        outs = play['count']['outs']
-        batter_hand = play['matchup']['batSide']['code']
-        ## WHAT HAPPENS WHEN THERE'S A MID ATBAT PITCHER CHANGE?
-        batter_id = play['matchup']['batter']['id']
-        pitcher_id = play['matchup']['pitcher']['id']
-        pitches = [event for event in play_events if event['isPitch']]
-        counts = [{'balls': 0, 'strikes': 0}] + [pitch['count'] for pitch in pitches]
-        codes = [pitch['details']['code'] for pitch in pitches]
-        review_details = [pitch.get('reviewDetails') for pitch in pitches]
-        ids = [pitch['playId'] for pitch in pitches]
-        start_times = [datetime.strptime(pitch['startTime'], TIME_FORMAT_MS) for pitch in pitches]
-        end_times = [datetime.strptime(pitch['endTime'], TIME_FORMAT_MS) if "endTime" in pitch else None for pitch in pitches]
-        pitches_data = [pitch['pitchData'] for pitch in pitches]
-        for i, row in enumerate(pitches_data):
-#             if codes[i] == 'X' or codes[i] == 'V' or codes[i] == '*B':
-#                 continue
-
-            if codes[i] != 'B' and codes[i] != 'C':
-                continue
+                game_data, play_indices = live_feed.fetch_changes(game_id, previous)
+            except Exception as e:
+                logger.debug('Falling back to full feed for game id %s: %s', game_id, e)
+            else:
+                final = game_is_final(game_data)
+                feed_cache.put('game', game_id, game_data, final)
+
+                # A game that just went Final gets one full rebuild so the
+                # ghost-pitch cull runs against the complete feed.
+                return (game_data, None if final else play_indices)
+
+    if stream_feeds:
+        return (fetch_streamed_feed(game_id, refresh), None)
+
+    game_data = feed_cache.fetch('game', game_id, lambda: mlb_api.get_game(game_id), final=game_is_final,
+                                 refresh=refresh)
+    return (game_data, None)
+
+def fetch_streamed_feed(game_id, refresh=False):
+    """The full feed as a feed_stream header whose plays are decoded as
+    they are parsed, read from the cache entry or a spooled download."""
+    source = feed_cache.get_source('game', game_id, refresh)
+    if source is not None:
+        return feed_stream.read_header(source)
+
+    body = mlb_api.download_game(game_id)
+    game_data = feed_stream.read_header(FeedSource(body=body))
+
+    # Once written through, the plays are read back from the cache entry
+    # and the download can go.
+    cached = feed_cache.put_body('game', game_id, body, game_is_final(game_data))
+    if cached is not None:
+        body.close()
+        game_data['liveData']['plays']['allPlays'] = StreamedPlays(cached)
+
+    return game_data
+
+def fetch_feed_body(game_id, refresh=False):
+    """(raw feed JSON, wrapped) from the feed cache or the network, without
+    decoding it. A cached feed comes as its whole entry, with the feed under
+    'payload' (wrapped)."""
+    source = feed_cache.get_source('game', game_id, refresh)
+    if source is not None:
+        with source.open() as f:
+            return (f.read(), True)
+
+    return (mlb_api.get_game_body(game_id), False)
+
+def fetch_game_body(scheduled, broadcast=None, refresh=False):
+    """fetch_game() for backfills: the feed is left undecoded for a worker
+    process, so games are filtered on the schedule's game type and on the
+    raw feed's officials instead, before the EPG lookup."""
+    game_id = scheduled['game_id']
+    if scheduled['game_type'] not in TRACKED_GAME_TYPES:
+        return
 
-            if not 'pX' in row['coordinates']:
-                continue
+    feed, wrapped = fetch_feed_body(game_id, refresh)
+    if not has_officials(feed):
+        logger.debug('Skipping game id without officials: %s', game_id)
+        return
 
-            pitch_start_time = start_times[i]
-
-            pitch = {
-                "id": ids[i],
-                "play_description": description,
-                "inning": inning,
-                "inning_half": inning_half,
-                "outs": outs,
-                "bat_side": batter_hand,
-                "sz_top": row['strikeZoneTop'],
-                "sz_bottom": row['strikeZoneBottom'],
-                "px": row['coordinates']['pX'],
-                "pz": row['coordinates']['pZ'],
-                "code": codes[i],
-                "strikes": counts[i]['strikes'],
-                'balls': counts[i]['balls'],
-                'datetime_start': pitch_start_time,
-                'timestamp_start_home': convert_timedelta(start_times[i] - start_time_home) if start_time_home else None,
-                'timestamp_start_away': convert_timedelta(start_times[i] - start_time_away) if start_time_away else None,
-                'start_seconds_home': (start_times[i] - start_time_home).seconds if start_time_home else None,
-                'start_seconds_away': (start_times[i] - start_time_away).seconds if start_time_away else None,
-                'batter_id': batter_id,
-                'pitcher_id': pitcher_id,
-                'catcher_id': home_catcher_interval[pitch_start_time] if inning_half == 'top' else away_catcher_interval[pitch_start_time],
-                'home_media_id': home_media_id,
-                'away_media_id': away_media_id,
-                'home_media_call_letters': home_media_call_letters,
-                'away_media_call_letters': away_media_call_letters,
-                'home_media_state': home_media_state,
-                'away_media_state': away_media_state
-            }
+    game = {'game_id': game_id, 'feed': feed, 'wrapped': wrapped}
 
-            if end_times[i]:
-                pitch['timestamp_end_home'] = convert_timedelta(end_times[i] - start_time_home) if start_time_home else None
-                pitch['timestamp_end_away'] = convert_timedelta(end_times[i] - start_time_away) if start_time_away else None
-
-            # ABS Challenge tracking
-            rd = review_details[i]
-            if rd and rd.get('reviewType') == 'MJ':
-                pitch['is_abs_challenge'] = True
-                pitch['abs_challenge_overturned'] = rd.get('isOverturned', False)
-                pitch['abs_challenge_team_id'] = rd.get('challengeTeamId')
-                pitch['abs_challenge_player_id'] = rd['player']['id'] if 'player' in rd else None
-
-                # If overturned, flip the code back to the original umpire call
-                # so correct_call evaluates against what the umpire actually called
-                if pitch['abs_challenge_overturned']:
-                    pitch['code'] = 'C' if pitch['code'] == 'B' else 'B'
-
-            set_trajectory(pitch, row['coordinates'])
-            assign_call_metrics(pitch, pitch_start_time, inning_half)
-
-            game_pitches.append(pitch)
-
-        # Fill missing ABS challenge data from play-level reviewDetails.
-        # The MLB API sometimes omits reviewDetails on individual pitch events
-        # but includes it on the play (at-bat) object itself.
-        play_rd = play.get('reviewDetails')
-        if play_rd and play_rd.get('reviewType') == 'MJ' and game_pitches:
-            last_pitch = game_pitches[-1]
-            if not last_pitch.get('is_abs_challenge') and last_pitch.get('play_description') == description:
-                last_pitch['is_abs_challenge'] = True
-                last_pitch['abs_challenge_overturned'] = play_rd.get('isOverturned', False)
-                last_pitch['abs_challenge_team_id'] = play_rd.get('challengeTeamId')
-                last_pitch['abs_challenge_player_id'] = play_rd['player']['id'] if 'player' in play_rd else None
-
-                # If overturned, flip code back to umpire's original call
-                if last_pitch['abs_challenge_overturned']:
-                    last_pitch['code'] = 'C' if last_pitch['code'] == 'B' else 'B'
-
-                # Recalculate correctness and miss distances (front + midline)
-                # with the updated code. Trajectory was already set on the
-                # main path, so px_mid/pz_mid are present.
-                assign_call_metrics(last_pitch, last_pitch['datetime_start'], inning_half)
-
-    game_pitch_data = {'game_pitches': game_pitches, 'game_ejections': game_ejections, 'game_media': game_media}
-    return game_pitch_data
-
-#%% Get HP Umpire
-
-def get_hp_umpire(official):
-    if (official['officialType'] == 'Home Plate'):
-        return True
+    if broadcast is not None:
+        game.update(media=broadcast.media(), broadcast=broadcast)
     else:
-        return False
-
-#%% Parse Player Data
+        game['media'] = fetch_game_media(game_id)
+
+    return game
+
+def check_game(scheduled, sync, broadcast=None):
+    """First stage of process_games(): None for a game that needs no fetch
+    (an untracked type, called off, or Final and unchanged since its last
+    sync), else the game with its media ids. These are small and cached, so
+    a whole schedule chunk is checked before any feed is downloaded and its
+    broadcast starts resolved in one batch. An archived stored broadcast
+    replaces the EPG lookup."""
+    game_id = scheduled['game_id']
+    if scheduled['game_type'] not in TRACKED_GAME_TYPES or scheduled.get('detailed_state') in schedule.CALLED_OFF_STATES:
+        return
 
-def parse_player_data(player_data):
-    if (player_data['isPlayer'] == False and 'batSide' not in player_data):
+    if is_unchanged_final(scheduled, sync):
+        logger.debug('Skipping unchanged final game id: %s', game_id)
         return
-    else:
-        return Player(id = player_data['id'], name = player_data['fullName'])
-
-#%% Add Game Data
-
-def add_game_data(pitch, game_data):
-    pitch['umpire_id'] = game_data['umpire_id']
-    pitch['umpire_name'] = game_data['umpire_name']
-    pitch['game_id'] = game_data['game_id']
-    pitch['home_team'] = game_data['home_team']
-    pitch['away_team'] = game_data['away_team']
-    pitch['home_team_id'] = game_data['home_team_id']
-    pitch['away_team_id'] = game_data['away_team_id']
-    pitch['game_date'] = game_data['game_date']
-
-    if pitch['correct_call'] != True:
-
-        if pitch['home_away_benefit'] == 'home':
-            pitch['team_benefit'] = game_data['home_team']
-            pitch['team_benefit_id'] = game_data['home_team_id']
-            pitch['team_hurt'] = game_data['away_team']
-            pitch['team_hurt_id'] = game_data['away_team_id']
-        elif pitch['home_away_benefit'] == 'away':
-            pitch['team_benefit'] = game_data['away_team']
-            pitch['team_benefit_id'] = game_data['away_team_id']
-            pitch['team_hurt'] = game_data['home_team']
-            pitch['team_hurt_id'] = game_data['home_team_id']
-
-    return Pitch(**pitch)
-
-#%% Add Ejection Data
-def add_game_ejection_data(ejection, game_data):
-    ejection['id'] = hashlib.sha256((str(game_data['game_id']) + str(game_data['umpire_id']) + str(ejection['player_id'])).encode('utf-8')).hexdigest()
-    ejection['umpire_id'] = game_data['umpire_id']
-    ejection['umpire_name'] = game_data['umpire_name']
-    ejection['game_id'] = game_data['game_id']
-    ejection['home_team'] = game_data['home_team']
-    ejection['away_team'] = game_data['away_team']
-    ejection['home_team_id'] = game_data['home_team_id']
-    ejection['away_team_id'] = game_data['away_team_id']
-    ejection['game_date'] = game_data['game_date']
-
-    return Ejection(**ejection)
 
-#%%
-def add_game_to_db(game_id):
+    game = {'game_id': game_id, 'sync': sync, 'refresh': is_corrected_final(sync)}
 
-#%%%
+    if broadcast is not None:
+        game.update(media=broadcast.media(), broadcast=broadcast)
+    else:
+        game['media'] = fetch_game_media(game_id)
 
-    game_data = statsapi.get('game', {'gamePk': game_id})
+    return game
 
-#%%% CREATE UMPIRE
+def fetch_game(game):
+    """Second stage of process_games(): add the feed to a checked game.
+    Returns None for games the updater does not track."""
+    game_data, play_indices = fetch_game_feed(game['game_id'], game['sync'], game['refresh'])
 
-    # Regular, Wildcard, Divisional, League, WS
-    if game_data['gameData']['game']['type'] not in ['R', 'F', 'D', 'L', 'W']:
+    if not is_tracked(game_data):
         return
 
-    officials = game_data['liveData']['boxscore']['officials']
+    return dict(game, game_data=game_data, play_indices=play_indices)
 
-    # This happens on rainouts
-    if len(officials) == 0:
-        return
-
-    hp_umpire = next(filter(get_hp_umpire, officials))['official']
-    hp_umpire_name = hp_umpire['fullName']
-    hp_umpire_id = hp_umpire['id']
+def fetch_game_media(game_id):
+    """Media ids, call letters and states of the home and away MLB.tv feeds
+    of a game, from its EPG entry. It is cached for good only once both
+    feeds are archived; until then their states still move."""
+    media_response = feed_cache.fetch('epg', game_id, lambda: mlb_api.search_epg(game_id),
+                                      final=lambda response: media.is_archived(media.epg_media(response)))
+    return media.epg_media(media_response)
 
-    umpire_obj = Umpire(id = hp_umpire_id, name = hp_umpire_name)
+#%%
+def add_game_to_db(game, broadcast_starts):
+    write_game_rows(build_game_rows(game, broadcast_starts), game.get('sync'))
+
+def write_game_rows(rows, previous_sync):
+    """Write a game's rows in one transaction, or only its sync record when
+    they are unchanged since previous_sync."""
+    game_id = rows.game.id
+    game_object, pitch_list, ejection_list, sync = rows.game, rows.pitches, rows.ejections, rows.sync
+    incremental = rows.incremental
+
+    if not incremental and previous_sync is not None and previous_sync.fingerprint == sync.fingerprint:
+        logger.debug('Derived rows unchanged for game id: %s', game_id)
+        with database.connection() as conn:
+            db.upsert_rows(conn.cursor(), 'game_sync', [sync], GameSync)
+        return
 
-    db_umpire_query = dataclass_upsert_query('umpire', [umpire_obj], Umpire)
+#%%% Write rows
 
-    with psycopg.connect(conn_string, autocommit=True) as conn:
+    # Everything for the game commits together on one pooled connection.
+    # COPY cannot run inside a pipeline, so the small upserts after the
+    # pitch COPY are pipelined.
+    with database.transaction() as conn:
         cur = conn.cursor()
-        cur.execute(db_umpire_query)
 
+        # The season summaries take the difference between the game's
+        # contribution before and after its rows are rewritten.
+        summary_before = summaries.game_contribution(conn, game_id)
 
-#%%% CREATE TEAM
+        # Umpire, team and player rows were written for the whole batch by
+        # write_reference_rows().
+        db.upsert_rows(cur, 'game', [game_object], Game)
 
-    team_data = game_data['gameData']['teams']
+        if len(pitch_list) != 0:
+            logger.debug("Upserting %s pitches", len(pitch_list))
+            db.bulk_upsert(cur, 'pitch', pitch_list, Pitch, conflict=db.PITCH_CONFLICT)
 
+        with conn.pipeline():
+            db.upsert_rows(cur, 'ejection', ejection_list, Ejection)
 
-    away_team = team_data['away']
-    away_team_abbreviation = away_team['abbreviation']
-    away_team_name = away_team['name']
-    away_team_id = away_team['id']
+            # The Game row above was tallied from the changed plays only.
+            if incremental:
+                summaries.refresh_game_counts(cur, game_id)
 
-    away_team_obj = Team(
-        id = away_team_id,
-        name = away_team_name,
-        abbreviation = away_team_abbreviation)
+        # Skip culling when this run parsed no pitches: a transient feed gap
+        # (e.g. Statcast tracking temporarily missing) must not delete
+        # previously-stored good rows. An incremental pass has not seen every
+        # play, so it cannot tell a ghost from an untouched pitch; the full
+        # rebuild when the game goes Final culls.
+        if len(pitch_list) != 0 and not incremental:
+            cull_ghost_pitches(cur, game_id, game_object.game_date, [pitch_obj.id for pitch_obj in pitch_list])
 
-    home_team = team_data['home']
-    home_team_abbreviation = home_team['abbreviation']
-    home_team_name = home_team['name']
-    home_team_id = home_team['id']
+        summaries.apply_game_delta(conn, summary_before, summaries.game_contribution(conn, game_id))
 
-    home_team_obj = Team(
-        id = home_team_id,
-        name = home_team_name,
-        abbreviation = home_team_abbreviation)
+        # Part of the same transaction, so the record only exists if the
+        # game's rows were written and a failure is retried next tick.
+        db.upsert_rows(cur, 'game_sync', [sync], GameSync)
 
-    # db_team_query = dataclass_upsert_query('teams', [away_team_obj, home_team_obj], Team)
+#%% Cull ghost pitches
 
-    db_home_query = dataclass_upsert_query('team', [home_team_obj], Team)
-    db_away_query = dataclass_upsert_query('team', [away_team_obj], Team)
+CULL_GHOST_PITCHES_QUERY = """
+DELETE FROM pitch
+WHERE game_id = %(game_id)s AND (NOT (id = ANY(%(pitch_ids)s)) OR game_date <> %(game_date)s)
+RETURNING id
+"""
 
-    with psycopg.connect(conn_string, autocommit=True) as conn:
-        cur = conn.cursor()
-        # cur.execute(db_team_query)
-        cur.execute(db_home_query)
-        cur.execute(db_away_query)
+def cull_ghost_pitches(cur, game_id, game_date, pitch_ids):
+    """Delete the game's stored pitches that are not in pitch_ids (play ids the
+    feed has re-keyed or dropped), or that were stored under another
+    game_date (pitch upserts match on (id, game_date), so a re-dated game
+    would otherwise keep both copies). Returns the number of rows deleted."""
+    cur.execute(CULL_GHOST_PITCHES_QUERY, {'game_id': game_id, 'game_date': game_date, 'pitch_ids': pitch_ids})
+    deleted = [r[0] for r in cur.fetchall()]
 
+    if deleted:
+        logger.debug('Culled %s ghost pitches from game id %s: %s', len(deleted), game_id, deleted)
 
-#%%% Game
+    return len(deleted)
 
-    game_date = game_data['gameData']['datetime']['officialDate']
-    game_type = game_data['gameData']['game']['type']
+#%% Broadcast records
 
-#%%% ADD PLAYERS
+def load_archived_broadcasts(game_ids):
+    """Stored broadcast metadata for the games whose feeds are archived.
+    --refresh looks everything up again."""
+    if not game_ids or feed_cache.refresh:
+        return {}
 
-    game_players = game_data['gameData']['players']
-    player_rows = list(map(parse_player_data, [*game_players.values()]))
+    with database.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f'SELECT {", ".join(media.BROADCAST_COLUMNS)} FROM game WHERE id = ANY(%s)', [list(game_ids)])
+        broadcasts = [Broadcast(*row) for row in cur.fetchall()]
 
-    player_queries = []
+    return {b.id: b for b in broadcasts if b.is_archived()}
 
-    for player_obj in player_rows:
-        player_queries.append(dataclass_upsert_query('player', [player_obj], Player))
+#%% Sync records
 
-    db_player_query = ';'.join(player_queries)
+def load_game_syncs(game_ids):
+    if not game_ids:
+        return {}
 
-    with psycopg.connect(conn_string, autocommit=True) as conn:
+    with database.connection() as conn:
         cur = conn.cursor()
-        cur.execute(db_player_query)
+        cur.execute('SELECT id, status, feed_timestamp, fingerprint, synced_at, last_at_bat_index, last_pitch_index '
+                    'FROM game_sync WHERE id = ANY(%s)', [list(game_ids)])
+        return {row[0]: GameSync(*row) for row in cur.fetchall()}
+
+def is_unchanged_final(scheduled, sync):
+    """True when both the schedule and the last sync say Final and the live
+    feed's latest timecode is the one we last synced, which costs one small
+    timestamps request instead of the full feed."""
+    if not game_sync.is_final(sync) or scheduled['status'] != 'Final':
+        return False
 
+    timestamps = mlb_api.get_game_timestamps(scheduled['game_id'])
+    return len(timestamps) > 0 and timestamps[-1] == sync.feed_timestamp
 
-#%%% ADD PITCHES
+def is_corrected_final(sync):
+    """For a game is_unchanged_final() did not skip: whether it was Final at
+    its last sync, so its feed has moved since. The cached Final feed is the
+    one that was synced (and would be served for good), so the feed is
+    downloaded again and written back."""
+    return game_sync.is_final(sync)
 
-    play_data = game_data['liveData']['plays']
+#%% Umpire Auditor
 
-    ## GATHER MLB.TV BROADCAST DATA XXX THIS SHOULD MAYBE GO INTO GAME TABLE AS WELL
-    content = statsapi.get('game_content', {'gamePk': game_id})
+# Errors are isolated per game in both stages so one bad feed cannot take
+# down the rest of the slate, whether games run serially or on worker threads.
 
-    if 'epg' in content['media']:
-        content_items = content['media']['epg'][0]['items']
-    else:
-        content_items = []
-
-
-    media_url = f'https://mastapi.mobile.mlbinfra.com/api/epg/v3/search?exp=MLB&gamePk={game_id}'
-    media_request = requests.get(media_url)
-    media_response = media_request.json()
-    media_items = media_response['results'][0]['videoFeeds']
-
-    if (len(content_items) > 1):
-        first_item = content_items[0]
-        second_item = content_items[1]
-        home_feed_id = first_item["contentId"] if first_item["mediaFeedType"] == "HOME" else second_item["contentId"]
-        away_feed_id = first_item["contentId"] if first_item["mediaFeedType"] == "AWAY" else second_item["contentId"]
-
-    elif (len(content_items) == 1):
-        home_feed_id = content_items[0]["contentId"]
-        away_feed_id = content_items[0]["contentId"]
-
-    if (len(media_items) == 0):
-        media_items = media_response['results'][1]['videoFeeds']
-
-    if (len(media_items) == 0):
-        media_items = media_response['results'][2]['videoFeeds']
-
-    if (len(media_items) > 1):
-        first_item_media = media_items[0]
-        second_item_media = media_items[1]
-        home_media_id = first_item_media["mediaId"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["mediaId"]
-        away_media_id = first_item_media["mediaId"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["mediaId"]
-
-        home_media_call_letters = first_item_media["callLetters"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["callLetters"]
-        away_media_call_letters = first_item_media["callLetters"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["callLetters"]
-        home_media_state = first_item_media["mediaState"] if first_item_media["mediaFeedType"] == "HOME" else second_item_media["mediaState"]
-        away_media_state = first_item_media["mediaState"] if first_item_media["mediaFeedType"] == "AWAY" else second_item_media["mediaState"]
-
-    elif (len(media_items) == 1):
-        home_media_id = media_items[0]["mediaId"]
-        away_media_id = media_items[0]["mediaId"]
-        home_media_call_letters = media_items[0]["callLetters"]
-        away_media_call_letters = media_items[0]["callLetters"]
-        home_media_state = media_items[0]["mediaState"]
-        away_media_state = media_items[0]["mediaState"]
+def check_game_safe(scheduled, sync, broadcast):
+    gid = scheduled['game_id']
+    try:
+        return check_game(scheduled, sync, broadcast)
+    except Exception as e:
+        logger.error('Error fetching game id %s: %s', gid, e)
 
-    # else:
-    #    continue
+def fetch_game_safe(game):
+    gid = game['game_id']
+    try:
+        logger.debug('Fetching game id: %s', gid)
+        return fetch_game(game)
+    except Exception as e:
+        logger.error('Error fetching game id %s: %s', gid, e)
 
-    play_data['start_time_away'] = game_start_time(away_media_id)
-    play_data['start_time_home'] = game_start_time(home_media_id)
-    play_data['home_media_id'] = home_media_id
-    play_data['away_media_id'] = away_media_id
-    play_data['home_media_call_letters'] = home_media_call_letters
-    play_data['away_media_call_letters'] = away_media_call_letters
-    play_data['home_media_state'] = home_media_state
-    play_data['away_media_state'] = away_media_state
-
-    ## Collecting catcher IDs
-    boxscore_players = game_data['liveData']['boxscore']['teams']
-    home_players = boxscore_players['home']['players']
-    away_players = boxscore_players['away']['players']
-    home_player_ids = [player['person']['id'] for player in list(home_players.values())]
-    away_player_ids = [player['person']['id'] for player in list(away_players.values())]
-
-    starting_home_catcher_id = None
-    starting_away_catcher_id = None
-
-    for value in home_players.values():
-        isCatcher = value['position']['name'] == 'Catcher'
-        isSub = value['gameStatus']['isSubstitute'] == True
-        onBench = value['gameStatus']['isOnBench'] == True
-        if isCatcher and not isSub and not onBench:
-            starting_home_catcher_id = value['person']['id']
-
-    for value in away_players.values():
-        isCatcher = value['position']['name'] == 'Catcher'
-        isSub = value['gameStatus']['isSubstitute'] == True
-        onBench = value['gameStatus']['isOnBench'] == True
-        if isCatcher and not isSub and not onBench:
-            starting_away_catcher_id = value['person']['id']
-
-    all_plays = game_data['liveData']['plays']['allPlays']
-    all_events = []
-    catcher_subs = []
-
-    for play in all_plays:
-        for event in play['playEvents']:
-            all_events.append(event)
-
-    for event in all_events:
-        if 'isSubstitution' in event and event['position']['name'] == 'Catcher':
-            catcher_subs.append(event)
-
-    def gen_catcher_interval(starting_id, player_ids, subs):
-        catcher_interval = P.IntervalDict()
-        catcher_interval[P.closed(datetime.min, datetime.max)] = starting_id
-
-        for catcher_sub in catcher_subs:
-            catcher_sub_id = catcher_sub['player']['id']
-
-            if catcher_sub_id in player_ids:
-                start_datetime = datetime.strptime(catcher_sub['startTime'], TIME_FORMAT_MS)
-                catcher_interval[P.closed(start_datetime, datetime.max)] = catcher_sub_id
-
-        return catcher_interval
-
-    play_data['home_catcher_interval'] = gen_catcher_interval(starting_home_catcher_id, home_player_ids, catcher_subs)
-    play_data['away_catcher_interval'] = gen_catcher_interval(starting_away_catcher_id, away_player_ids, catcher_subs)
-
-    pitches_data = add_pitches(play_data)
-
-    pitch_rows = pitches_data['game_pitches']
-
-    pitch_game_data = {
-        'umpire_id': hp_umpire_id,
-        'umpire_name': hp_umpire_name,
-        'game_id': game_id,
-        'home_team': home_team_abbreviation,
-        'away_team': away_team_abbreviation,
-        'home_team_id': home_team_id,
-        'away_team_id': away_team_id,
-        'game_date': game_date
-    }
-
-    pitch_list = list(map(lambda p: add_game_data(p, pitch_game_data), pitch_rows))
-
-    pitch_queries = []
-
-    for pitch_obj in pitch_list:
-        pitch_queries.append(dataclass_upsert_query('pitch', [pitch_obj], Pitch))
-
-    db_pitch_query = ';'.join(pitch_queries)
-
-    ejection_rows = pitches_data['game_ejections']
-    ejection_list = list(map(lambda p: add_game_ejection_data(p, pitch_game_data), ejection_rows))
-
-    ejection_queries = []
-
-    for ejection_obj in ejection_list:
-        ejection_queries.append(dataclass_upsert_query('ejection', [ejection_obj], Ejection))
-
-    db_ejection_query = ';'.join(ejection_queries)
-
-#%%# Create Game
-
-    df_pitches = pd.DataFrame(pitch_list)
-    media_data = pitches_data['game_media']
-
-    # Games like the one at Tokyo Dome are regular season but have no pitch tracking
-    if len(df_pitches) == 0:
-        game_object = Game(
-            id = game_id,
-            home_team = home_team_abbreviation,
-            away_team = away_team_abbreviation,
-            game_date = game_date,
-            game_type = game_type,
-            correct_calls = None,
-            incorrect_calls = None,
-            total_calls = None,
-            calls_benefit_home = None,
-            calls_benefit_away = None,
-            correct_call_rate = None,
-            umpire_name = hp_umpire_name,
-            umpire_id = hp_umpire_id,
-            home_team_id = home_team_id,
-            away_team_id = away_team_id,
-            home_media_id = media_data['home_media_id'],
-            away_media_id = media_data['away_media_id'],
-            home_media_call_letters = media_data['home_media_call_letters'],
-            away_media_call_letters = media_data['away_media_call_letters'],
-            home_media_state = media_data['home_media_state'],
-            away_media_state = media_data['away_media_state'],
-            first_pitch_datetime_start = media_data['first_pitch_datetime_start'],
-            first_pitch_start_seconds_home = media_data['first_pitch_start_seconds_home'],
-            first_pitch_start_seconds_away = media_data['first_pitch_start_seconds_away'],
-        )
-    else:
-        incorrect_calls = df_pitches.loc[df_pitches['correct_call'] == False].sort_values(by='total_miss', ascending=False)
-        correct_calls = df_pitches.loc[df_pitches['correct_call'] == True]
-        total_calls = df_pitches.loc[df_pitches['correct_call'].isin([True, False])]
-        correct_call_rate = (len(correct_calls) / len(total_calls)) * 100
-
-        calls_benefit_home = df_pitches.loc[df_pitches['home_away_benefit'] == 'home']
-        calls_benefit_away = df_pitches.loc[df_pitches['home_away_benefit'] == 'away']
-
-        game_object = Game(
-            id = game_id,
-            home_team = home_team_abbreviation,
-            away_team = away_team_abbreviation,
-            game_date = game_date,
-            game_type = game_type,
-            correct_calls = len(correct_calls),
-            incorrect_calls = len(incorrect_calls),
-            total_calls = len(total_calls),
-            calls_benefit_home = len(calls_benefit_home),
-            calls_benefit_away = len(calls_benefit_away),
-            correct_call_rate = correct_call_rate,
-            umpire_name = hp_umpire_name,
-            umpire_id = hp_umpire_id,
-            home_team_id = home_team_id,
-            away_team_id = away_team_id,
-            home_media_id = media_data['home_media_id'],
-            away_media_id = media_data['away_media_id'],
-            home_media_call_letters = media_data['home_media_call_letters'],
-            away_media_call_letters = media_data['away_media_call_letters'],
-            home_media_state = media_data['home_media_state'],
-            away_media_state = media_data['away_media_state'],
-            first_pitch_datetime_start = media_data['first_pitch_datetime_start'],
-            first_pitch_start_seconds_home = media_data['first_pitch_start_seconds_home'],
-            first_pitch_start_seconds_away = media_data['first_pitch_start_seconds_away'],
-        )
-
-
-    db_game_query = dataclass_upsert_query('game', [game_object], Game)
-
-    with psycopg.connect(conn_string, autocommit=True) as conn:
-        cur = conn.cursor()
-        cur.execute(db_game_query)
+def fetch_game_body_safe(scheduled, sync, broadcast):
+    gid = scheduled['game_id']
+    try:
+        if is_unchanged_final(scheduled, sync):
+            logger.debug('Skipping unchanged final game id: %s', gid)
+            return
+
+        logger.debug('Fetching game id: %s', gid)
+        game = fetch_game_body(scheduled, broadcast, is_corrected_final(sync))
+        if game:
+            game['sync'] = sync
+        return game
+    except Exception as e:
+        logger.error('Error fetching game id %s: %s', gid, e)
+
+def process_game(game, broadcast_starts):
+    gid = game['game_id']
+    try:
+        logger.debug('Processing game id: %s', gid)
+        add_game_to_db(game, broadcast_starts)
+    except Exception as e:
+        logger.error('Error processing game id %s: %s', gid, e)
+
+def resolve_game_broadcast_starts(games):
+    """{media id: broadcast start} for a batch of fetched games."""
+    # One batched mediaInfo lookup for every live feed in the batch instead
+    # of two requests per game; archived games bring their stored starts.
+    media_ids = [game['media'][key] for game in games if 'broadcast' not in game for key in ('home_media_id', 'away_media_id')]
+    broadcast_starts = media.resolve_broadcast_starts(media_ids)
+
+    for game in games:
+        if 'broadcast' in game:
+            broadcast_starts.update(game['broadcast'].broadcast_starts())
+
+    return broadcast_starts
+
+def process_games(executor, scheduled_games, seasons, force=False, window=DEFAULT_WORKERS):
+    # --force ignores the sync records and stored broadcasts, so every game
+    # is fully reprocessed.
+    if not scheduled_games:
+        return
 
-        if len(df_pitches) != 0:
-            logger.debug("Upserting %s pitches", len(df_pitches))
-            cur.execute(db_pitch_query)
+    if backfill_pool is not None:
+        return process_games_backfill(executor, scheduled_games, seasons, force)
 
-        if len(ejection_list) != 0:
-            cur.execute(db_ejection_query)
+    game_ids = {g['game_id'] for g in scheduled_games}
+    syncs = {} if force else load_game_syncs(game_ids)
+    broadcasts = {} if force else load_archived_broadcasts(game_ids)
 
-#%% Cull ghost pitches
-    # Skip culling when this run parsed no pitches: an empty df_pitches has no
-    # 'id' column (KeyError), and a transient feed gap (e.g. Statcast tracking
-    # temporarily missing) must not delete previously-stored good rows.
-    if len(df_pitches) == 0:
+    # The whole chunk is checked first and its broadcast starts resolved in
+    # one batched mediaInfo lookup, whatever the window.
+    checked = [
+        game for game in executor.map(
+            lambda g: check_game_safe(g, syncs.get(g['game_id']), broadcasts.get(g['game_id'])),
+            scheduled_games)
+        if game
+    ]
+
+    # Every game was unchanged since its last sync: nothing to write.
+    if not checked:
         return
 
-    with psycopg.connect(conn_string, autocommit=True) as conn:
-        cur = conn.cursor()
-        cur.execute('SELECT id from pitch WHERE game_id=' + str(game_id))
-        db_ids = [r[0] for r in cur.fetchall()]
+    broadcast_starts = resolve_game_broadcast_starts(checked)
 
-        diff_play_ids = [id for id in db_ids if id not in df_pitches['id'].to_list()]
+    # Feeds are fetched and written `window` games at a time, so no more than
+    # that many decoded feeds are held at once and writes start after the
+    # first window instead of after the last fetch.
+    for i in range(0, len(checked), window):
+        games = [game for game in executor.map(fetch_game_safe, checked[i:i + window]) if game]
+        if not games:
+            continue
 
-        if len(diff_play_ids) > 0:
-            for play_id in diff_play_ids:
-                logger.debug('Deleting pitch id: %s', play_id)
-                cur.execute('DELETE FROM pitch WHERE id = (%s)', [play_id])
+        prepare_database(seasons)
 
-#%% Umpire Auditor
+        try:
+            write_reference_rows(reference_rows(game['game_data']) for game in games)
+        except Exception as e:
+            logger.error('Error writing reference rows: %s', e)
+
+        list(executor.map(lambda game: process_game(game, broadcast_starts), games))
+
+#%% Backfill
+
+# A backfill runs in three stages: the feeds are fetched on the I/O threads,
+# decoded, parsed and scored in the worker processes (game_rows.parse_feed),
+# and written by this process alone. Batches are pipelined, so one batch is
+# fetched while the previous one is parsed, and written while the next is.
+
+def process_games_backfill(executor, scheduled_games, seasons, force=False):
+    game_ids = {g['game_id'] for g in scheduled_games}
+    syncs = {} if force else load_game_syncs(game_ids)
+    broadcasts = {} if force else load_archived_broadcasts(game_ids)
+    batch_size = backfill_processes * BACKFILL_BATCH_PER_PROCESS
+
+    parsing = []
+    for i in range(0, len(scheduled_games), batch_size):
+        games = [
+            game for game in executor.map(
+                lambda g: fetch_game_body_safe(g, syncs.get(g['game_id']), broadcasts.get(g['game_id'])),
+                scheduled_games[i:i + batch_size])
+            if game
+        ]
+
+        broadcast_starts = resolve_game_broadcast_starts(games)
+
+        submitted = []
+        for game in games:
+            media_ids = [game['media'][key] for key in ('home_media_id', 'away_media_id')]
+            # Ids whose mediaInfo lookup failed are left out of
+            # broadcast_starts; like process_game(), only that game fails.
+            missing = [media_id for media_id in media_ids if media_id not in broadcast_starts]
+            if missing:
+                logger.error('Error processing game id %s: no broadcast start for %s', game['game_id'], missing)
+                continue
 
-def umpire_auditor(sdate, edate):
-    dates = [d.date() for d in pd.date_range(sdate, edate)]
+            task = {
+                'game_id': game['game_id'],
+                'feed': game['feed'],
+                'wrapped': game['wrapped'],
+                'media': game['media'],
+                'broadcast_starts': {media_id: broadcast_starts[media_id] for media_id in media_ids},
+            }
+            submitted.append((game, backfill_pool.submit(game_rows.parse_feed, task)))
 
-    game_ids = []
+        write_parsed_games(parsing, syncs, seasons)
+        parsing = submitted
 
-    for d in dates:
-        logger.debug('Finding games from date: %s', d)
-        sched = statsapi.schedule(date=d)
-        date_game_ids = [game['game_id'] for game in sched]
-        game_ids = game_ids + date_game_ids
+    write_parsed_games(parsing, syncs, seasons)
 
-    for gid in game_ids:
+def write_parsed_games(parsed, syncs, seasons):
+    """Single writer of a backfill: wait for a batch's rows from the worker
+    processes, then write them as process_games() would."""
+    results = []
+    for game, future in parsed:
+        gid = game['game_id']
         try:
-            logger.debug('Processing game id: %s', gid)
-            add_game_to_db(gid)
+            result = future.result()
         except Exception as e:
             logger.error('Error processing game id %s: %s', gid, e)
+            continue
 
-parser = argparse.ArgumentParser()
+        # Only the worker knew whether the feed is final, so a downloaded
+        # feed is written through to the cache now.
+        if not game['wrapped']:
+            feed_cache.put_body('game', gid, io.BytesIO(game['feed']), result['final'])
+        game['feed'] = None
 
-parser.add_argument("-sdate", "--start-date", help="Start of date range to update", type=date.fromisoformat)
-parser.add_argument("-edate", "--end-date", help="End of date range to update", type=date.fromisoformat)
+        if result['rows'] is not None:
+            results.append(result['rows'])
 
-args = parser.parse_args()
+    if not results:
+        return
 
-today = datetime.now(tz=ZoneInfo("America/Los_Angeles")).date()
-sdate = today - timedelta(days=1)
-edate = today
+    prepare_database(seasons)
 
-if args.start_date:
-    sdate = args.start_date
+    try:
+        write_reference_rows(rows.reference_rows() for rows in results)
+    except Exception as e:
+        logger.error('Error writing reference rows: %s', e)
 
-if args.end_date:
-    edate = args.end_date
+    for rows in results:
+        gid = rows.game.id
+        try:
+            logger.debug('Writing game id: %s', gid)
+            write_game_rows(rows, syncs.get(gid))
+        except Exception as e:
+            logger.error('Error processing game id %s: %s', gid, e)
+
+def start_backfill_pool(processes):
+    """Worker processes for --backfill. They are forked before this process
+    starts any thread, and inherit the scoring modules loaded here."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    import scoring
+
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('fork'))
+    # With fork, the first submit starts every worker.
+    pool.submit(int).result()
+    return pool
+
+def prepare_database(seasons):
+    """Load the reference cache and create the pitch partitions the run can
+    write to, once, before the first game is written."""
+    global database_ready
+    if database_ready:
+        return
 
-umpire_auditor(sdate, edate)
+    with database.connection() as conn:
+        ref_cache.load(conn.cursor())
+        db.ensure_season_partitions(conn.cursor(), seasons)
+    database_ready = True
+
+def umpire_auditor(sdate, edate, today, workers=1, force=False):
+    # Every season the run can write to, plus next season's so the first
+    # games of the year never find their partition missing.
+    seasons = set(range(sdate.year, edate.year + 1)) | {today.year, today.year + 1}
+
+    # Each game is dominated by blocking network round trips, so threads are
+    # enough to overlap them; with workers=1 this is the old serial loop.
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        # Month chunks are processed as soon as they resolve rather than
+        # after the whole range has been scheduled.
+        for start, end, scheduled_games in schedule.resolve_schedule(sdate, edate, today, feed_cache):
+            logger.debug('Found %s games from %s to %s', len(scheduled_games), start, end)
+            process_games(executor, scheduled_games, seasons, force, window=max(workers, 1))
+
+    mlb_api.client.log_stats(logger)
+    feed_cache.log_stats(logger)
+    database.log_stats(logger)
+    ref_cache.log_stats(logger)
+
+# Importing the script (e.g. from the tests) defines its functions without
+# running it.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-sdate", "--start-date", help="Start of date range to update", type=date.fromisoformat)
+    parser.add_argument("-edate", "--end-date", help="End of date range to update", type=date.fromisoformat)
+    parser.add_argument("-w", "--workers", help="Number of games to fetch and process concurrently", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--cache-dir", help="Directory for the on-disk feed cache (disabled if unset); live games are only diffed when it persists between runs", default=os.environ.get('FEED_CACHE_DIR'))
+    parser.add_argument("--cache-max-mb", help="Size cap of the feed cache before LRU eviction", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2)
+    parser.add_argument("--cache-ttl", help="Seconds a cached feed for a non-final game stays fresh", type=int, default=60)
+    parser.add_argument("--cache-compress", help="Gzip feed cache entries (smaller on disk, slower to read back)", action="store_true")
+    parser.add_argument("--refresh", help="Ignore cached feeds and re-download everything", action="store_true")
+    parser.add_argument("--force", help="Reprocess every game even if it is Final and unchanged since its last sync", action="store_true")
+    parser.add_argument("--stream", help="Decode full game feeds incrementally instead of holding each whole feed in memory", action="store_true")
+    parser.add_argument("--backfill", help="Decode, parse and score feeds in worker processes, for multi-season runs (--stream does not apply)", action="store_true")
+    parser.add_argument("--processes", help="Worker processes for --backfill", type=int, default=os.cpu_count())
+
+    args = parser.parse_args()
+
+    feed_cache = FeedCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 ** 2, ttl=args.cache_ttl, refresh=args.refresh,
+                           compress=args.cache_compress)
+    stream_feeds = args.stream
+
+    # One pool for the run, sized so every worker can hold a connection. It only
+    # connects when first used, so a tick with no scheduled games never does.
+    conn_string = os.environ['DB_URL']
+    database = Database(conn_string, max_size=args.workers)
+
+    # Started before anything opens a thread; see start_backfill_pool().
+    if args.backfill:
+        backfill_processes = max(args.processes, 1)
+        backfill_pool = start_backfill_pool(backfill_processes)
+
+    today = datetime.now(tz=ZoneInfo("America/Los_Angeles")).date()
+    sdate = today - timedelta(days=1)
+    edate = today
+
+    if args.start_date:
+        sdate = args.start_date
+
+    if args.end_date:
+        edate = args.end_date
+
+    try:
+        umpire_auditor(sdate, edate, today, args.workers, args.force)
+    finally:
+        if backfill_pool is not None:
+            backfill_pool.shutdown()
+        database.close()